@@ -0,0 +1,128 @@
+"""
+Compare the automaton-backed Dictionary against the original TrieNode
+implementation: build time, memory, and membership throughput.
+
+Run with `uv run python bench/bench_dictionary.py`.
+"""
+
+import gc
+import random
+import time
+import tracemalloc
+
+from anagrams.core.dictionary import DEFAULT_DICTIONARY_FILE, Dictionary
+
+
+class TrieNode:  # the original implementation, kept for comparison
+    def __init__(self, terminal: bool = False) -> None:
+        self.children: dict[str, TrieNode] = {}
+        self.terminal: bool = terminal
+
+    def add(self, value: str):
+        if value == "":
+            self.terminal = True
+            return
+        i = 0
+        for k in self.children.keys():
+            if k[0] == value[0]:
+                terminal = False
+                while k[i] == value[i]:
+                    i += 1
+                    if i == len(k):
+                        self.children[k].add(value.removeprefix(k))
+                        return
+                    if i == len(value):
+                        terminal = True
+                        break
+                branch = TrieNode(terminal)
+                existing_word = self.children.pop(k)
+                common_prefix = k[:i]
+                existing_suffix = k[i:]
+                new_suffix = value[i:]
+
+                self.children[common_prefix] = branch
+                branch.children[existing_suffix] = existing_word
+                if not terminal:
+                    branch.children[new_suffix] = TrieNode(True)
+
+                break
+        else:
+            self.children[value] = TrieNode(True)
+
+    def __contains__(self, value: str):
+        if not isinstance(value, str):
+            return False
+        if value == "":
+            return self.terminal
+        i = 0
+        for k in self.children.keys():
+            if k[0] == value[0]:
+                while k[i] == value[i]:
+                    i += 1
+                    if i == len(k):
+                        return self.children[k].__contains__(value[i:])
+                    if i == len(value):
+                        return False
+                return False
+        return False
+
+
+def legacy_dictionary(words: list[str]):
+    root = TrieNode()
+    for word in words:
+        if word not in root:
+            root.add(word)
+    return root
+
+
+def measure_build(build, *args):
+    gc.collect()
+    start = time.perf_counter()
+    result = build(*args)
+    elapsed = time.perf_counter() - start
+    del result
+    gc.collect()
+    # build again under tracemalloc, which slows things down too much to time
+    tracemalloc.start()
+    result = build(*args)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, memory
+
+
+def measure_lookups(container, words: list[str]):
+    start = time.perf_counter()
+    for w in words:
+        w in container  # noqa: B015
+    return len(words) / (time.perf_counter() - start)
+
+
+def main():
+    with open(DEFAULT_DICTIONARY_FILE) as f:
+        words = f.read().split()
+
+    rng = random.Random(1234)
+    hits = rng.sample(words, 50_000)
+    misses = ["".join(rng.sample(w, len(w))) + "q" for w in hits]
+
+    legacy, legacy_time, legacy_mem = measure_build(legacy_dictionary, words)
+    new, new_time, new_mem = measure_build(Dictionary.load_from_file)
+    automaton = new.automaton
+
+    print(f"{len(words)} words")
+    print(f"automaton: {automaton.num_nodes} nodes, {automaton.num_edges} edges")
+    print(
+        f"{'':<10} {'build (s)':>10} {'memory (MB)':>12} {'hits/s':>12} {'misses/s':>12}"
+    )
+    for name, d, t, mem in [
+        ("trie", legacy, legacy_time, legacy_mem),
+        ("automaton", new, new_time, new_mem),
+    ]:
+        print(
+            f"{name:<10} {t:>10.2f} {mem / 1e6:>12.2f} "
+            f"{measure_lookups(d, hits):>12,.0f} {measure_lookups(d, misses):>12,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
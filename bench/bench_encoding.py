@@ -0,0 +1,88 @@
+"""
+Compare the JSON and binary encodings of the messages that are sent the
+most: the cost of encoding a game state for every player in a game, and of
+encoding a game patch, and the bytes per message of each.
+
+Run with `uv run python bench/bench_encoding.py`.
+"""
+
+import random
+import timeit
+from uuid import UUID
+
+from anagrams.core import Game, Player
+from anagrams.core.dictionary import DEFAULT_DICTIONARY_FILE
+from anagrams.core.utils import weighted_random_letter
+from anagrams.server import binary
+from anagrams.server.messages import Message
+
+random.seed(1234)
+
+
+def make_game(players: int, words: int) -> Game:
+    with open(DEFAULT_DICTIONARY_FILE) as f:
+        dictionary = [w for w in f.read().split() if 4 <= len(w) <= 8]
+    game = Game()
+    for i in range(players):
+        game.add_player(Player(UUID(int=i), f"Player {i + 1}", []))
+    for i in range(words):
+        game.add_word(game.turn_order[i % players], random.choice(dictionary))
+    game.letter_pool = [weighted_random_letter(0.5) for _ in range(15)]
+    return game
+
+
+def compare(label: str, json_encode, binary_encode, n: int):
+    json_frames, binary_frames = json_encode(), binary_encode()
+    json_size = sum(map(len, json_frames)) / len(json_frames)
+    binary_size = sum(map(len, binary_frames)) / len(binary_frames)
+    json_time = min(timeit.repeat(json_encode, number=n, repeat=5)) / n
+    binary_time = min(timeit.repeat(binary_encode, number=n, repeat=5)) / n
+    print(label)
+    print(f"  json   {json_time * 1e6:8.1f} us {json_size:8.0f} bytes per message")
+    print(f"  binary {binary_time * 1e6:8.1f} us {binary_size:8.0f} bytes per message")
+
+
+def main():
+    for players, words in [(2, 4), (4, 20), (8, 40)]:
+        game = make_game(players, words)
+        connected = list(game.turn_order)
+        compare(
+            f"game state for {players} players with {words} words",
+            lambda: list(Message.game_state_frames(game, connected, "ABCD").values()),
+            lambda: list(binary.game_state_frames(game, connected, "ABCD").values()),
+            1000,
+        )
+
+    game = make_game(4, 20)
+    version = game.version
+    game.new_letter()
+    game.next_turn()
+    patch = Message.game_patch(
+        "ABCD", version, game.version, game.changes_since(version)
+    )
+    compare(
+        "game patch (a letter and a turn)",
+        lambda: [patch.encode()],
+        lambda: [binary.encode(patch)],
+        10_000,
+    )
+    version = game.version
+    player = game.turn_order[1]
+    game.execute_anagram_strategy(
+        [(None, game.letter_pool[0]), (player, game.players[player].words[2])]
+    )
+    game.add_word(player, "example")
+    game.next_turn()
+    patch = Message.game_patch(
+        "ABCD", version, game.version, game.changes_since(version)
+    )
+    compare(
+        "game patch (a word taken)",
+        lambda: [patch.encode()],
+        lambda: [binary.encode(patch)],
+        10_000,
+    )
+
+
+if __name__ == "__main__":
+    main()
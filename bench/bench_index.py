@@ -0,0 +1,59 @@
+"""
+Compare sub-anagram queries on the anagram index against a brute-force
+scan over every word in the dictionary.
+
+Run with `uv run python bench/bench_index.py`.
+"""
+
+import random
+import time
+
+from anagrams.core.dictionary import Dictionary
+from anagrams.core.utils import sig_contains, signature, weighted_random_letter
+
+
+def main():
+    dictionary = Dictionary.load_from_file()
+    words = list(dictionary)
+    signatures = [signature(w) for w in words]
+
+    start = time.perf_counter()
+    index = dictionary.anagram_index
+    print(f"index built in {time.perf_counter() - start:.2f}s")
+    print(f"{'letters':>7} {'results':>8} {'scan':>10} {'index':>10} {'first 10':>10}")
+
+    random.seed(1234)
+    for n in [6, 10, 15, 20, 25]:
+        queries = [
+            "".join(weighted_random_letter(0.5) for _ in range(n)) for _ in range(10)
+        ]
+        scan = walk = first = 0.0
+        results = 0
+        for q in queries:
+            start = time.perf_counter()
+            sig = signature(q)
+            expected = [w for w, s in zip(words, signatures) if sig_contains(sig, s)]
+            scan += time.perf_counter() - start
+
+            start = time.perf_counter()
+            found = list(index.subanagrams(q))
+            walk += time.perf_counter() - start
+
+            start = time.perf_counter()
+            list(index.subanagrams(q, limit=10))
+            first += time.perf_counter() - start
+
+            assert sorted(found) == sorted(expected)
+            results += len(found)
+
+        def ms(t: float, n: int = len(queries)):
+            return f"{t / n * 1000:.2f} ms"
+
+        print(
+            f"{n:>7} {results // len(queries):>8} "
+            f"{ms(scan):>10} {ms(walk):>10} {ms(first):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Time recovering 10k games from the journal: from the journal alone, and
+from a snapshot with a tail of changes after it. Also times pickling the
+games for the snapshot, which happens on the event loop a chunk at a time.
+
+Run with `uv run python bench/bench_journal.py`.
+"""
+
+import asyncio
+import logging
+import pickle
+import random
+import tempfile
+import time
+from uuid import UUID
+
+from anagrams.core.dictionary import Dictionary
+from anagrams.server.game_manager import GameManager
+from anagrams.server.journal import SNAPSHOT_CHUNK, Journal
+
+GAMES = 10_000
+PER_GAME = 4
+ROUNDS = 20
+"""Letters drawn in each game (and every other one is made into a word)"""
+
+
+async def play(manager: GameManager, rng: random.Random, rounds: int):
+    for game_id, game in manager.games.items():
+        for i in range(rounds):
+            game.new_letter()
+            game.next_turn()
+            if i % 2:
+                player = rng.choice(game.turn_order)
+                letters = game.letter_pool[:3]
+                game.execute_anagram_strategy([(None, letter) for letter in letters])
+                game.add_word(player, "".join(letters))
+
+
+def recover(directory: str) -> tuple[int, float]:
+    start = time.perf_counter()
+    manager = GameManager(Dictionary(["as"]), journal=Journal(directory))
+    manager.recover()
+    return len(manager.games), time.perf_counter() - start
+
+
+async def main():
+    logging.disable(logging.INFO)
+    rng = random.Random(1234)
+    with tempfile.TemporaryDirectory() as directory:
+        manager = GameManager(Dictionary(["as"]), journal=Journal(directory))
+        manager.recover()
+        assert manager.journal is not None
+        for g in range(GAMES):
+            host = UUID(int=g * PER_GAME)
+            await manager.handle_start(host, "Host")
+            game_id = manager.player_games[host]
+            for i in range(1, PER_GAME):
+                await manager.handle_join(UUID(int=g * PER_GAME + i), game_id, str(i))
+        await play(manager, rng, ROUNDS)
+
+        start = time.perf_counter()
+        await manager.journal.flush()
+        elapsed = time.perf_counter() - start
+        records = manager.journal._records
+        print(f"wrote {records} journal records in {elapsed * 1000:.0f} ms")
+        games, elapsed = recover(directory)
+        print(f"recovered {games} games from the journal in {elapsed:.2f}s")
+
+        game_ids = list(manager.games)
+        pauses, size = [], 0
+        for i in range(0, len(game_ids), SNAPSHOT_CHUNK):
+            start = time.perf_counter()
+            chunk = {g: manager.games[g] for g in game_ids[i : i + SNAPSHOT_CHUNK]}
+            size += len(pickle.dumps(chunk, pickle.HIGHEST_PROTOCOL))
+            pauses.append(time.perf_counter() - start)
+        print(
+            f"pickled a snapshot ({size / 1e6:.1f} MB) in {sum(pauses) * 1000:.0f} ms, "
+            f"pausing for at most {max(pauses) * 1000:.1f} ms at a time"
+        )
+        await manager.journal.snapshot(manager.games)
+        await play(manager, rng, 4)
+        await manager.journal.flush()
+        games, elapsed = recover(directory)
+        print(
+            f"recovered {games} games from the snapshot and "
+            f"{manager.journal._records} more records in {elapsed:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+"""
+Time bulk "which words fit in these letters" queries on the letter matrix,
+with and without numpy.
+
+Run with `uv run python bench/bench_matrix.py`.
+"""
+
+import random
+import time
+
+from anagrams.core.dictionary import Dictionary, matrix
+from anagrams.core.utils import weighted_random_letter
+
+
+def main():
+    random.seed(1234)
+    queries = [
+        "".join(weighted_random_letter(0.5) for _ in range(random.randint(5, 25)))
+        for _ in range(512)
+    ]
+    dictionary = Dictionary.load_from_file()
+    numpy = matrix.np
+    for backend in ["numpy", "python"]:
+        if backend == "numpy" and numpy is None:
+            print("numpy is not installed")
+            continue
+        matrix.np = numpy if backend == "numpy" else None
+        m = matrix.LetterMatrix(
+            dictionary.letter_matrix.words,
+            dictionary.letter_matrix.lengths,
+            dictionary.letter_matrix.columns,
+        )
+        n = len(queries) if backend == "numpy" else 16
+
+        start = time.perf_counter()
+        m.fits(queries[0])
+        setup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = m.fits_batch(queries[:n])
+        elapsed = time.perf_counter() - start
+        print(
+            f"{backend:<7} setup {setup * 1000:7.1f} ms, "
+            f"{elapsed / n * 1000:6.2f} ms per query "
+            f"({sum(map(len, results)) // n} words per query, {len(m)} words)"
+        )
+    matrix.np = numpy
+
+
+if __name__ == "__main__":
+    main()
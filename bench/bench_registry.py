@@ -0,0 +1,101 @@
+"""
+Time the game manager's client and game registries with 100k clients in
+25k games: connecting a known client, finding the connected members of a
+game, and sweeping out abandoned games.
+
+Run with `uv run python bench/bench_registry.py`.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from uuid import uuid4
+
+from anagrams.core.dictionary import Dictionary
+from anagrams.server.game_manager import GameManager
+
+CLIENTS = 100_000
+PER_GAME = 4
+
+
+class NullWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        pass
+
+    async def close(self):
+        pass
+
+
+def timed(label: str, n: int, fn):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {elapsed / n * 1e6:>9.2f} us")
+
+
+async def main():
+    logging.disable(logging.INFO)
+    manager = GameManager(Dictionary(["as"]))
+    rng = random.Random(1234)
+
+    start = time.perf_counter()
+    clients = [uuid4() for _ in range(CLIENTS)]
+    games = []
+    for i, cid in enumerate(clients):
+        await manager.connect(NullWebSocket(), cid)  # type: ignore
+        if i % PER_GAME == 0:
+            await manager.handle_start(cid, "Host")
+            games.append(manager.player_games[cid])
+        else:
+            await manager.handle_join(cid, games[-1], f"Player {i % PER_GAME}")
+    await manager.flush()
+    elapsed = time.perf_counter() - start
+    print(f"set up {len(clients)} clients in {len(games)} games in {elapsed:.1f}s")
+
+    known = list(manager.known_clients)
+    timed(
+        "known client lookup (list, before)",
+        100,
+        lambda: rng.choice(clients) in known,
+    )
+    timed(
+        "known client lookup",
+        100_000,
+        lambda: rng.choice(clients) in manager.known_clients,
+    )
+    player_games = dict(manager.player_games)
+
+    def scan_members():
+        game_id = rng.choice(games)
+        return [
+            cid
+            for cid, gid in player_games.items()
+            if gid == game_id and manager.connected(cid)
+        ]
+
+    timed("connected members (scan, before)", 100, scan_members)
+    timed(
+        "connected members",
+        100_000,
+        lambda: manager.connected_clients_in_game(rng.choice(games)),
+    )
+
+    # disconnect everyone in half of the games, and sweep once they are abandoned
+    for game_id in games[::2]:
+        for cid in list(manager.game_members[game_id]):
+            manager.disconnect(cid)
+    now = time.monotonic()
+    timed("sweep with nothing to remove", 100, lambda: manager.sweep(now))
+    start = time.perf_counter()
+    removed, _ = manager.sweep(now + manager.abandoned_ttl)
+    elapsed = time.perf_counter() - start
+    print(f"swept {removed} abandoned games in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
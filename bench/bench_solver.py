@@ -0,0 +1,56 @@
+"""
+Time the whole-board solver on synthetic late-game boards, with and
+without a time budget.
+
+Run with `uv run python bench/bench_solver.py`.
+"""
+
+import random
+import time
+from uuid import uuid4
+
+from anagrams.core import Game, Player
+from anagrams.core.dictionary import Dictionary
+from anagrams.core.solver import find_moves
+from anagrams.core.utils import weighted_random_letter
+
+
+def synthetic_game(rng: random.Random, words: list[str], pool: int, n_words: int):
+    random.seed(rng.random())
+    game = Game()
+    game.letter_pool = [weighted_random_letter(0.5) for _ in range(pool)]
+    players = [Player(uuid4(), f"Player {i + 1}", []) for i in range(4)]
+    for player in players:
+        game.add_player(player)
+    for _ in range(n_words):
+        game.add_word(rng.choice(players).id, rng.choice(words))
+    return game, players[0]
+
+
+def main():
+    dictionary = Dictionary.load_from_file()
+    dictionary.anagram_index  # built on first use, so build it up front
+    words = [w for w in dictionary if 3 <= len(w) <= 7]
+    rng = random.Random(1234)
+
+    print(f"{'pool':>4} {'words':>5} {'moves':>6} {'all':>10} {'50 ms budget':>18}")
+    for pool, n_words in [(5, 5), (10, 10), (15, 20), (20, 30), (25, 50)]:
+        game, player = synthetic_game(rng, words, pool, n_words)
+
+        start = time.perf_counter()
+        moves = find_moves(game, dictionary, player.id, time_budget=None)
+        full = time.perf_counter() - start
+
+        game.cache.clear()  # time the search, not the cache
+        start = time.perf_counter()
+        budgeted = find_moves(game, dictionary, player.id, time_budget=0.05)
+        partial = time.perf_counter() - start
+
+        print(
+            f"{pool:>4} {n_words:>5} {len(moves):>6} {full * 1000:>7.1f} ms "
+            f"{partial * 1000:>7.1f} ms ({len(budgeted)} moves)"
+        )
+
+
+if __name__ == "__main__":
+    main()
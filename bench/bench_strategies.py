@@ -0,0 +1,111 @@
+"""
+Compare the backtracking strategy search against the original
+`itertools.combinations` search on large synthetic games.
+
+Run with `uv run python bench/bench_strategies.py`.
+"""
+
+import itertools
+import random
+import time
+from collections import Counter
+from uuid import uuid4
+
+from anagrams.core import Game, Player
+from anagrams.core.dictionary import DEFAULT_DICTIONARY_FILE
+from anagrams.core.utils import weighted_random_letter
+
+
+def legacy_strategies(game: Game, target: str):
+    def contains(word: str, sub: str):
+        w, s = Counter(word), Counter(sub)
+        return all(w[letter] >= n for letter, n in s.items())
+
+    candidates = [(None, letter) for letter in game.letter_pool if letter in target]
+    for id, player in game.players.items():
+        candidates.extend((id, w) for w in player.words if contains(target, w))
+    strategies = []
+    target_counter = Counter(target)
+    for n in range(2, len(candidates) + 1):
+        for combo in itertools.combinations(candidates, n):
+            if target_counter == Counter("".join(sub for _, sub in combo)):
+                strategies.append(combo)
+    return strategies
+
+
+def synthetic_game(rng: random.Random, words: list[str], pool: int, n_words: int):
+    """
+    Build a late-game board around a long target: most pool letters and
+    about half of the player words are drawn from the target's letters, so
+    nearly everything on the board is a search candidate.
+    """
+    random.seed(rng.random())
+    target = rng.choice([w for w in words if len(w) >= 12])
+    inside = [
+        w for w in words if 3 <= len(w) <= 5 and _fits(Counter(target), w)
+    ] or words
+    game = Game()
+    game.letter_pool = [
+        rng.choice(target) if rng.random() < 0.75 else weighted_random_letter(0.5)
+        for _ in range(pool)
+    ]
+    for i in range(4):
+        game.add_player(Player(uuid4(), f"Player {i + 1}", []))
+    players = list(game.players.values())
+    for i in range(n_words):
+        source = inside if i % 2 == 0 else words
+        game.add_word(rng.choice(players).id, rng.choice(source))
+    return game, target
+
+
+def _fits(counter: Counter, word: str):
+    return all(counter[c] >= k for c, k in Counter(word).items())
+
+
+def _key(strategy):
+    return tuple(sorted(map(repr, strategy)))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    rng = random.Random(1234)
+    with open(DEFAULT_DICTIONARY_FILE) as f:
+        words = f.read().split()
+    print(f"{'pool':>4} {'words':>5} {'legacy':>12} {'all':>12} {'first':>12}")
+    for pool, n_words, run_legacy in [
+        (8, 6, True),
+        (12, 8, True),
+        (14, 12, True),
+        (20, 20, False),
+        (20, 40, False),
+        (30, 60, False),
+    ]:
+        legacy = full = first = 0.0
+        games = [synthetic_game(rng, words, pool, n_words) for _ in range(5)]
+        for game, target in games:
+            if run_legacy:
+                t, expected = timed(legacy_strategies, game, target)
+                legacy += t
+            t, found = timed(game.get_anagram_strategies, target)
+            full += t
+            t, _ = timed(game.find_anagram_strategy, target)
+            first += t
+            if run_legacy:
+                assert {_key(s) for s in expected} == {_key(s) for s in found}
+
+        def ms(t: float, n: int = len(games)):
+            return f"{t / n * 1000:.3f} ms"
+
+        print(
+            f"{pool:>4} {n_words:>5} {ms(legacy) if run_legacy else '(skipped)':>12} "
+            f"{ms(full):>12} {ms(first):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Microbenchmarks for the core hot paths, with saved results and baseline
+comparison so that regressions get flagged.
+
+Run with `just bench` (or `uv run python bench/suite.py`), or through
+pytest with `uv run pytest bench`. Every benchmark is seeded, so runs on the
+same machine are comparable. Results are written to `bench/results.json`;
+`--save-baseline` also stores them as `bench/baseline.json`, which later
+runs are compared against. A benchmark that is more than `--threshold`
+slower than its baseline is reported as a regression (and fails the
+command, or the pytest case).
+
+The other scripts in this directory compare new implementations against
+the ones they replaced, and are run on their own.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from uuid import UUID
+
+from anagrams.core import Game, Player
+from anagrams.core.dictionary import (
+    DEFAULT_DICTIONARY_FILE,
+    Dictionary,
+    _read_words,
+    compiled,
+)
+from anagrams.core.dictionary.view import DictionaryView
+from anagrams.core.letters import TileBag, WeightedLetters
+from anagrams.core.utils import contains_anagrammed_substring, weighted_random_letter
+from anagrams.server import binary
+from anagrams.server.messages import Message
+
+SEED = 1234
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(HERE, "results.json")
+BASELINE_FILE = os.path.join(HERE, "baseline.json")
+THRESHOLD = 0.5
+"""How much slower than the baseline counts as a regression, by default"""
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[], Callable[[], object]]
+    """Prepares the benchmark and returns the operation to time"""
+    number: int = 1
+    """How many times to call the operation per round"""
+    rounds: int = 5
+    memory: bool = False
+    """Whether to also measure the peak memory allocated by one call"""
+
+    def run(self, quick: bool = False) -> dict:
+        random.seed(SEED)
+        op = self.setup()
+        number = max(self.number // 10, 1) if quick else self.number
+        rounds = min(self.rounds, 3) if quick else self.rounds
+        op()  # warm up
+        times = []
+        for _ in range(rounds):
+            gc.collect()
+            start = time.perf_counter()
+            for _ in range(number):
+                op()
+            times.append((time.perf_counter() - start) / number)
+        result = {
+            "median": statistics.median(times),
+            "min": min(times),
+            "number": number,
+            "rounds": rounds,
+        }
+        if self.memory:
+            gc.collect()
+            tracemalloc.start()
+            kept = op()  # noqa: F841 -- kept alive so it counts as allocated
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return result
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(name: str, **kwargs):
+    def register(setup: Callable[[], Callable[[], object]]):
+        BENCHMARKS.append(Benchmark(name, setup, **kwargs))
+        return setup
+
+    return register
+
+
+_words: list[str] | None = None
+
+
+def words() -> list[str]:
+    global _words
+    if _words is None:
+        with open(DEFAULT_DICTIONARY_FILE) as f:
+            _words = f.read().split()
+    return _words
+
+
+@benchmark("dictionary.build", rounds=3, memory=True)
+def _build():
+    def op():
+        return Dictionary.from_automaton(_read_words(DEFAULT_DICTIONARY_FILE, None))
+
+    return op
+
+
+@benchmark("dictionary.load_compiled", number=20, memory=True)
+def _load_compiled():
+    key = compiled.source_key(DEFAULT_DICTIONARY_FILE, None)
+    path = compiled.cache_path(DEFAULT_DICTIONARY_FILE, key)
+    if compiled.read_key(path) != key:
+        Dictionary.load_from_file()  # compiles it into the cache
+    return lambda: Dictionary.load_compiled(path)
+
+
+def _membership(hits: bool):
+    dictionary = Dictionary.load_from_file()
+    if hits:
+        queries = random.sample(words(), 10_000)
+    else:
+        queries = [w[:-1] + "q" for w in random.sample(words(), 10_000)]
+        queries = [w for w in queries if w not in dictionary]
+    return lambda: sum(w in dictionary for w in queries)
+
+
+@benchmark("dictionary.contains[hits x10k]")
+def _contains_hits():
+    return _membership(hits=True)
+
+
+@benchmark("dictionary.contains[misses x10k]")
+def _contains_misses():
+    return _membership(hits=False)
+
+
+def typo(word: str, rng: random.Random) -> str:
+    """`word` with one or two letters inserted, deleted or substituted."""
+    for _ in range(rng.choice([1, 2])):
+        i = rng.randrange(len(word))
+        c = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        word = rng.choice(
+            [
+                word[:i] + c + word[i + 1 :],
+                word[:i] + c + word[i:],
+                word[:i] + word[i + 1 :],
+            ]
+        )
+    return word
+
+
+@benchmark("dictionary.suggestions[k=2 x100]", rounds=3)
+def _suggestions():
+    dictionary = Dictionary.load_from_file()
+    rng = random.Random(SEED)
+    queries = [typo(w, rng) for w in rng.sample(words(), 100)]
+    return lambda: [dictionary.suggestions(q) for q in queries]
+
+
+@benchmark("dictionary.view.contains[hits x10k]")
+def _view_contains():
+    # the kind of view a house-rules game would use: a length filter and
+    # a short banned list, over the shared base
+    base = Dictionary.load_from_file()
+    view = DictionaryView(base, min_length=3, deny=random.sample(words(), 100))
+    queries = random.sample(words(), 10_000)
+    return lambda: sum(w in view for w in queries)
+
+
+@benchmark("dictionary.view.create", number=1000, memory=True)
+def _view_create():
+    base = Dictionary.load_from_file()
+    return lambda: DictionaryView(base, min_length=4, deny=["qi", "za"])
+
+
+@benchmark("utils.contains_anagrammed_substring[x10k]")
+def _anagrammed_substring():
+    pairs = [
+        (w, "".join(random.sample(w, len(w) // 2)))
+        for w in random.sample(words(), 10_000)
+    ]
+    return lambda: sum(contains_anagrammed_substring(w, sub) for w, sub in pairs)
+
+
+@benchmark("utils.weighted_random_letter[x10k]")
+def _random_letter():
+    return lambda: [weighted_random_letter(0.5) for _ in range(10_000)]
+
+
+@benchmark("letters.weighted.draw[x10k]")
+def _weighted_draw():
+    letters = WeightedLetters(0.5, seed=SEED)
+    return lambda: [letters.draw() for _ in range(10_000)]
+
+
+@benchmark("letters.weighted.draw_many[x10k]")
+def _weighted_draw_many():
+    letters = WeightedLetters(0.5, seed=SEED)
+    return lambda: letters.draw_many(10_000)
+
+
+@benchmark("letters.tile_bag.empty[x100]")
+def _tile_bag():
+    # a fresh bag per round, so this includes filling it
+    return lambda: [TileBag(seed=SEED).draw_many(100) for _ in range(100)]
+
+
+def synthetic_game(pool: int, n_words: int) -> tuple[Game, str]:
+    """
+    A game with `pool` letters and `n_words` words, and a long target word.
+    Most of the pool and half of the words are made of the target's
+    letters, so nearly everything on the board is a search candidate.
+    """
+    rng = random.Random(SEED + pool * 1000 + n_words)
+    random.seed(rng.random())
+    target = rng.choice([w for w in words() if len(w) >= 12])
+    inside = [
+        w
+        for w in words()
+        if 3 <= len(w) <= 5 and contains_anagrammed_substring(target, w)
+    ]
+    game = Game()
+    game.letter_pool = [
+        rng.choice(target) if rng.random() < 0.75 else weighted_random_letter(0.5)
+        for _ in range(pool)
+    ]
+    players = [UUID(int=rng.getrandbits(128)) for _ in range(4)]
+    for i, pid in enumerate(players):
+        game.add_player(Player(pid, f"Player {i + 1}", []))
+    for i in range(n_words):
+        game.add_word(rng.choice(players), rng.choice(inside if i % 2 else words()))
+    return game, target
+
+
+@benchmark("messages.game_state[8 players]", number=200)
+def _game_state():
+    game, _ = synthetic_game(20, 40)
+    for i in range(4):
+        game.add_player(Player(UUID(int=i), f"Player {i + 5}", ["rag", "gras"]))
+    connected = list(game.turn_order)
+    return lambda: [
+        Message.game_state(cid, game, connected, "ABCD").encode() for cid in connected
+    ]
+
+
+@benchmark("messages.game_state_frames[8 players]", number=200)
+def _game_state_frames():
+    game, _ = synthetic_game(20, 40)
+    for i in range(4):
+        game.add_player(Player(UUID(int=i), f"Player {i + 5}", ["rag", "gras"]))
+    connected = list(game.turn_order)
+    return lambda: Message.game_state_frames(game, connected, "ABCD")
+
+
+@benchmark("messages.binary_game_state_frames[8 players]", number=200)
+def _binary_game_state_frames():
+    game, _ = synthetic_game(20, 40)
+    for i in range(4):
+        game.add_player(Player(UUID(int=i), f"Player {i + 5}", ["rag", "gras"]))
+    connected = list(game.turn_order)
+    return lambda: binary.game_state_frames(game, connected, "ABCD")
+
+
+def _game_patch(encode: Callable[[Message], object]):
+    game, _ = synthetic_game(20, 40)
+    version = game.version
+    game.new_letter()
+    game.next_turn()
+    message = Message.game_patch(
+        "ABCD", version, game.version, game.changes_since(version)
+    )
+    return lambda: encode(message)
+
+
+@benchmark("messages.game_patch[json]", number=10_000)
+def _json_game_patch():
+    return _game_patch(Message.encode)
+
+
+@benchmark("messages.game_patch[binary]", number=10_000)
+def _binary_game_patch():
+    return _game_patch(binary.encode)
+
+
+def _strategies(pool: int, n_words: int):
+    game, target = synthetic_game(pool, n_words)
+
+    def op():
+        game.cache.clear()  # time the search, not the cache
+        return game.get_anagram_strategies(target)
+
+    return op
+
+
+for _pool, _n_words in [(8, 6), (14, 12), (20, 20), (20, 40), (30, 60)]:
+    benchmark(f"game.get_anagram_strategies[pool={_pool},words={_n_words}]", number=20)(
+        lambda pool=_pool, n_words=_n_words: _strategies(pool, n_words)
+    )
+
+
+def run(
+    names: list[str] | None = None, quick: bool = False
+) -> Iterator[tuple[str, dict]]:
+    for bench in BENCHMARKS:
+        if names and not any(n in bench.name for n in names):
+            continue
+        yield bench.name, bench.run(quick)
+
+
+def metadata() -> dict:
+    return {
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "seed": SEED,
+    }
+
+
+def load(path: str) -> dict | None:
+    try:
+        with open(path) as f:
+            return json.load(f)["results"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save(path: str, results: dict):
+    with open(path, "w") as f:
+        json.dump({"meta": metadata(), "results": results}, f, indent=2)
+        f.write("\n")
+
+
+def regression(result: dict, baseline: dict | None, threshold: float) -> str | None:
+    """Describe how `result` regressed from `baseline`, if it did."""
+    if baseline is None:
+        return None
+    problems = []
+    # the fastest round is the least affected by whatever else is running
+    if result["min"] > baseline["min"] * (1 + threshold):
+        problems.append(f"{result['min'] / baseline['min']:.2f}x slower")
+    if "peak_bytes" in result and "peak_bytes" in baseline:
+        if result["peak_bytes"] > baseline["peak_bytes"] * (1 + threshold):
+            ratio = result["peak_bytes"] / baseline["peak_bytes"]
+            problems.append(f"{ratio:.2f}x more memory")
+    return ", ".join(problems) or None
+
+
+def _format_time(seconds: float):
+    for unit, scale in [("s", 1), ("ms", 1e-3), ("us", 1e-6)]:
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit:<2}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the microbenchmark suite.")
+    parser.add_argument("names", nargs="*", help="only run benchmarks matching these")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations")
+    parser.add_argument("-o", "--output", default=RESULTS_FILE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store results as the baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=THRESHOLD,
+        help="how much slower than the baseline counts as a regression",
+    )
+    args = parser.parse_args()
+
+    baseline = load(args.baseline) or {}
+    results = {}
+    regressions = 0
+    for name, result in run(args.names, args.quick):
+        results[name] = result
+        line = f"{name:<52} {_format_time(result['median'])}"
+        if "peak_bytes" in result:
+            line += f" {result['peak_bytes'] / 1e6:8.1f} MB"
+        if name in baseline:
+            line += f"  ({result['min'] / baseline[name]['min']:.2f}x baseline)"
+        if problem := regression(result, baseline.get(name), args.threshold):
+            line += f"  REGRESSION: {problem}"
+            regressions += 1
+        print(line, flush=True)
+
+    save(args.output, results)
+    if args.save_baseline:
+        save(args.baseline, results)
+        print(f"Saved baseline to {args.baseline}")
+    if regressions and not args.save_baseline:
+        sys.exit(f"{regressions} benchmarks regressed")
+
+
+if __name__ == "__main__":
+    main()
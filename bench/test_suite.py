@@ -0,0 +1,26 @@
+"""
+Run the benchmark suite through pytest (`uv run pytest bench`), failing
+any benchmark that regressed from `bench/baseline.json`.
+"""
+
+import pytest
+import suite
+
+
+@pytest.fixture(scope="module")
+def results():
+    results = {}
+    yield results
+    suite.save(suite.RESULTS_FILE, results)
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return suite.load(suite.BASELINE_FILE) or {}
+
+
+@pytest.mark.parametrize("bench", suite.BENCHMARKS, ids=lambda b: b.name)
+def test_benchmark(bench: suite.Benchmark, results: dict, baseline: dict):
+    results[bench.name] = result = bench.run()
+    problem = suite.regression(result, baseline.get(bench.name), suite.THRESHOLD)
+    assert problem is None, f"{bench.name} regressed: {problem}"
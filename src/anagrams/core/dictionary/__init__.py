@@ -1,102 +1,203 @@
 import os
 import re
-from typing import Iterable
-
-
-class TrieNode:  # TODO needs tests but i think it works
-    def __init__(self, terminal: bool = False) -> None:
-        self.children: dict[str, TrieNode] = {}
-        self.terminal: bool = terminal
-
-    def add(self, value: str):
-        if value == "":
-            self.terminal = True
-            return
-        i = 0
-        for k in self.children.keys():
-            if k[0] == value[0]:
-                terminal = False
-                while k[i] == value[i]:
-                    i += 1
-                    if i == len(k):
-                        self.children[k].add(value.removeprefix(k))
-                        return
-                    if i == len(value):
-                        terminal = True
-                        break
-                branch = TrieNode(terminal)
-                existing_word = self.children.pop(k)
-                common_prefix = k[:i]
-                existing_suffix = k[i:]
-                new_suffix = value[i:]
-
-                self.children[common_prefix] = branch
-                branch.children[existing_suffix] = existing_word
-                if not terminal:
-                    branch.children[new_suffix] = TrieNode(True)
-
-                break
-        else:
-            self.children[value] = TrieNode(True)
-
-    def __contains__(self, value: str):
-        if not isinstance(value, str):
-            return False
-        if value == "":
-            return self.terminal
-        i = 0
-        for k in self.children.keys():
-            if k[0] == value[0]:
-                while k[i] == value[i]:
-                    i += 1
-                    if i == len(k):
-                        return self.children[k].__contains__(value[i:])
-                    if i == len(value):
-                        return False
-                return False
-        return False
+from collections.abc import Callable, Iterable
+from functools import cached_property
+from itertools import islice
 
+from ..utils import edit_distance
+from . import compiled
+from .automaton import Automaton
+from .index import AnagramIndex
+from .matrix import LetterMatrix
 
 DEFAULT_DICTIONARY_FILE = os.path.join(os.path.split(__file__)[0], "scrabble.txt")
 
 
+def _read_words(filepath: str, pattern: str | None) -> Automaton:
+    rgx = None
+    if pattern is not None:
+        rgx = re.compile(pattern)
+
+    def _iter():
+        with open(filepath) as f:
+            if rgx is None:
+                for line in f:
+                    yield line.strip()
+            else:
+                for line in f:
+                    line = line.strip()
+                    if rgx.fullmatch(line) is not None:
+                        yield line
+
+    try:
+        # word lists are normally sorted already, which lets the
+        # automaton be built without holding every word in memory
+        return Automaton.build(_iter())
+    except ValueError:
+        return Automaton.build(sorted(set(_iter())))
+
+
+def compile_dictionary(
+    filepath: str = DEFAULT_DICTIONARY_FILE,
+    pattern: str | None = None,
+    output: str | None = None,
+) -> str:
+    """
+    Compile a word list to the binary dictionary format and return the
+    path it was written to. By default, the compiled dictionary is written
+    to the cache location that `Dictionary.load_from_file` checks.
+    """
+    key = compiled.source_key(filepath, pattern)
+    if output is None:
+        output = compiled.cache_path(filepath, key)
+    compiled.write(_read_words(filepath, pattern), output, key)
+    return output
+
+
+def _restore(load: Callable[..., "Dictionary"], args: tuple, extra: list[str]):
+    dictionary = load(*args)
+    for word in extra:
+        dictionary.add_word(word)
+    return dictionary
+
+
 class Dictionary:
+    """
+    An immutable set of words, stored as a minimized automaton.
+
+    Words added after construction with `add_word` are kept in a small
+    overlay set on top of the automaton.
+
+    A dictionary loaded from a file is pickled as where it was loaded from,
+    so that other processes load (or memory-map) it themselves rather than
+    receiving every word.
+    """
+
     def __init__(self, words: Iterable[str] | None = None) -> None:
-        self.root = TrieNode()
-        self._size = 0
-        for word in words or []:
-            self.add_word(word)
+        self.automaton = Automaton.build(sorted(set(words or [])))
+        self._extra: set[str] = set()
+        self._matrix: LetterMatrix | None = None
+        self._source: tuple[Callable[..., "Dictionary"], tuple] | None = None
+
+    def __reduce__(self):
+        if self._source is None:
+            return (Dictionary, (list(self),))
+        return (_restore, (*self._source, sorted(self._extra)))
 
     @classmethod
     def load_from_file(
         cls,
         filepath: str = DEFAULT_DICTIONARY_FILE,
         pattern: str | None = None,
+        cache: bool = True,
     ):
-        rgx = None
-        if pattern is not None:
-            rgx = re.compile(pattern)
-
-        def _iter():
-            with open(filepath) as f:
-                if rgx is None:
-                    for line in f:
-                        yield line.strip()
-                else:
-                    for line in f:
-                        line = line.strip()
-                        if rgx.fullmatch(line) is not None:
-                            yield line
-
-        return Dictionary(_iter())
+        """
+        Load the words in `filepath` (one per line) that fully match
+        `pattern`.
+
+        If `cache` is set, the dictionary is memory-mapped from a compiled
+        copy in the cache directory, which is (re)built whenever the word
+        list or the pattern changes.
+        """
+        dictionary = cls._load(filepath, pattern, cache)
+        dictionary._source = (cls.load_from_file, (filepath, pattern, cache))
+        return dictionary
+
+    @classmethod
+    def _load(cls, filepath: str, pattern: str | None, cache: bool):
+        if not cache:
+            return cls.from_automaton(_read_words(filepath, pattern))
+
+        key = compiled.source_key(filepath, pattern)
+        path = compiled.cache_path(filepath, key)
+        if compiled.read_key(path) == key:
+            try:
+                return cls.load_compiled(path)
+            except (OSError, ValueError):
+                pass  # unreadable, so rebuild it
+
+        automaton = _read_words(filepath, pattern)
+        try:
+            compiled.write(automaton, path, key)
+            compiled.remove_stale(path)
+        except OSError:
+            pass  # caching is best-effort
+        return cls.from_automaton(automaton)
+
+    @classmethod
+    def load_compiled(cls, path: str):
+        """Memory-map a dictionary compiled with `compile_dictionary`."""
+        dictionary = cls.from_automaton(*compiled.load(path))
+        dictionary._source = (cls.load_compiled, (path,))
+        return dictionary
+
+    @classmethod
+    def from_automaton(cls, automaton: Automaton, matrix: LetterMatrix | None = None):
+        dictionary = cls.__new__(cls)
+        dictionary.automaton = automaton
+        dictionary._extra = set()
+        dictionary._matrix = matrix
+        dictionary._source = None
+        return dictionary
+
+    @cached_property
+    def anagram_index(self) -> AnagramIndex:
+        """An index of the words by anagram class, built on first use."""
+        return AnagramIndex(self)
+
+    @property
+    def letter_matrix(self) -> LetterMatrix:
+        """
+        The letter counts of every word, for bulk "which words fit in these
+        letters" queries. Compiled dictionaries come with this precomputed,
+        otherwise it is built on first use.
+        """
+        if self._matrix is None:
+            words = self.automaton if not self._extra else list(self)
+            self._matrix = LetterMatrix(words)
+        return self._matrix
+
+    def suggestions(
+        self,
+        word: str,
+        max_distance: int = 2,
+        limit: int | None = 3,
+        accept: Callable[[str], bool] | None = None,
+    ) -> list[str]:
+        """
+        The words (other than `word`) at most `max_distance` edits away from
+        `word`, for "did you mean" hints: the closest first, then those
+        nearest its length, then alphabetically. Only words that pass
+        `accept` are suggested, if it's given.
+        """
+        found = self.automaton.within_distance(word, max_distance)
+        for extra in self._extra:
+            distance = edit_distance(word, extra)
+            if distance <= max_distance:
+                found.append((extra, distance))
+        found.sort(key=lambda f: (f[1], abs(len(f[0]) - len(word)), f[0]))
+        words = (w for w, d in found if d > 0 and (accept is None or accept(w)))
+        return list(islice(words, limit))
 
     def add_word(self, word: str):
         if word not in self:
-            self.root.add(word)
-            self._size += 1
+            self._extra.add(word)
+            self.__dict__.pop("anagram_index", None)
+            self._matrix = None
+
+    def contains_many(self, words: Iterable[str]) -> list[bool]:
+        """Whether each of `words` is in the dictionary."""
+        automaton, extra = self.automaton, self._extra
+        return [word in automaton or word in extra for word in words]
 
     def __contains__(self, word: str):
-        return word in self.root
+        if word in self.automaton:
+            return True
+        return isinstance(word, str) and word in self._extra
+
+    def __iter__(self):
+        yield from self.automaton
+        yield from sorted(self._extra)
 
     def __len__(self):
-        return self._size
+        return len(self.automaton) + len(self._extra)
@@ -0,0 +1,325 @@
+"""
+A minimized acyclic automaton (a.k.a. DAWG) over a set of words.
+
+The automaton is stored in flat arrays instead of a Python object per
+node. The outgoing edges of node `n` occupy positions
+`first[n]:first[n + 1]` of `labels` (one byte per edge, sorted) and
+`targets` (the node each edge leads to), and `final[n]` is nonzero if a
+word ends at node `n`. Words are spelled out in UTF-8, which sorts the
+same way as the words themselves, so a letter outside ASCII takes a few
+edges. The arrays can be anything that supports indexing (and `find`, for
+`labels`), including views into a memory-mapped file.
+"""
+
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from mmap import mmap
+
+_BYTES = [bytes([i]) for i in range(256)]
+
+
+class _Node:
+    __slots__ = ("final", "edges", "id")
+
+    def __init__(self) -> None:
+        self.final = False
+        self.edges: list[tuple[int, _Node]] = []
+        self.id = -1
+
+
+class Automaton:
+    def __init__(
+        self,
+        first: Sequence[int],
+        labels: bytes | mmap,
+        targets: Sequence[int],
+        final: Sequence[int],
+        size: int,
+        counts: Sequence[int] | None = None,
+    ) -> None:
+        self.first = first
+        self.labels = labels
+        self.targets = targets
+        self.final = final
+        self.root = len(final) - 1
+        self._size = size
+        self._counts = counts
+
+    @classmethod
+    def build(cls, sorted_words: Iterable[str]) -> "Automaton":
+        """
+        Build a minimized automaton in a single pass over `sorted_words`.
+        Raises a `ValueError` if the words are not in sorted order.
+        """
+        # incremental construction for sorted input (Daciuk et al., 2000):
+        # the path of the previous word stays unchecked until the next word
+        # diverges from it, at which point its suffix is minimized by
+        # merging nodes with identical right languages through `register`
+        first = array("I", [0])
+        labels = bytearray()
+        targets = array("I")
+        final = bytearray()
+        register: dict[tuple, _Node] = {}
+
+        def freeze(node: _Node):
+            key = (node.final, *((label, child.id) for label, child in node.edges))
+            existing = register.get(key)
+            if existing is not None:
+                return existing
+            node.id = len(final)
+            for label, child in node.edges:
+                labels.append(label)
+                targets.append(child.id)
+            first.append(len(labels))
+            final.append(node.final)
+            register[key] = node
+            return node
+
+        def minimize(path: list[_Node], depth: int):
+            while len(path) > depth + 1:
+                child = freeze(path.pop())
+                parent = path[-1]
+                parent.edges[-1] = (parent.edges[-1][0], child)
+
+        path = [_Node()]
+        prev: bytes | None = None
+        size = 0
+        for word in sorted_words:
+            data = word.encode()
+            if prev is not None and data <= prev:
+                if data == prev:
+                    continue
+                raise ValueError(f"words are not sorted ({word!r} after {prev!r})")
+            common = 0
+            for a, b in zip(data, prev or b""):
+                if a != b:
+                    break
+                common += 1
+            minimize(path, common)
+            for c in data[common:]:
+                node = _Node()
+                path[-1].edges.append((c, node))
+                path.append(node)
+            path[-1].final = True
+            prev = data
+            size += 1
+        minimize(path, 0)
+        root = path[0]
+        for label, child in root.edges:
+            labels.append(label)
+            targets.append(child.id)
+        first.append(len(labels))
+        final.append(root.final)
+
+        return cls(first, bytes(labels), targets, bytes(final), size)
+
+    def __contains__(self, word: object) -> bool:
+        if not isinstance(word, str):
+            return False
+        try:
+            data = word.encode()
+        except UnicodeEncodeError:
+            return False
+        first, labels, targets = self.first, self.labels, self.targets
+        node = self.root
+        for c in data:
+            i = labels.find(_BYTES[c], first[node], first[node + 1])
+            if i < 0:
+                return False
+            node = targets[i]
+        return self.final[node] != 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the words in sorted order."""
+        first, labels, targets, final = (
+            self.first,
+            self.labels,
+            self.targets,
+            self.final,
+        )
+        prefix = bytearray()
+        stack = [[self.root, first[self.root]]]
+        if final[self.root]:
+            yield ""
+        while stack:
+            top = stack[-1]
+            node, i = top
+            if i == first[node + 1]:
+                stack.pop()
+                if prefix:
+                    prefix.pop()
+                continue
+            top[1] = i + 1
+            child = targets[i]
+            prefix.append(labels[i])
+            if final[child]:
+                yield prefix.decode()
+            stack.append([child, first[child]])
+
+    def within_distance(self, word: str, k: int) -> list[tuple[str, int]]:
+        """
+        The words at most `k` edits (insertions, deletions or substitutions
+        of a letter) away from `word`, with their edit distances, in sorted
+        order. Letters outside ASCII are edited a UTF-8 byte at a time.
+        """
+        # a walk that carries the last row of the edit distance table from
+        # `word` to the path so far (a state of a Levenshtein automaton for
+        # `word`), and gives up on a path once every entry is more than `k`.
+        # Only the letters of `word` near the current position can keep a
+        # path alive, so when any other letter would end it, only the edges
+        # for those few letters are followed.
+        try:
+            target = word.encode()
+        except UnicodeEncodeError:
+            return []
+        first, labels, targets, final = (
+            self.first,
+            self.labels,
+            self.targets,
+            self.final,
+        )
+        n = len(target)
+        over = k + 1
+        # states are numbered, and `rows[s]` is the depth and row of state
+        # `s`, `distance[s]` its last entry and `moves[s]` the states that
+        # the letters near its position lead to (if they don't end the
+        # path), and the one any other letter does (or -1)
+        rows: list[tuple[int, tuple[int, ...]]] = []
+        numbers: dict[tuple, int] = {}
+        distance: list[int] = []
+        moves: list[tuple[dict[int, int], int] | None] = []
+
+        def number(depth: int, row: tuple[int, ...]) -> int:
+            state = numbers.get((depth, row))
+            if state is None:
+                state = numbers[depth, row] = len(rows)
+                rows.append((depth, row))
+                distance.append(row[n])
+                moves.append(None)
+            return state
+
+        def step(state: int, c: int) -> int:
+            depth, row = rows[state]
+            depth += 1
+            if depth > n + k:
+                return -1
+            lo, hi = max(1, depth - k), min(n, depth + k)
+            new = [over] * (n + 1)
+            if depth <= k:
+                new[0] = depth
+            for j in range(lo, hi + 1):
+                d = min(row[j - 1] + (target[j - 1] != c), row[j] + 1, new[j - 1] + 1)
+                new[j] = min(d, over)
+            if min(new[lo - 1 : hi + 1]) > k:
+                return -1
+            return number(depth, tuple(new))
+
+        def expand(state: int) -> tuple[dict[int, int], int]:
+            depth = rows[state][0]
+            near = {}
+            for c in set(target[max(0, depth - k) : depth + k + 1]):
+                if (after := step(state, c)) >= 0:
+                    near[c] = after
+            result = moves[state] = near, step(state, -1)
+            return result
+
+        found = []
+        start = number(0, tuple(min(j, over) for j in range(n + 1)))
+        if final[self.root] and distance[start] <= k:
+            found.append(("", distance[start]))
+        stack = [(self.root, start, b"")]
+        while stack:
+            node, state, prefix = stack.pop()
+            near, other = moves[state] or expand(state)
+            lo, hi = first[node], first[node + 1]
+            if other >= 0:
+                edges = [
+                    (i, labels[i], near.get(labels[i], other)) for i in range(lo, hi)
+                ]
+            elif hi - lo <= len(near):
+                edges = [(i, labels[i], near.get(labels[i], -1)) for i in range(lo, hi)]
+            else:
+                edges = [
+                    (i, c, after)
+                    for c, after in near.items()
+                    if (i := labels.find(_BYTES[c], lo, hi)) >= 0
+                ]
+            for i, c, after in edges:
+                if after < 0:
+                    continue
+                child = targets[i]
+                word_so_far = prefix + _BYTES[c]
+                if final[child] and distance[after] <= k:
+                    found.append((word_so_far.decode(), distance[after]))
+                # only go on if some letter could follow
+                more, other_after = moves[after] or expand(after)
+                if more or other_after >= 0:
+                    stack.append((child, after, word_so_far))
+        found.sort()
+        return found
+
+    def word_counts(self) -> Sequence[int]:
+        """
+        The number of words accepted from each node. This is what it takes to
+        turn a path through the automaton into the rank of the word it spells.
+        """
+        if self._counts is not None:
+            return self._counts
+        first, targets, final = self.first, self.targets, self.final
+        counts = array("I", bytes(4 * self.num_nodes))
+        # nodes are numbered so that every child comes before its parents
+        for node in range(self.num_nodes):
+            n = final[node] != 0
+            for i in range(first[node], first[node + 1]):
+                n += counts[targets[i]]
+            counts[node] = n
+        self._counts = counts
+        return counts
+
+    def __getitem__(self, rank: int) -> str:
+        """The word at position `rank` in sorted order."""
+        if rank < 0:
+            rank += self._size
+        if not 0 <= rank < self._size:
+            raise IndexError(rank)
+        first, labels, targets, final = (
+            self.first,
+            self.labels,
+            self.targets,
+            self.final,
+        )
+        counts = self.word_counts()
+        node = self.root
+        word = bytearray()
+        while True:
+            if final[node]:
+                if rank == 0:
+                    return word.decode()
+                rank -= 1
+            for i in range(first[node], first[node + 1]):
+                n = counts[targets[i]]
+                if rank < n:
+                    word.append(labels[i])
+                    node = targets[i]
+                    break
+                rank -= n
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.final)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.targets)
+
+    def nbytes(self) -> int:
+        """The memory taken up by the automaton's arrays."""
+        return (
+            self.first.itemsize * len(self.first)
+            + self.num_edges
+            + self.targets.itemsize * len(self.targets)
+            + len(self.final)
+        )
@@ -0,0 +1,178 @@
+"""
+A versioned binary format for compiled dictionaries.
+
+A compiled dictionary is an `Automaton` written out as-is, so that it can
+be memory-mapped and queried without building any per-word objects, along
+with the word counts and letter matrix derived from it. The file is laid
+out as:
+
+    labels   num_edges bytes
+    final    num_nodes bytes
+    padding  to a multiple of 4 bytes
+    first    num_nodes + 1 little-endian uint32s
+    targets  num_edges little-endian uint32s
+    counts   num_nodes little-endian uint32s (see `Automaton.word_counts`)
+    lengths  num_words bytes
+    columns  26 * num_words bytes (see `LetterMatrix`)
+    trailer  see `_TRAILER`
+
+`labels` comes first so that positions in the mapped file are also edge
+indices, and the trailer comes last so that every section can be written
+in a single pass.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+
+from .automaton import Automaton
+from .matrix import LetterMatrix, count_columns
+
+MAGIC = b"ANAGDAWG"
+FORMAT_VERSION = 2
+
+# magic, format version, source key, num_nodes, num_edges, num_words
+_TRAILER = struct.Struct("<8sI32sIII")
+
+
+def source_key(filepath: str, pattern: str | None) -> bytes:
+    """
+    A digest of everything a compiled dictionary depends on: the contents
+    of the source word list, the pattern used to filter it, and the format
+    version.
+    """
+    h = hashlib.sha256()
+    h.update(struct.pack("<I", FORMAT_VERSION))
+    h.update(b"\0" if pattern is None else b"\1" + pattern.encode())
+    with open(filepath, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.digest()
+
+
+def cache_dir() -> str:
+    """Where compiled dictionaries are cached (`$ANAGRAMS_CACHE_DIR`)."""
+    if path := os.environ.get("ANAGRAMS_CACHE_DIR"):
+        return path
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join("~", ".cache")
+    return os.path.join(os.path.expanduser(base), "anagrams")
+
+
+def cache_path(filepath: str, key: bytes) -> str:
+    """The cache location of the compiled form of `filepath`."""
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    return os.path.join(cache_dir(), f"{stem}-{key.hex()[:16]}.dawg")
+
+
+def remove_stale(path: str):
+    """
+    Delete the other cached compiled forms of the word list that `path` is
+    the cached form of, which were compiled from older versions of it (or
+    with other patterns).
+    """
+    directory, name = os.path.split(path)
+    stem = name.rsplit("-", 1)[0]
+    stale = re.compile(re.escape(stem) + r"-[0-9a-f]{16}\.dawg")
+    for other in os.listdir(directory):
+        if other != name and stale.fullmatch(other):
+            try:
+                os.unlink(os.path.join(directory, other))
+            except OSError:
+                pass  # someone else got there first
+
+
+def write(automaton: Automaton, path: str, key: bytes = bytes(32)):
+    """
+    Write `automaton` to `path`. The file is written to a temporary file
+    first and moved into place, so readers never see a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(automaton.labels[: automaton.num_edges])
+            f.write(automaton.final)
+            f.write(bytes(-f.tell() % 4))
+            for values in (
+                automaton.first,
+                automaton.targets,
+                automaton.word_counts(),
+            ):
+                f.write(struct.pack(f"<{len(values)}I", *values))
+            lengths, columns = count_columns(automaton)
+            f.write(lengths)
+            f.write(columns)
+            f.write(
+                _TRAILER.pack(
+                    MAGIC,
+                    FORMAT_VERSION,
+                    key,
+                    automaton.num_nodes,
+                    automaton.num_edges,
+                    len(automaton),
+                )
+            )
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def read_key(path: str) -> bytes | None:
+    """The source key of a compiled dictionary, or `None` if it is unreadable."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(-_TRAILER.size, os.SEEK_END)
+            magic, version, key, *_ = _TRAILER.unpack(f.read(_TRAILER.size))
+    except (OSError, struct.error):
+        return None
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    return key
+
+
+def load(path: str) -> tuple[Automaton, LetterMatrix]:
+    """
+    Memory-map a compiled dictionary and its letter matrix. Raises a
+    `ValueError` if the file is not a compiled dictionary in the current
+    format.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(buffer) < _TRAILER.size:
+        raise ValueError(f"{path} is not a compiled dictionary")
+    magic, version, _, num_nodes, num_edges, size = _TRAILER.unpack_from(
+        buffer, len(buffer) - _TRAILER.size
+    )
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a compiled dictionary")
+    if version != FORMAT_VERSION:
+        raise ValueError(
+            f"{path} uses format version {version} (expected {FORMAT_VERSION})"
+        )
+    if sys.byteorder != "little":
+        raise ValueError("compiled dictionaries are only supported on little-endian")
+
+    view = memoryview(buffer)
+    offset = num_edges + num_nodes
+    offset += -offset % 4
+
+    def section(length: int):
+        nonlocal offset
+        offset += length
+        return view[offset - length : offset]
+
+    first = section(4 * (num_nodes + 1)).cast("I")
+    targets = section(4 * num_edges).cast("I")
+    counts = section(4 * num_nodes).cast("I")
+    lengths = section(size)
+    columns = section(26 * size)
+    final = view[num_edges : num_edges + num_nodes]
+    automaton = Automaton(first, buffer, targets, final, size, counts)
+    return automaton, LetterMatrix(automaton, lengths, columns)
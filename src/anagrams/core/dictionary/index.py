@@ -0,0 +1,164 @@
+"""
+An index of words by anagram class, for "what can be made from these
+letters" queries.
+
+Every word is keyed by its letters in sorted order, so anagrams share a
+key. The keys are stored in an `Automaton`, where each path spells out a
+letter histogram and its depth is the word length. Because keys are
+sorted, a walk that only follows edges for letters still left in the query
+visits exactly the histograms that fit inside the query, and never the
+words that don't.
+
+Words are stored in one string, grouped by key in key order. The rank of a
+key in the automaton is the index of its group.
+"""
+
+from array import array
+from collections.abc import Iterable, Iterator
+from itertools import islice
+
+from ..utils import Signature, letters_signature, signature_counts
+from .automaton import Automaton
+
+
+def anagram_key(word: str) -> str:
+    """The letters of `word`, in sorted order."""
+    return "".join(sorted(word))
+
+
+class AnagramIndex:
+    def __init__(self, words: Iterable[str]) -> None:
+        entries = sorted((anagram_key(w), w) for w in words)
+        self.keys = Automaton.build(key for key, _ in entries)
+        self._counts = self.keys.word_counts()
+
+        # word i is _words[_starts[i]:_starts[i + 1] - 1], and the words
+        # with the key of rank r are numbered _groups[r]:_groups[r + 1]
+        self._words = "".join(w + "\n" for _, w in entries)
+        self._starts = array("I", [0])
+        self._groups = array("I")
+        prev = None
+        for i, (key, w) in enumerate(entries):
+            self._starts.append(self._starts[-1] + len(w) + 1)
+            if key != prev:
+                self._groups.append(i)
+                prev = key
+        self._groups.append(len(entries))
+        self.max_length = max((len(key) for key, _ in entries), default=0)
+        """The length of the longest word in the index"""
+
+    def __len__(self):
+        return len(self._starts) - 1
+
+    def _group(self, rank: int) -> Iterator[str]:
+        words, starts = self._words, self._starts
+        for i in range(self._groups[rank], self._groups[rank + 1]):
+            yield words[starts[i] : starts[i + 1] - 1]
+
+    def anagrams(self, word: str) -> list[str]:
+        """All of the words that are anagrams of `word` (including itself)."""
+        keys = self.keys
+        first, labels, targets, final = (
+            keys.first,
+            keys.labels,
+            keys.targets,
+            keys.final,
+        )
+        node, rank = keys.root, 0
+        for c in anagram_key(word).encode(errors="replace"):
+            if final[node]:
+                rank += 1
+            for i in range(first[node], first[node + 1]):
+                if labels[i] == c:
+                    node = targets[i]
+                    break
+                rank += self._counts[targets[i]]
+            else:
+                return []
+        if not final[node]:
+            return []
+        return list(self._group(rank))
+
+    def subanagrams(
+        self,
+        letters: str | Signature,
+        min_length: int = 1,
+        max_length: int | None = None,
+        required: str | Signature | None = None,
+        limit: int | None = None,
+    ) -> Iterator[str]:
+        """
+        Stream the words that can be made from (a subset of) `letters`,
+        which can be a string or a signature. Only words between
+        `min_length` and `max_length` letters long that use every letter in
+        `required` are included, and at most `limit` of them are returned.
+        Words come in order of their sorted letters.
+        """
+        if isinstance(letters, str):
+            letters = letters_signature(letters)
+        if isinstance(required, str):
+            required = letters_signature(required)
+        results = self._walk(
+            signature_counts(letters),
+            signature_counts(required or 0),
+            min_length,
+            max_length,
+        )
+        if limit is not None:
+            return islice(results, limit)
+        return results
+
+    def _walk(
+        self,
+        available: list[int],
+        required: list[int],
+        min_length: int,
+        max_length: int | None,
+    ) -> Iterator[str]:
+        keys, counts = self.keys, self._counts
+        first, labels, targets, final = (
+            keys.first,
+            keys.labels,
+            keys.targets,
+            keys.final,
+        )
+        if max_length is None or max_length > self.max_length:
+            max_length = self.max_length
+        missing = sum(required)
+
+        def lowest_required(start: int):
+            for i in range(start, 26):
+                if required[i]:
+                    return i
+            return 26
+
+        def walk(node: int, rank: int, depth: int, lowest: int) -> Iterator[str]:
+            # keys are sorted, so once we pass the lowest required letter,
+            # nothing below this node can contain it
+            nonlocal missing
+            if final[node]:
+                if depth >= min_length and missing == 0:
+                    yield from self._group(rank)
+                rank += 1
+            if depth + max(missing, 1) > max_length:
+                return
+            for i in range(first[node], first[node + 1]):
+                child = targets[i]
+                letter = labels[i] - 97
+                if letter > lowest or letter >= 26:
+                    return
+                # keys with anything but a-z can't be made from the letters
+                if letter >= 0 and available[letter]:
+                    available[letter] -= 1
+                    if letter == lowest:
+                        required[letter] -= 1
+                        missing -= 1
+                        yield from walk(child, rank, depth + 1, lowest_required(letter))
+                        required[letter] += 1
+                        missing += 1
+                    else:
+                        yield from walk(child, rank, depth + 1, lowest)
+                    available[letter] += 1
+                rank += counts[child]
+
+        return walk(keys.root, 0, 0, lowest_required(0))
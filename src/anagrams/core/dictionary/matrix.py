@@ -0,0 +1,153 @@
+"""
+A words-by-letters count matrix, for checking many letter multisets
+against the whole dictionary at once.
+
+Row `i` of the matrix holds the letter counts of the `i`th word in sorted
+order, and the matrix is stored one letter column after another. With
+numpy, each column is turned into packed bitsets of the words with at
+least 1, 2, 3... of that letter, so the words that don't fit in a query are
+the union of 26 bitsets, one per letter. Without numpy, the same queries
+fall back to comparing packed signatures.
+
+Words with anything but the letters a-z can't be made from tiles, so their
+rows are left empty, with a length of 0, and never fit.
+"""
+
+from collections.abc import Iterable, Sequence
+
+from ..utils import (
+    ALPHABET,
+    Signature,
+    letters_signature,
+    sig_contains,
+    signature_counts,
+)
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+_LETTERS = frozenset(ALPHABET)
+
+
+def count_columns(words: Iterable[str]) -> tuple[bytearray, bytearray]:
+    """
+    Count the letters of `words`, returning their lengths (one byte per
+    word) and their counts (one column of bytes per letter, concatenated).
+    """
+    words = list(words)
+    n = len(words)
+    lengths = bytearray(n)
+    columns = bytearray(26 * n)
+    offsets = {letter: i * n for i, letter in enumerate(ALPHABET)}
+    for row, word in enumerate(words):
+        if not _LETTERS.issuperset(word):
+            continue  # never fits
+        lengths[row] = min(len(word), 255)
+        for letter in word:
+            pos = offsets[letter] + row
+            columns[pos] = min(columns[pos] + 1, 255)
+    return lengths, columns
+
+
+class LetterMatrix:
+    def __init__(
+        self,
+        words: Sequence[str],
+        lengths: Sequence[int] | None = None,
+        columns: Sequence[int] | None = None,
+    ) -> None:
+        """
+        Wrap the count matrix of `words`, computing it if the lengths and
+        letter columns aren't given (for example, when they come from a
+        compiled dictionary).
+        """
+        self.words = words
+        if lengths is None or columns is None:
+            lengths, columns = count_columns(words)
+        self.lengths = lengths
+        self.columns = columns
+        self._arrays = None
+        self._long_enough = {}
+        self._signatures: list[Signature] | None = None
+
+    def __len__(self):
+        return len(self.words)
+
+    def _numpy(self, min_length: int):
+        if self._arrays is None:
+            n = len(self.words)
+            columns = np.frombuffer(self.columns, dtype=np.uint8, count=26 * n)
+            columns = columns.reshape(26, n)
+            # too_many[letter, k] has a bit set for each word that has more
+            # than k of that letter; the last row is for k >= the max count
+            depth = int(columns.max(initial=0)) + 1
+            too_many = np.zeros((26, depth, (n + 7) // 8), dtype=np.uint8)
+            for letter in range(26):
+                for k in range(depth - 1):
+                    too_many[letter, k] = np.packbits(columns[letter] > k)
+            self._arrays = too_many
+            self._long_enough = {}
+        if min_length not in self._long_enough:
+            lengths = np.frombuffer(self.lengths, dtype=np.uint8, count=len(self))
+            self._long_enough[min_length] = np.packbits(lengths >= min_length)
+        return self._arrays, self._long_enough[min_length]
+
+    def fits(self, letters: str | Signature, min_length: int = 1) -> Sequence[int]:
+        """The rows of the words that can be made from `letters`."""
+        return self.fits_batch([letters], min_length)[0]
+
+    def fits_batch(
+        self,
+        batch: Sequence[str | Signature],
+        min_length: int = 1,
+        chunk_size: int = 64,
+    ) -> list[Sequence[int]]:
+        """
+        For each multiset of letters in `batch`, the rows of the words at
+        least `min_length` letters long that can be made from them. Rows come
+        back as numpy arrays when numpy is installed, and as lists otherwise.
+        """
+        sigs = [
+            letters_signature(letters) if isinstance(letters, str) else letters
+            for letters in batch
+        ]
+        min_length = max(min_length, 1)  # words that never fit have length 0
+        if np is None:
+            lengths = self.lengths
+            return [
+                [i for i in self._fits_python(sig) if lengths[i] >= min_length]
+                for sig in sigs
+            ]
+        results = []
+        for start in range(0, len(sigs), chunk_size):
+            results.extend(
+                self._fits_numpy(sigs[start : start + chunk_size], min_length)
+            )
+        return results
+
+    def _fits_python(self, sig: Signature) -> list[int]:
+        if self._signatures is None:
+            self._signatures = [
+                letters_signature(w) if _LETTERS.issuperset(w) else -1
+                for w in self.words
+            ]
+        return [
+            i for i, s in enumerate(self._signatures) if s >= 0 and sig_contains(sig, s)
+        ]
+
+    def _fits_numpy(self, sigs: list[Signature], min_length: int):
+        too_many, long_enough = self._numpy(min_length)
+        depth = too_many.shape[1]
+        counts = np.array([signature_counts(sig) for sig in sigs], dtype=np.int64)
+        counts = np.minimum(counts, depth - 1)
+        misfits = np.zeros((len(sigs), too_many.shape[2]), dtype=np.uint8)
+        for letter in range(26):
+            misfits |= too_many[letter, counts[:, letter]]
+        fits = np.unpackbits(~misfits & long_enough, axis=1, count=len(self.words))
+        return [np.flatnonzero(row) for row in fits]
+
+    def words_at(self, rows: Iterable[int]) -> list[str]:
+        """The words in the given rows."""
+        return [self.words[int(i)] for i in rows]
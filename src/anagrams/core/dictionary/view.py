@@ -0,0 +1,137 @@
+"""
+Variants of a dictionary, like "words of at least four letters" or "only
+these themed words", that share one base dictionary rather than each
+building their own automaton.
+
+A view keeps the words of its base that pass its filters, minus the words
+it denies, plus the words it allows. Only the overlays are stored, so a
+view costs no memory per base word, and checking a word is a lookup in the
+base plus a few checks of the word itself.
+"""
+
+import json
+import os
+import re
+from collections.abc import Callable, Iterable, Iterator
+from typing import Protocol
+
+
+class Words(Protocol):
+    def __contains__(self, word: str, /) -> bool: ...
+
+    def contains_many(self, words: Iterable[str], /) -> list[bool]: ...
+
+    def __iter__(self) -> Iterator[str]: ...
+
+
+def _word_set(
+    words: Iterable[str] | str | None, directory: str
+) -> frozenset[str] | None:
+    """A set of words, from a list or the path of a file with one per line."""
+    if words is None:
+        return None
+    if isinstance(words, str):
+        with open(os.path.join(directory, words)) as f:
+            words = [line.strip() for line in f]
+    return frozenset(w for w in words if w)
+
+
+class DictionaryView:
+    def __init__(
+        self,
+        base: Words,
+        min_length: int = 0,
+        max_length: int | None = None,
+        pattern: str | None = None,
+        predicate: Callable[[str], bool] | None = None,
+        only: Iterable[str] | None = None,
+        deny: Iterable[str] = (),
+        allow: Iterable[str] = (),
+    ) -> None:
+        """
+        The words of `base` (a `Dictionary`, or another view) that are
+        `min_length` to `max_length` letters long, fully match `pattern`,
+        pass `predicate` and are among `only`, except those in `deny`, plus
+        those in `allow` whether or not they are in `base`.
+        """
+        self.base = base
+        self.min_length = min_length
+        self.max_length = max_length
+        self._pattern = None if pattern is None else re.compile(pattern)
+        self.predicate = predicate
+        self.only = None if only is None else frozenset(only)
+        self.deny = frozenset(deny)
+        self.allow = frozenset(allow)
+
+    @classmethod
+    def from_spec(
+        cls, base: Words, spec: dict, directory: str = "."
+    ) -> "DictionaryView":
+        """
+        Make a view from JSON, like `{"min_length": 4, "deny": ["ok"]}`.
+        The word lists can also be paths of files with one word per line,
+        relative to `directory`.
+        """
+        return cls(
+            base,
+            min_length=spec.get("min_length", 0),
+            max_length=spec.get("max_length"),
+            pattern=spec.get("pattern"),
+            only=_word_set(spec.get("only"), directory),
+            deny=_word_set(spec.get("deny"), directory) or (),
+            allow=_word_set(spec.get("allow"), directory) or (),
+        )
+
+    def accepts(self, word: str) -> bool:
+        """Whether `word` passes the filters, whether or not it's in the base."""
+        n = len(word)
+        if n < self.min_length or (self.max_length is not None and n > self.max_length):
+            return False
+        if self.only is not None and word not in self.only:
+            return False
+        if self._pattern is not None and self._pattern.fullmatch(word) is None:
+            return False
+        return self.predicate is None or self.predicate(word)
+
+    def __contains__(self, word: str):
+        if word in self.allow:
+            return True
+        return word not in self.deny and self.accepts(word) and word in self.base
+
+    def contains_many(
+        self, words: Iterable[str], known: list[bool] | None = None
+    ) -> list[bool]:
+        """
+        Whether each of `words` is in the view. `known` is whether each is in
+        the dictionary under every view, if that has been looked up already
+        (e.g. in a worker process).
+        """
+        words = list(words)
+        if isinstance(self.base, DictionaryView):
+            known = self.base.contains_many(words, known)
+        elif known is None:
+            known = self.base.contains_many(words)
+        allow, deny, accepts = self.allow, self.deny, self.accepts
+        return [
+            word in allow or (ok and word not in deny and accepts(word))
+            for word, ok in zip(words, known)
+        ]
+
+    def __iter__(self):
+        # `only` is usually much smaller than the base
+        words = sorted(self.only) if self.only is not None else self.base
+        for word in words:
+            if word not in self.allow and word in self:
+                yield word
+        yield from sorted(self.allow)
+
+
+def load_views(base: Words, path: str) -> dict[str, DictionaryView]:
+    """Load named views of `base` from a JSON file of `{name: spec}`."""
+    with open(path) as f:
+        specs = json.load(f)
+    directory = os.path.dirname(path)
+    return {
+        name: DictionaryView.from_spec(base, spec, directory)
+        for name, spec in specs.items()
+    }
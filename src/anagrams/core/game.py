@@ -1,42 +1,180 @@
-import itertools
-from typing import Counter
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
 from uuid import UUID
 
+from .cache import LRUCache
+from .letters import LetterSource, WeightedLetters
 from .player import Player
-from .utils import contains_anagrammed_substring, weighted_random_letter
+from .search import AnagramStrategy, iter_anagram_strategies
+from .utils import (
+    letters_signature,
+    sig_contains,
+    signature,
+)
 
-AnagramStrategy = tuple[tuple[UUID | None, str], ...]
+Change = dict
 """
-A tuple of (`source`, `word`) pairs, where `source` is a player id 
-and `word` is one of that player's words. `source` can also be `None`, 
-indicating a letter from the game's letter pool.
+A record of one change to a game, like `{"op": "letter", "letter": "e"}`.
+Players are referred to by their position in the turn order.
 """
 
+CHANGELOG_SIZE = 256
+"""How many of the most recent changes a game remembers"""
+
+CACHE_SIZE = 64
+"""How many search results a game remembers"""
+
 
 class Game:
     """
     This class manages all state for a game of Anagrams.
     """
 
-    def __init__(self):
-        self.letter_pool: list[str] = []
+    def __init__(self, letters: LetterSource | None = None):
+        self.letters = WeightedLetters() if letters is None else letters
+        """Where new letters come from"""
+        self.dictionary = ""
+        """The name of the dictionary view that words are checked against, if any"""
+        self._letter_pool: list[str] = []
+        self.pool_signature = 0
+        """The signature of the letters in `letter_pool`"""
+        self.board_signature = 0
+        """The signature of every letter on the board, in the pool or in words"""
         self.players: dict[UUID, Player] = {}
         self.turn_order: list[UUID] = []
         self._turn_idx: int = 0
         self.turns: int = 0
         self.log: list[AnagramStrategy] = []
+        self.version: int = 0
+        """Incremented by every change to the game"""
+        self.changes: deque[tuple[int, Change]] = deque(maxlen=CHANGELOG_SIZE)
+        """The most recent changes, with the version that each one produced"""
+        self.board_version: int = 0
+        """Incremented by every change to the letter pool or the players' words"""
+        self.cache: LRUCache = LRUCache(CACHE_SIZE)
+        """
+        Search results (strategies, solver moves), keyed on `board_version`
+        among other things, so that they stop matching when the board changes
+        """
+        self.listener: Callable[[Game, Change], None] | None = None
+        """Called with every change once it is made, e.g. to journal it"""
+
+    def __getstate__(self):
+        # only what the rest can be worked out from, so that snapshots and
+        # games sent to worker processes are small: the cache, the changelog
+        # and the listener aren't kept
+        return (
+            self.version,
+            self.board_version,
+            self.turns,
+            self._turn_idx,
+            self._letter_pool,
+            [
+                (pid.bytes, self.players[pid].name, self.players[pid].words)
+                for pid in self.turn_order
+            ],
+            [[(s and s.bytes, word) for s, word in strategy] for strategy in self.log],
+            self.letters,
+            self.dictionary,
+        )
+
+    def __setstate__(self, state: tuple):
+        (
+            version,
+            board_version,
+            turns,
+            turn_idx,
+            pool,
+            players,
+            log,
+            letters,
+            dictionary,
+        ) = state
+        self.__init__(letters)
+        self.dictionary = dictionary
+        for pid, name, words in players:
+            player = Player(UUID(bytes=pid), name, words)
+            self.players[player.id] = player
+            self.turn_order.append(player.id)
+            self.board_signature += player.words_signature
+        self._letter_pool = pool
+        self.pool_signature = letters_signature(pool)
+        self.board_signature += self.pool_signature
+        self.log = [
+            tuple((s and UUID(bytes=s), word) for s, word in strategy)
+            for strategy in log
+        ]
+        self.version = version
+        self.board_version = board_version
+        self.turns = turns
+        self._turn_idx = turn_idx
+
+    def _changed(self, op: str, board: bool = True, **fields):
+        self.version += 1
+        if board:
+            self.board_version += 1
+        change = {"op": op, **fields}
+        self.changes.append((self.version, change))
+        if self.listener is not None:
+            self.listener(self, change)
+
+    def changes_since(self, version: int) -> list[Change] | None:
+        """
+        The changes that bring a copy of the game at `version` up to date,
+        or `None` if they are no longer remembered.
+        """
+        if version == self.version:
+            return []
+        if version > self.version or version < self.version - len(self.changes):
+            return None
+        return [change for v, change in self.changes if v > version]
+
+    @property
+    def letter_pool(self) -> list[str]:
+        """The letters that have been flipped but not yet used in a word."""
+        return self._letter_pool
+
+    @letter_pool.setter
+    def letter_pool(self, letters: list[str]):
+        sig = letters_signature(letters)
+        self._letter_pool = letters
+        self.board_signature += sig - self.pool_signature
+        self.pool_signature = sig
+        self._changed("pool", letters=list(letters))
 
     def add_player(self, player: Player):
         """Add a player to the game."""
         self.players[player.id] = player
         self.turn_order.append(player.id)
+        self.board_signature += player.words_signature
+        self._changed(
+            "add_player",
+            board=bool(player.words),
+            name=player.name,
+            words=list(player.words),
+        )
 
     def remove_player(self, player_id: UUID):
         """Remove the player with id `player_id` from the game."""
-        self.players.pop(player_id)
+        index = self.turn_order.index(player_id)
+        player = self.players.pop(player_id)
         self.turn_order.remove(player_id)
+        self.board_signature -= player.words_signature
         if self._turn_idx == len(self.players):
             self._turn_idx = 0
+        self._changed(
+            "remove_player",
+            board=bool(player.words),
+            player=index,
+            turn=self._turn_idx,
+        )
+
+    def add_word(self, player_id: UUID, word: str):
+        """Give the player with id `player_id` a word."""
+        self.players[player_id].add_word(word)
+        self.board_signature += signature(word)
+        self._changed("add_word", player=self.turn_order.index(player_id), word=word)
 
     @property
     def turn(self):
@@ -47,46 +185,126 @@ class Game:
 
     def next_turn(self):
         """Advance the game to the next turn."""
-        self._turn_idx += 1
-        self._turn_idx %= len(self.turn_order)
+        self._set_turn((self._turn_idx + 1) % len(self.turn_order))
+
+    def _set_turn(self, index: int):
+        self._turn_idx = index
         self.turns += 1
+        self._changed("turn", board=False, player=self._turn_idx)
+
+    def new_letter(self) -> str | None:
+        """
+        Draw a letter from `letters` into the pool, and return it, or `None`
+        if there are no letters left.
+        """
+        letter = self.letters.draw()
+        if letter is not None:
+            self.add_letter(letter)
+        return letter
 
-    def new_letter(self, temperature: float = 0):
-        self.letter_pool.append(weighted_random_letter(temperature))
+    def add_letter(self, letter: str):
+        """Add a letter to the pool."""
+        self._letter_pool.append(letter)
+        self.pool_signature += signature(letter)
+        self.board_signature += signature(letter)
+        self._changed("letter", letter=letter)
 
-    def get_anagram_strategies(self, target: str):
+    def iter_anagram_strategies(
+        self, target: str, time_budget: float | None = None
+    ) -> Iterator[AnagramStrategy]:
+        """
+        Lazily yield all ways to assemble a target string by anagramming any
+        number of player words and letter pool letters. If `time_budget` is
+        set, the search raises a `TimeoutError` after that many seconds.
+        """
+        return iter_anagram_strategies(
+            target,
+            self.pool_signature,
+            (
+                (id, zip(player.words, player.signatures))
+                for id, player in self.players.items()
+            ),
+            None if time_budget is None else time.monotonic() + time_budget,
+        )
+
+    def could_make(self, target: str) -> bool:
+        """
+        Quickly rule out targets that can't be made, because the board
+        doesn't have enough of some letter. A `True` doesn't mean that there
+        is a strategy, only that it is worth searching for one.
+        """
+        try:
+            sig = letters_signature(target)
+        except ValueError:
+            return False
+        return len(target) >= 2 and sig_contains(self.board_signature, sig)
+
+    def strategy_key(self, target: str, first: bool = True) -> tuple | None:
+        """
+        The `cache` key for the strategies (or just the `first` one) that
+        make `target`, or `None` if `target` can't be made at all. Anagrams
+        of each other have the same strategies, so they share a key.
+        """
+        try:
+            sig = letters_signature(target)
+        except ValueError:
+            return None
+        return ("first" if first else "all", self.board_version, sig)
+
+    def get_anagram_strategies(
+        self, target: str, time_budget: float | None = None
+    ) -> list[AnagramStrategy]:
         """
         Find all ways to assemble a target string by anagramming any number
         of player words and letter pool letters.
         """
-        candidates: list[tuple[UUID | None, str]] = [
-            (None, letter) for letter in self.letter_pool if letter in target
-        ]
-        for id, player in self.players.items():
-            candidates.extend(
-                [
-                    (id, w)
-                    for w in player.words
-                    if contains_anagrammed_substring(target, w)
-                ]
-            )
-        strategies: list[AnagramStrategy] = []
-        target_counter = Counter(target)
-        for n in range(2, len(candidates) + 1):
-            for combo in itertools.combinations(candidates, n):
-                if target_counter == Counter("".join([sub for _, sub in combo])):
-                    strategies.append(combo)
-        return strategies
+        key = self.strategy_key(target, first=False)
+        if key is None or not self.could_make(target):
+            return []
+        strategies = self.cache.get(key)
+        if strategies is None:
+            strategies = list(self.iter_anagram_strategies(target, time_budget))
+            self.cache.put(key, strategies)
+        return list(strategies)
+
+    def find_anagram_strategy(
+        self, target: str, time_budget: float | None = None
+    ) -> AnagramStrategy | None:
+        """
+        Find a single way to assemble a target string, stopping the search
+        as soon as one is found. Returns `None` if there is no way.
+        """
+        key = self.strategy_key(target)
+        if key is None or not self.could_make(target):
+            return None
+        return self.cache.get_or_compute(
+            key, lambda: next(self.iter_anagram_strategies(target, time_budget), None)
+        )
 
     def validate_anagram_strategy(self, strategy: AnagramStrategy):
-        """Checks if an anagram strategy can be executed."""
+        """
+        Checks if an anagram strategy can be executed, counting repeated
+        letters and words, for example after the game has changed since the
+        strategy was found.
+        """
+        letters: list[str] = []
+        words: dict[UUID, list[str]] = {}
         for source, word in strategy:
             if source is None:
-                if word not in self.letter_pool:
-                    return False
+                letters.append(word)
             else:
-                player = self.players[source]
-                if word not in player.words:
+                words.setdefault(source, []).append(word)
+        try:
+            if not sig_contains(self.pool_signature, letters_signature(letters)):
+                return False
+        except ValueError:
+            return False
+        for source, taken in words.items():
+            player = self.players.get(source)
+            if player is None:
+                return False
+            for word in set(taken):
+                if taken.count(word) > player.words.count(word):
                     return False
         return True
 
@@ -95,11 +313,50 @@ class Game:
         Executes an anagram strategy, removing words and letters from
         players and the letter pool as needed.
         """
+        letters: list[str] = []
+        words: list[tuple[int, str]] = []
+        indices: list[int] = []
         for source, word in strategy:
             if source is None:
-                self.letter_pool.remove(word)
+                self._letter_pool.remove(word)
+                self.pool_signature -= signature(word)
+                letters.append(word)
             else:
-                player = self.players[source]
-                player.words.remove(word)
+                indices.append(self.players[source].remove_word(word))
+                words.append((self.turn_order.index(source), word))
+            self.board_signature -= signature(word)
 
         self.log.append(strategy)
+        # where each word was in its player's words, when it was taken
+        self._changed("take", letters=letters, words=words, indices=indices)
+
+    def apply_change(self, change: Change):
+        """
+        Make a change recorded from another copy of the game, e.g. to replay
+        a journal. Changes don't say who joins a game, so an `add_player`
+        change also needs the player's `id`. A `letter` change also draws
+        from `letters`, to keep a copy made with the same source in step.
+        """
+        match change["op"]:
+            case "pool":
+                self.letter_pool = list(change["letters"])
+            case "add_player":
+                words = list(change["words"])
+                player = Player(UUID(change["id"]), change["name"], words)
+                self.add_player(player)
+            case "remove_player":
+                self.remove_player(self.turn_order[change["player"]])
+            case "add_word":
+                self.add_word(self.turn_order[change["player"]], change["word"])
+            case "turn":
+                self._set_turn(change["player"])
+            case "letter":
+                self.letters.draw()
+                self.add_letter(change["letter"])
+            case "take":
+                self.execute_anagram_strategy(
+                    [(None, letter) for letter in change["letters"]]
+                    + [(self.turn_order[i], word) for i, word in change["words"]]
+                )
+            case op:
+                raise ValueError(f"Unknown change {op!r}")
@@ -0,0 +1,141 @@
+"""
+Letter sources: where a game's new letters come from.
+
+Every source has its own seeded random number generator, so a game's
+letters can be reproduced from its seed, and each letter takes exactly one
+random number. That means a source can be rebuilt from its `spec` and the
+number of letters drawn so far, which is all that is kept when it is
+pickled (for a snapshot, or to send a game to a worker process).
+"""
+
+import random
+from abc import ABC, abstractmethod
+
+from .utils import letter_table
+
+# fmt: off
+TILE_COUNTS = {
+    "a": 9, "b": 2, "c": 2, "d": 4, "e": 12, "f": 2, "g": 3, "h": 2, "i": 9,
+    "j": 1, "k": 1, "l": 4, "m": 2, "n": 6, "o": 8, "p": 2, "q": 1, "r": 6,
+    "s": 4, "t": 6, "u": 4, "v": 2, "w": 2, "x": 1, "y": 2, "z": 1,
+}
+"""The letter tiles of a Scrabble set, without the blanks"""
+# fmt: on
+
+
+class LetterSource(ABC):
+    kind = ""
+
+    def __init__(self, seed: int | None = None) -> None:
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.drawn = 0
+        """How many letters have been drawn"""
+
+    @property
+    def spec(self) -> dict:
+        """What the source was made with, as JSON (see `letter_source`)."""
+        return {"kind": self.kind, "seed": self.seed}
+
+    @property
+    def remaining(self) -> int | None:
+        """How many letters are left to draw, or `None` if they never run out."""
+        return None
+
+    @abstractmethod
+    def draw(self) -> str | None:
+        """Draw a letter, or `None` if there are none left."""
+
+    @abstractmethod
+    def draw_many(self, n: int) -> list[str]:
+        """Draw `n` letters, or as many as there are left."""
+
+    def __getstate__(self):
+        return self.spec, self.drawn
+
+    def __setstate__(self, state: tuple[dict, int]):
+        spec, drawn = state
+        source = letter_source(spec)
+        source.draw_many(drawn)
+        self.__dict__.update(source.__dict__)
+
+
+class WeightedLetters(LetterSource):
+    """
+    Letters drawn independently by how common they are in English
+    (`LETTER_WEIGHTS`), flattened by `temperature`.
+    """
+
+    kind = "weighted"
+
+    def __init__(self, temperature: float = 0, seed: int | None = None) -> None:
+        super().__init__(seed)
+        self.temperature = temperature
+        self._table = letter_table(temperature)
+
+    @property
+    def spec(self):
+        return {**super().spec, "temperature": self.temperature}
+
+    def draw(self) -> str:
+        self.drawn += 1
+        return self._table.sample(self.rng.random())
+
+    def draw_many(self, n: int) -> list[str]:
+        self.drawn += n
+        sample, uniform = self._table.sample, self.rng.random
+        return [sample(uniform()) for _ in range(n)]
+
+
+class TileBag(LetterSource):
+    """
+    A finite bag of `copies` sets of tiles (`TILE_COUNTS`), drawn without
+    replacement.
+    """
+
+    kind = "bag"
+
+    def __init__(self, copies: int = 1, seed: int | None = None) -> None:
+        super().__init__(seed)
+        self.copies = copies
+        self._tiles = [
+            letter for letter, n in TILE_COUNTS.items() for _ in range(n * copies)
+        ]
+
+    @property
+    def spec(self):
+        return {**super().spec, "copies": self.copies}
+
+    @property
+    def remaining(self) -> int:
+        return len(self._tiles)
+
+    def draw(self) -> str | None:
+        tiles = self._tiles
+        if not tiles:
+            return None
+        # swap a random tile to the end, and take it from there
+        i = int(self.rng.random() * len(tiles))
+        tiles[i], tiles[-1] = tiles[-1], tiles[i]
+        self.drawn += 1
+        return tiles.pop()
+
+    def draw_many(self, n: int) -> list[str]:
+        letters = []
+        for _ in range(min(n, len(self._tiles))):
+            letters.append(self.draw())
+        return letters
+
+
+SOURCES: dict[str, type[LetterSource]] = {
+    WeightedLetters.kind: WeightedLetters,
+    TileBag.kind: TileBag,
+}
+
+
+def letter_source(spec: dict) -> LetterSource:
+    """Make a new source from the `spec` of another."""
+    kwargs = dict(spec)
+    return SOURCES[kwargs.pop("kind")](**kwargs)
@@ -1,6 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from uuid import UUID
 
+from .utils import Signature, signature
+
 
 @dataclass
 class Player:
@@ -8,7 +10,31 @@ class Player:
     name: str
     words: list[str]
     """A list of words that the player has found"""
+    signatures: list[Signature] = field(init=False, repr=False, compare=False)
+    """The signature of each word in `words`, in the same order"""
+    words_signature: Signature = field(init=False, repr=False, compare=False)
+    """The signature of all of the player's words together"""
+    score: int = field(init=False, compare=False)
+    """The total length of the player's words"""
+
+    def __post_init__(self):
+        self.signatures = [signature(w) for w in self.words]
+        self.words_signature = sum(self.signatures)
+        self.score = sum(len(w) for w in self.words)
+
+    def add_word(self, word: str):
+        """Give the player a word."""
+        sig = signature(word)
+        self.words.append(word)
+        self.signatures.append(sig)
+        self.words_signature += sig
+        self.score += len(word)
 
-    @property
-    def score(self):
-        return sum(len(w) for w in self.words)
+    def remove_word(self, word: str) -> int:
+        """Take a word away from the player, returning where it was."""
+        i = self.words.index(word)
+        self.words_signature -= self.signatures[i]
+        self.score -= len(word)
+        del self.words[i]
+        del self.signatures[i]
+        return i
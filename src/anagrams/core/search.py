@@ -0,0 +1,106 @@
+"""
+Backtracking search for anagram strategies.
+
+The search works on letter signatures rather than strings: each candidate
+word is subtracted from what is left of the target, and any branch that
+would need more of a letter than the remaining words and pool letters can
+supply is pruned immediately. Pool letters are only ever used to fill
+whatever is left once the words have been chosen, so identical pool letters
+never produce duplicate strategies.
+"""
+
+import time
+from collections.abc import Iterable, Iterator
+from uuid import UUID
+
+from .utils import Signature, letters_signature, sig_contains, signature_letters
+
+AnagramStrategy = tuple[tuple[UUID | None, str], ...]
+"""
+A tuple of (`source`, `word`) pairs, where `source` is a player id
+and `word` is one of that player's words. `source` can also be `None`,
+indicating a letter from the game's letter pool.
+"""
+
+
+class _Group:
+    """A distinct (source, word) candidate, and how many copies are available."""
+
+    __slots__ = ("source", "word", "sig", "copies")
+
+    def __init__(self, source: UUID, word: str, sig: Signature, copies: int):
+        self.source = source
+        self.word = word
+        self.sig = sig
+        self.copies = copies
+
+
+def iter_anagram_strategies(
+    target: str,
+    pool: Signature,
+    player_words: Iterable[tuple[UUID, Iterable[tuple[str, Signature]]]],
+    deadline: float | None = None,
+) -> Iterator[AnagramStrategy]:
+    """
+    Lazily yield every way to assemble `target` from at least two pieces,
+    where a piece is either a letter counted in the `pool` signature or one
+    of the words in `player_words` (pairs of player id and that player's
+    words with their signatures).
+
+    Strategies that use more (and longer) player words are yielded first.
+    If the search is still running at `deadline` (a `time.monotonic`
+    time), it raises a `TimeoutError`.
+    """
+    try:
+        need = letters_signature(target)
+    except ValueError:
+        return
+
+    groups: list[_Group] = []
+    for source, words in player_words:
+        copies: dict[str, int] = {}
+        sigs: dict[str, Signature] = {}
+        for w, sig in words:
+            if sig_contains(need, sig):
+                copies[w] = copies.get(w, 0) + 1
+                sigs[w] = sig
+        groups.extend(_Group(source, w, sigs[w], n) for w, n in copies.items())
+    groups.sort(key=lambda g: -len(g.word))
+
+    # available[i] is what groups[i:] plus the pool could supply
+    available = [pool]
+    for g in reversed(groups):
+        available.append(available[-1] + g.sig * g.copies)
+    available.reverse()
+
+    chosen: list[tuple[UUID | None, str]] = []
+    steps = 0
+
+    def search(idx: int, need: Signature) -> Iterator[AnagramStrategy]:
+        nonlocal steps
+        steps += 1
+        if deadline is not None and steps % 1024 == 0 and time.monotonic() > deadline:
+            raise TimeoutError("anagram strategy search timed out")
+        if need == 0 or idx == len(groups):
+            if sig_contains(pool, need):
+                letters = [(None, letter) for letter in signature_letters(need)]
+                if len(chosen) + len(letters) >= 2:
+                    yield tuple(letters + chosen)
+            return
+        if not sig_contains(available[idx], need):
+            return
+
+        g = groups[idx]
+        taken = []
+        rest = need
+        while len(taken) < g.copies and sig_contains(rest, g.sig):
+            rest -= g.sig
+            taken.append(rest)
+
+        for k in range(len(taken), 0, -1):
+            chosen.extend([(g.source, g.word)] * k)
+            yield from search(idx + 1, taken[k - 1])
+            del chosen[-k:]
+        yield from search(idx + 1, need)
+
+    yield from search(0, need)
@@ -0,0 +1,142 @@
+"""
+Find every move available on a board, for hints and bot players.
+
+A move makes a dictionary word from some set of player words plus any
+number of pool letters, following the same rules as
+`Game.get_anagram_strategies`. Rather than checking every dictionary word
+against the board, the solver picks the player words first and asks the
+dictionary's anagram index for the words that contain all of them and fit
+in what's left of the pool. A set of player words is only extended if some
+dictionary word could still contain all of them, which prunes almost every
+combination of three or more words.
+"""
+
+import heapq
+import itertools
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from uuid import UUID
+
+from .dictionary import Dictionary
+from .search import AnagramStrategy
+from .utils import Signature, signature, signature_letters
+
+if TYPE_CHECKING:
+    from .game import Game
+
+
+@dataclass(frozen=True)
+class Move:
+    word: str
+    """The word that the move makes"""
+    strategy: AnagramStrategy
+    """How to make `word` from the board"""
+    gain: int
+    """How much the move would raise the score of the player making it"""
+
+
+def find_moves(
+    game: "Game",
+    dictionary: Dictionary,
+    player_id: UUID | None = None,
+    time_budget: float | None = 0.05,
+    limit: int | None = None,
+) -> list[Move]:
+    """
+    List the moves available in `game`, best first. Gains are computed for
+    the player with id `player_id`, whose own words are worth nothing to
+    steal.
+
+    Only the best `limit` moves are kept (if set). The search stops after
+    `time_budget` seconds (if set), returning the best of the moves it has
+    found so far. Searches that finish in time are remembered in the game's
+    cache until the board changes.
+    """
+    key = ("moves", game.board_version, id(dictionary), player_id, limit)
+    cached = game.cache.get(key)
+    if cached is not None:
+        return list(cached)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    index = dictionary.anagram_index
+    pool = game.pool_signature
+
+    items: list[tuple[UUID, str, Signature]] = sorted(
+        (
+            (pid, w, sig)
+            for pid, player in game.players.items()
+            for w, sig in zip(player.words, player.signatures)
+        ),
+        key=lambda item: (-len(item[1]), item[1]),
+    )
+    # rest[i] is the signature of items[i:], everything that could still be added
+    rest = [0] * (len(items) + 1)
+    for i in range(len(items) - 1, -1, -1):
+        rest[i] = rest[i + 1] + items[i][2]
+
+    moves: list[Move] = []
+    # with a limit, the best moves found so far as a heap, worst first: by
+    # gain, then length, then reverse alphabetical order, then latest found
+    best: list[tuple[int, int, tuple[int, ...], int, Move]] = []
+    found = itertools.count()
+    chosen: list[tuple[UUID, str]] = []
+
+    def out_of_time():
+        return deadline is not None and time.perf_counter() > deadline
+
+    def keep(move: Move):
+        assert limit is not None
+        rank = (move.gain, len(move.word), tuple(-ord(c) for c in move.word))
+        if len(best) < limit:
+            heapq.heappush(best, (*rank, -next(found), move))
+        elif rank > best[0][:3]:
+            heapq.heapreplace(best, (*rank, -next(found), move))
+
+    def collect(words_sig: Signature, words_len: int):
+        # a strategy needs at least two pieces in total
+        min_length = max(words_len + max(2 - len(chosen), 0), 2)
+        cost = sum(len(w) for pid, w in chosen if pid == player_id)
+        for word in index.subanagrams(
+            pool + words_sig, min_length=min_length, required=words_sig
+        ):
+            letters = signature_letters(signature(word) - words_sig)
+            strategy = tuple([(None, letter) for letter in letters] + chosen)
+            move = Move(word, strategy, len(word) - cost)
+            if limit is None:
+                moves.append(move)
+            else:
+                keep(move)
+            if out_of_time():
+                return
+
+    def search(start: int, words_sig: Signature, words_len: int):
+        collect(words_sig, words_len)
+        for i in range(start, len(items)):
+            if out_of_time():
+                return
+            pid, w, sig = items[i]
+            if i > start and items[i - 1][:2] == (pid, w):
+                continue  # same choice as the previous item
+            with_sig = words_sig + sig
+            if words_len + len(w) > index.max_length:
+                continue
+            if not any(
+                index.subanagrams(
+                    pool + with_sig + rest[i + 1],
+                    min_length=words_len + len(w),
+                    required=with_sig,
+                    limit=1,
+                )
+            ):
+                continue  # no dictionary word contains all of these words
+            chosen.append((pid, w))
+            search(i + 1, with_sig, words_len + len(w))
+            chosen.pop()
+
+    search(0, 0, 0)
+    if limit is not None:
+        moves = [entry[-1] for entry in sorted(best, reverse=True)]
+    moves.sort(key=lambda m: (-m.gain, -len(m.word), m.word))
+    if not out_of_time():
+        game.cache.put(key, moves)
+    return list(moves)
@@ -1,19 +1,73 @@
-from collections import Counter
 from collections.abc import Iterable
+from functools import lru_cache
 from random import random
 
+ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+
+Signature = int
+"""
+The letter counts of a word, packed into 26 fixed-width slots of an int
+(`a` in the lowest slot). Signatures of several words can be added and
+subtracted like the counts they hold, and the top bit of each slot is kept
+clear so that containment can be checked for all 26 letters at once.
+"""
+
+SLOT_BITS = 16
+_SLOT_MASK = (1 << SLOT_BITS) - 1
+_GUARD = sum(1 << (SLOT_BITS * i + SLOT_BITS - 1) for i in range(26))
+_LETTER_SIGNATURES = {letter: 1 << (SLOT_BITS * i) for i, letter in enumerate(ALPHABET)}
+
+
+def letters_signature(letters: Iterable[str]) -> Signature:
+    """
+    Compute the signature of some letters without caching it.
+    Raises a `ValueError` for anything but lowercase ascii letters.
+    """
+    try:
+        return sum(_LETTER_SIGNATURES[letter] for letter in letters)
+    except KeyError as e:
+        raise ValueError(f"cannot compute the signature of {e.args[0]!r}") from None
+
+
+@lru_cache(maxsize=1 << 16)
+def signature(word: str) -> Signature:
+    """The (cached) signature of a word."""
+    return letters_signature(word)
+
+
+def signature_counts(sig: Signature) -> list[int]:
+    """Unpack a signature into a list of 26 letter counts."""
+    return [(sig >> (SLOT_BITS * i)) & _SLOT_MASK for i in range(26)]
+
+
+def signature_letters(sig: Signature) -> list[str]:
+    """The letters counted by a signature, in alphabetical order."""
+    return [
+        letter for letter, n in zip(ALPHABET, signature_counts(sig)) for _ in range(n)
+    ]
+
+
+def sig_contains(sig: Signature, sub: Signature) -> bool:
+    """Check whether every letter count in `sub` fits within `sig`."""
+    return ((sig | _GUARD) - sub) & _GUARD == _GUARD
+
 
 def contains_anagrammed_substring(word: str, sub: str):
-    w_counter = Counter(word)
-    s_counter = Counter(sub)
-    for letter in s_counter:
-        if letter not in w_counter or w_counter[letter] < s_counter[letter]:
-            return False
-    return True
+    return sig_contains(signature(word), signature(sub))
 
 
 def is_anagram(target: str, pieces: Iterable[str]):
-    return Counter(target) == Counter("".join(pieces))
+    return signature(target) == sum(signature(p) for p in pieces)
+
+
+def edit_distance(a: str, b: str) -> int:
+    """The number of letters to insert, delete or substitute to turn `a` into `b`."""
+    row = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        prev, row[0] = row[0], i
+        for j, y in enumerate(b, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (x != y))
+    return row[-1]
 
 
 # fmt: off
@@ -28,11 +82,49 @@ LETTER_WEIGHTS = {
 # fmt: on
 
 
+class AliasTable:
+    """
+    Vose's alias method: after an O(n) setup, each weighted sample takes
+    one uniform random number and O(1) work, however many outcomes there
+    are. Each of the `n` columns holds its own outcome with probability
+    `prob[i]` and its `alias` otherwise.
+    """
+
+    def __init__(self, weights: dict[str, float]) -> None:
+        outcomes = list(weights)
+        n = len(outcomes)
+        total = sum(weights.values())
+        scaled = [weights[o] * n / total for o in outcomes]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            prob[s], alias[s] = scaled[s], g
+            scaled[g] += scaled[s] - 1
+            (small if scaled[g] < 1 else large).append(g)
+        # whatever is left is 1 up to rounding error
+        self.n = n
+        self.outcomes = outcomes
+        self.prob = prob
+        self.alias = [outcomes[i] for i in alias]
+
+    def sample(self, u: float) -> str:
+        """The outcome for a uniform random number `u` in [0, 1)."""
+        x = u * self.n
+        i = int(x)
+        return self.outcomes[i] if x - i < self.prob[i] else self.alias[i]
+
+
+@lru_cache(maxsize=64)
+def letter_table(temperature: float) -> AliasTable:
+    """
+    The alias table for drawing letters by `LETTER_WEIGHTS`, flattened by
+    adding `temperature` to every weight.
+    """
+    return AliasTable({letter: w + temperature for letter, w in LETTER_WEIGHTS.items()})
+
+
 def weighted_random_letter(temperature: float):
-    total = sum(w + temperature for w in LETTER_WEIGHTS.values())
-    target = random() * total
-    for letter, weight in LETTER_WEIGHTS.items():
-        target -= weight + temperature
-        if target < 0:
-            return letter
-    return "E"
+    return letter_table(temperature).sample(random())
@@ -1,6 +1,9 @@
 import argparse
 import asyncio
+import json
 import logging
+import os
+import time
 
 import httpx
 import uvicorn
@@ -23,13 +26,160 @@ async def wait_for_server(host, port):
         await asyncio.sleep(0.5)
 
 
+def compile_dictionary(args: argparse.Namespace):
+    from ..core.dictionary import DEFAULT_DICTIONARY_FILE, compile_dictionary
+
+    start = time.perf_counter()
+    path = compile_dictionary(
+        args.source or DEFAULT_DICTIONARY_FILE, args.pattern, args.output
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        style("Compiled dictionary to", fg="cyan"),
+        style(path, fg="cyan", bold=True),
+        style(f"({os.path.getsize(path) / 1e6:.1f} MB in {elapsed:.1f}s)", fg="cyan"),
+    )
+
+
+def loadtest(args: argparse.Namespace):
+    from . import loadtest
+
+    loadtest.raise_open_file_limit()
+    options = dict(
+        games=args.games,
+        players=args.players,
+        rounds=args.rounds,
+        think=args.think,
+        ramp=args.ramp,
+        words=not args.no_words,
+        delta=args.delta,
+        binary=args.binary,
+    )
+    if args.url:
+        run = loadtest.run_load(args.url, **options)
+    else:
+        logging.disable(logging.INFO)  # one line per game is a lot of lines
+        run = loadtest.run_in_process(workers=args.server_workers, **options)
+    print(style("Running load test...", fg="blue", bold=True))
+    summary = loadtest.report(*asyncio.run(run))
+    for line in loadtest.format_report(summary):
+        print(line)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Run the jeopardy server.")
+    parser = argparse.ArgumentParser(description="Run the anagrams server.")
     parser.add_argument("--host", type=str, default=get_ip())
     parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--search-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="processes to search for anagrams in, split between the workers "
+        "(0 to search in the server)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="server processes to split games between",
+    )
+    parser.add_argument(
+        "--journal",
+        type=str,
+        help="directory to save games in, so that they survive restarts",
+    )
+    parser.add_argument(
+        "--views",
+        type=str,
+        help="JSON file of named dictionary variants that games can be started "
+        'with, like {"long": {"min_length": 5}}',
+    )
+    parser.add_argument(
+        "--tile-bags",
+        type=int,
+        default=0,
+        help="deal each game this many sets of tiles, until they run out "
+        "(default: draw letters by how common they are, forever)",
+    )
+    parser.add_argument(
+        "--debug-endpoints",
+        action="store_true",
+        help="serve the /debug endpoints, which show what's in games and "
+        "can turn profiling on (only for servers that aren't public)",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    compile_parser = subparsers.add_parser(
+        "compile", help="compile a word list to the binary dictionary format"
+    )
+    compile_parser.add_argument(
+        "--source", type=str, help="word list to compile (default: scrabble words)"
+    )
+    compile_parser.add_argument(
+        "--pattern", type=str, help="only include words that fully match this regex"
+    )
+    compile_parser.add_argument(
+        "-o", "--output", type=str, help="where to write (default: the cache)"
+    )
+    load_parser = subparsers.add_parser(
+        "loadtest", help="simulate many concurrent games to measure capacity"
+    )
+    load_parser.add_argument(
+        "--url",
+        type=str,
+        help="server to test, e.g. ws://host:8000/ws "
+        "(default: start the server in-process)",
+    )
+    load_parser.add_argument("--games", type=int, default=100)
+    load_parser.add_argument("--players", type=int, default=4, help="per game")
+    load_parser.add_argument("--rounds", type=int, default=20, help="per game")
+    load_parser.add_argument(
+        "--think", type=float, default=0.1, help="mean seconds between rounds"
+    )
+    load_parser.add_argument(
+        "--ramp", type=float, default=1.0, help="seconds over which to start games"
+    )
+    load_parser.add_argument(
+        "--no-words", action="store_true", help="only draw letters"
+    )
+    load_parser.add_argument(
+        "--delta", action="store_true", help="ask for game patches"
+    )
+    load_parser.add_argument(
+        "--binary", action="store_true", help="ask for binary frames"
+    )
+    load_parser.add_argument(
+        "--server-workers",
+        type=int,
+        default=1,
+        help="server processes to start (without --url)",
+    )
+    load_parser.add_argument("--json", type=str, help="also write results here")
     args = parser.parse_args()
+    if args.command == "compile":
+        compile_dictionary(args)
+        return
+    if args.command == "loadtest":
+        loadtest(args)
+        return
     host, port = args.host, args.port
-    from .server import app
+    os.environ["ANAGRAMS_SEARCH_WORKERS"] = str(args.search_workers // args.workers)
+    if args.journal:
+        os.environ["ANAGRAMS_JOURNAL_DIR"] = os.path.abspath(args.journal)
+    if args.views:
+        os.environ["ANAGRAMS_VIEWS"] = os.path.abspath(args.views)
+    if args.tile_bags:
+        os.environ["ANAGRAMS_TILE_BAGS"] = str(args.tile_bags)
+    if args.debug_endpoints:
+        os.environ["ANAGRAMS_DEBUG"] = "1"
+    if args.workers > 1:
+        from .cluster import Cluster
+
+        app = Cluster(args.workers).app
+    else:
+        from .server import app
 
     config = uvicorn.Config(app, host=host, port=port, log_level=logging.WARNING)
     server = uvicorn.Server(config)
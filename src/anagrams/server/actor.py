@@ -0,0 +1,105 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from .metrics import Metrics
+
+Job = Callable[[], Awaitable[Any]]
+"""A message to handle, as a function that handles it"""
+
+
+class GameActor:
+    """
+    The mailbox of one game. The game's messages are handled one at a time,
+    in the order they arrived, so a game can't change under a handler that
+    is waiting on something (like a strategy search). Each game's mailbox
+    is worked through by a task of its own, so games don't wait on each
+    other: a game that is busy only holds up its own players.
+
+    The task only runs while there are messages waiting, so an idle game
+    costs nothing but its statistics.
+    """
+
+    def __init__(self, metrics: Metrics | None = None) -> None:
+        self.metrics = metrics
+        self._mailbox: deque[tuple[Job, asyncio.Future, float]] = deque()
+        self._task: asyncio.Task | None = None
+
+        self.handled = 0
+        """Messages handled so far"""
+        self.max_depth = 0
+        """The most messages that have been waiting at once"""
+        self.waited = 0.0
+        """Seconds that messages have spent waiting in the mailbox, in total"""
+        self.busy = 0.0
+        """Seconds spent handling messages, in total"""
+        self.max_latency = 0.0
+        """The longest a message has taken from arriving to being handled"""
+
+    @property
+    def depth(self):
+        """The number of messages waiting to be handled."""
+        return len(self._mailbox)
+
+    @property
+    def running(self):
+        """Whether a message is being handled."""
+        return self._task is not None
+
+    async def call(self, job: Job) -> Any:
+        """Put `job` in the mailbox, and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._mailbox.append((job, future, time.perf_counter()))
+        self.max_depth = max(self.max_depth, len(self._mailbox))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        try:
+            while self._mailbox:
+                job, future, queued_at = self._mailbox.popleft()
+                if future.cancelled():
+                    continue  # the sender has gone
+                start = time.perf_counter()
+                try:
+                    result = await job()
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+                self._record(start - queued_at, time.perf_counter() - start)
+        finally:
+            self._task = None
+            # only left over if the task was cancelled
+            for _, future, _ in self._mailbox:
+                future.cancel()
+            self._mailbox.clear()
+
+    def _record(self, waited: float, busy: float):
+        self.handled += 1
+        self.waited += waited
+        self.busy += busy
+        self.max_latency = max(self.max_latency, waited + busy)
+        if self.metrics is not None:
+            self.metrics.mailbox_wait.observe(waited)
+
+    def stats(self) -> dict:
+        """Mailbox statistics, for monitoring."""
+        handled = max(self.handled, 1)
+        return {
+            "queued": self.depth,
+            "running": self.running,
+            "max_queue_depth": self.max_depth,
+            "handled": self.handled,
+            "mean_wait_ms": self.waited / handled * 1000,
+            "mean_handle_ms": self.busy / handled * 1000,
+            "max_latency_ms": self.max_latency * 1000,
+        }
@@ -0,0 +1,233 @@
+"""
+A compact binary encoding of server messages, for clients that ask for it
+by connecting with `?encoding=binary`.
+
+A frame is an action code byte followed by the message's fields. Integers
+are unsigned LEB128 varints, strings are a length and UTF-8 bytes, and
+letter pools are a length and one byte per letter. Game states are encoded
+once per broadcast: the frame for each player is the same body, prefixed
+with which player is `you`. In game patches, the words taken in a `take`
+change are referred to by their index in the player's words (removing
+them in order), rather than spelled out.
+
+`decode` turns a frame back into the message content that the JSON
+encoding would have had, except for those word indices.
+"""
+
+from uuid import UUID
+
+from ..core.game import Change, Game
+from .messages import Message
+
+ACTIONS = ["set_cookie", "error", "leave_game", "game_state", "game_patch"]
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS, 1)}
+
+OPS = ["pool", "add_player", "remove_player", "add_word", "turn", "letter", "take"]
+OP_CODES = {op: code for code, op in enumerate(OPS, 1)}
+
+TURN = 1
+CONNECTED = 2
+"""Flags of a player in a game state"""
+
+
+def _uint(out: bytearray, n: int):
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _str(out: bytearray, s: str):
+    data = s.encode()
+    _uint(out, len(data))
+    out += data
+
+
+def _letters(out: bytearray, letters: list[str]):
+    _uint(out, len(letters))
+    out += "".join(letters).encode("ascii")
+
+
+def encode(message: Message) -> bytes:
+    """Encode a message other than a game state (see `game_state_frames`)."""
+    content = message.content
+    out = bytearray([ACTION_CODES[message.action]])
+    match message.action:
+        case "set_cookie":
+            _str(out, content["name"])
+            _str(out, content["value"])
+        case "error":
+            _str(out, content["err_type"])
+            _str(out, content["description"])
+        case "leave_game":
+            pass
+        case "game_patch":
+            _str(out, content["game_id"])
+            _uint(out, content["base"])
+            _uint(out, content["version"])
+            _uint(out, len(content["changes"]))
+            for change in content["changes"]:
+                _change(out, change)
+        case action:
+            raise ValueError(f"Can't encode {action!r} messages")
+    return bytes(out)
+
+
+def _change(out: bytearray, change: Change):
+    out.append(OP_CODES[change["op"]])
+    match change["op"]:
+        case "pool":
+            _letters(out, change["letters"])
+        case "add_player":
+            _str(out, change["name"])
+            _uint(out, len(change["words"]))
+            for word in change["words"]:
+                _str(out, word)
+        case "remove_player":
+            _uint(out, change["player"])
+            _uint(out, change["turn"])
+        case "add_word":
+            _uint(out, change["player"])
+            _str(out, change["word"])
+        case "turn":
+            _uint(out, change["player"])
+        case "letter":
+            out += change["letter"].encode("ascii")
+        case "take":
+            _letters(out, change["letters"])
+            _uint(out, len(change["words"]))
+            for (player, _), index in zip(change["words"], change["indices"]):
+                _uint(out, player)
+                _uint(out, index)
+
+
+def game_state_frames(
+    game: Game, connected: list[UUID], game_id: str
+) -> dict[UUID, bytes]:
+    """Encode `game_state` messages for every client in `connected`."""
+    body = bytearray()
+    _str(body, game_id)
+    _uint(body, game.version)
+    _letters(body, game.letter_pool)
+    _uint(body, len(game.turn_order))
+    turn = game.turn
+    for pid in game.turn_order:
+        player = game.players[pid]
+        _str(body, player.name)
+        _uint(body, player.score)
+        body.append(
+            (TURN if player is turn else 0) | (CONNECTED if pid in connected else 0)
+        )
+        _uint(body, len(player.words))
+        for word in player.words:
+            _str(body, word)
+
+    frames = {}
+    for i, pid in enumerate(game.turn_order):
+        if pid in connected:
+            frame = bytearray([ACTION_CODES["game_state"]])
+            _uint(frame, i)  # which player is `you`
+            frames[pid] = bytes(frame + body)
+    return frames
+
+
+class _Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pos = 0
+
+    def byte(self) -> int:
+        self.pos += 1
+        return self.data[self.pos - 1]
+
+    def uint(self) -> int:
+        n = shift = 0
+        while True:
+            b = self.byte()
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    def raw(self, n: int) -> bytes:
+        self.pos += n
+        return self.data[self.pos - n : self.pos]
+
+    def str(self) -> str:
+        return self.raw(self.uint()).decode()
+
+    def letters(self) -> list[str]:
+        return list(self.raw(self.uint()).decode("ascii"))
+
+
+def decode(data: bytes) -> dict:
+    """Decode a frame into message content."""
+    r = _Reader(data)
+    action = ACTIONS[r.byte() - 1]
+    match action:
+        case "set_cookie":
+            return {"action": action, "name": r.str(), "value": r.str()}
+        case "error":
+            return {"action": action, "err_type": r.str(), "description": r.str()}
+        case "leave_game":
+            return {"action": action}
+        case "game_state":
+            you = r.uint()
+            game_id, version, pool = r.str(), r.uint(), r.letters()
+            players = []
+            for i in range(r.uint()):
+                name, score, flags = r.str(), r.uint(), r.byte()
+                players.append(
+                    {
+                        "name": name,
+                        "score": score,
+                        "words": [r.str() for _ in range(r.uint())],
+                        "turn": bool(flags & TURN),
+                        "you": i == you,
+                        "connected": bool(flags & CONNECTED),
+                    }
+                )
+            return {
+                "action": action,
+                "players": players,
+                "letter_pool": pool,
+                "game_id": game_id,
+                "version": version,
+            }
+        case "game_patch":
+            game_id, base, version = r.str(), r.uint(), r.uint()
+            changes = [_decode_change(r) for _ in range(r.uint())]
+            return {
+                "action": action,
+                "game_id": game_id,
+                "base": base,
+                "version": version,
+                "changes": changes,
+            }
+    raise ValueError(f"Unknown action {action!r}")
+
+
+def _decode_change(r: _Reader) -> Change:
+    op = OPS[r.byte() - 1]
+    match op:
+        case "pool":
+            return {"op": op, "letters": r.letters()}
+        case "add_player":
+            return {
+                "op": op,
+                "name": r.str(),
+                "words": [r.str() for _ in range(r.uint())],
+            }
+        case "remove_player":
+            return {"op": op, "player": r.uint(), "turn": r.uint()}
+        case "add_word":
+            return {"op": op, "player": r.uint(), "word": r.str()}
+        case "turn":
+            return {"op": op, "player": r.uint()}
+        case "letter":
+            return {"op": op, "letter": chr(r.byte())}
+        case "take":
+            letters = r.letters()
+            words = [[r.uint(), r.uint()] for _ in range(r.uint())]
+            return {"op": op, "letters": letters, "words": words}
+    raise ValueError(f"Unknown change {op!r}")
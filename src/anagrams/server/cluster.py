@@ -0,0 +1,395 @@
+"""
+Running the server as several worker processes, each with its own game
+manager, behind a router that owns the public port.
+
+Every game lives on exactly one worker. Game IDs are split between the
+workers by hash, and each worker only starts games with IDs it owns, so the
+owner of any game ID is known without asking anyone. The router relays each
+client's websocket to one worker: a new client goes to the least busy
+worker (and starts its games there), a returning client goes back to the
+worker it was last on, and a client joining a game is moved to the worker
+that owns it. Workers listen on Unix sockets, so they can trust the client
+IDs that the router hands out. Words to check (`POST /words`) aren't tied to
+any game, so the workers take turns checking them.
+"""
+
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack, asynccontextmanager, suppress
+from pathlib import Path
+from typing import Annotated
+from uuid import UUID, uuid4
+
+import h11
+import httpx
+from fastapi import Cookie, FastAPI, HTTPException, Request, WebSocket
+from fastapi.responses import RedirectResponse, Response
+from fastapi.staticfiles import StaticFiles
+from websockets.asyncio.client import ClientConnection, unix_connect
+from websockets.exceptions import ConnectionClosed
+
+from . import binary
+from .log import get_logger
+from .messages import Message
+from .words import NDJSONResponse
+
+logger = get_logger(__name__)
+
+
+def owner(game_id: str, workers: int) -> int:
+    """The worker that owns `game_id`, out of `workers`."""
+    return zlib.crc32(game_id.encode()) % workers
+
+
+def parse_shard(shard: str | None) -> tuple[int, int]:
+    """Parse a worker's `index/count`, as in `ANAGRAMS_SHARD`."""
+    if not shard:
+        return 0, 1
+    index, count = shard.split("/")
+    return int(index), int(count)
+
+
+class Registry:
+    """Which worker each game and each client belongs to."""
+
+    def __init__(self, workers: int, max_clients: int = 1_000_000) -> None:
+        self.workers = workers
+        self.connections = [0] * workers
+        """How many clients are connected to each worker"""
+        self.clients: OrderedDict[UUID, int] = OrderedDict()
+        """The worker each client was last on, least recent first"""
+        self.max_clients = max_clients
+
+    def game_worker(self, game_id: str) -> int:
+        return owner(game_id, self.workers)
+
+    def client_worker(self, client_id: UUID) -> int:
+        """Where to connect a client: where it was last, or the least busy worker."""
+        worker = self.clients.get(client_id)
+        if worker is None:
+            worker = min(range(self.workers), key=self.connections.__getitem__)
+        return worker
+
+    def assign(self, client_id: UUID, worker: int):
+        self.clients[client_id] = worker
+        self.clients.move_to_end(client_id)
+        if len(self.clients) > self.max_clients:
+            self.clients.popitem(last=False)
+
+
+def _serve_worker(path: str, index: int, count: int):
+    import uvicorn
+
+    os.environ["ANAGRAMS_SHARD"] = f"{index}/{count}"
+    uvicorn.run("anagrams.server.server:app", uds=path, log_level="warning")
+
+
+class Relay:
+    """One client's websocket, relayed to whichever worker it belongs on."""
+
+    def __init__(
+        self, cluster: "Cluster", websocket: WebSocket, client_id: UUID, query: str
+    ) -> None:
+        self.cluster = cluster
+        self.websocket = websocket
+        self.client_id = client_id
+        self.query = query
+        self.worker: int | None = None
+        self.backend: ClientConnection | None = None
+        self._forwarding: asyncio.Task | None = None
+
+    async def connect(self, worker: int):
+        """Connect to `worker`, leaving the current one."""
+        await self.close()
+        self.backend = await unix_connect(
+            self.cluster.sockets[worker],
+            f"ws://worker/ws{self.query}",
+            additional_headers={"Cookie": f"client_id={self.client_id}"},
+            max_queue=None,
+        )
+        self.worker = worker
+        self.cluster.registry.connections[worker] += 1
+        self.cluster.registry.assign(self.client_id, worker)
+        self._forwarding = asyncio.create_task(self._forward(self.backend))
+
+    async def _forward(self, backend: ClientConnection):
+        async for data in backend:
+            if isinstance(data, str):
+                await self.websocket.send_text(data)
+            else:
+                await self.websocket.send_bytes(data)
+        # the worker closed the connection (it's not being switched, or
+        # this task would have been cancelled)
+        await self.websocket.close(1011)
+
+    async def run(self):
+        """Relay the client's messages until it disconnects."""
+        async for text in self.websocket.iter_text():
+            # only joining a game can move a client to another worker
+            if '"join"' in text:
+                message = json.loads(text)
+                if message.get("action") == "join":
+                    game_id = str(message.get("game_id", "")).strip().upper()
+                    worker = self.cluster.registry.game_worker(game_id)
+                    if worker != self.worker:
+                        await self.connect(worker)
+            assert self.backend is not None
+            await self.backend.send(text)
+
+    async def close(self):
+        if self.backend is None:
+            return
+        assert self._forwarding is not None and self.worker is not None
+        self._forwarding.cancel()
+        await asyncio.gather(self._forwarding, return_exceptions=True)
+        await self.backend.close()
+        self.cluster.registry.connections[self.worker] -= 1
+        self.backend = self._forwarding = self.worker = None
+
+
+class Cluster:
+    def __init__(self, workers: int, directory: str | None = None) -> None:
+        """
+        Run the server as `workers` processes, listening on sockets in
+        `directory` (by default, a temporary one), behind `self.app`.
+        """
+        self.workers = workers
+        self.directory = directory or tempfile.mkdtemp(prefix="anagrams-")
+        self.sockets = [
+            os.path.join(self.directory, f"worker-{i}.sock") for i in range(workers)
+        ]
+        self.registry = Registry(workers)
+        self.processes: list[multiprocessing.process.BaseProcess] = []
+        self._word_checkers = itertools.cycle(range(workers))
+        """Which worker checks each `/words` request, taking turns"""
+        self.app = self._create_app()
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        for i, path in enumerate(self.sockets):
+            # not daemonic, since workers start their own search processes
+            process = context.Process(
+                target=_serve_worker, args=(path, i, self.workers)
+            )
+            process.start()
+            self.processes.append(process)
+
+    async def wait_ready(self, timeout: float = 60):
+        """Wait until every worker answers health checks."""
+        deadline = time.monotonic() + timeout
+        for i in range(self.workers):
+            while True:
+                with suppress(httpx.HTTPError):
+                    if (await self.request(i, "GET", "/health")).status_code == 200:
+                        break
+                if not self.processes[i].is_alive():
+                    raise RuntimeError(f"Worker {i} exited while starting")
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Worker {i} didn't start in {timeout}s")
+                await asyncio.sleep(0.1)
+        logger.info(f"Started {self.workers} workers")
+
+    async def request(
+        self, worker: int, method: str, path: str, **kwargs
+    ) -> httpx.Response:
+        transport = httpx.AsyncHTTPTransport(uds=self.sockets[worker])
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://worker"
+        ) as client:
+            return await client.request(method, path, **kwargs)
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        worker: int,
+        method: str,
+        target: str,
+        headers: list[tuple[str, str]],
+        content: AsyncIterator[bytes],
+    ) -> AsyncIterator[tuple[h11.Response, AsyncIterator[bytes]]]:
+        """
+        Send a request to a worker with a streamed body, giving its response
+        and an iterator over the response body, which can be read while the
+        request is still being sent. (httpx sends the whole request before
+        reading any of the response, so a worker that answers a long request
+        as it reads it would wait on the router forever.)
+        """
+        reader, writer = await asyncio.open_unix_connection(self.sockets[worker])
+        connection = h11.Connection(h11.CLIENT)
+
+        async def send(event: h11.Event):
+            writer.write(connection.send(event))  # type: ignore
+            await writer.drain()
+
+        async def receive() -> h11.Event:
+            while True:
+                event = connection.next_event()
+                if event is not h11.NEED_DATA:
+                    return event  # type: ignore
+                connection.receive_data(await reader.read(1 << 16))
+
+        async def send_body():
+            try:
+                async for chunk in content:
+                    if chunk:
+                        await send(h11.Data(data=chunk))
+                await send(h11.EndOfMessage())
+            except Exception:
+                writer.close()  # so the worker doesn't wait for the rest
+                raise
+
+        async def response_body():
+            while isinstance(event := await receive(), h11.Data):
+                yield bytes(event.data)
+
+        if not any(name == "content-length" for name, _ in headers):
+            headers = [*headers, ("transfer-encoding", "chunked")]
+        await send(
+            h11.Request(
+                method=method, target=target, headers=[("host", "worker")] + headers
+            )
+        )
+        sending = asyncio.create_task(send_body())
+        try:
+            response = await receive()
+            if not isinstance(response, h11.Response):
+                raise RuntimeError(f"Worker {worker} sent {response!r}")
+            yield response, response_body()
+        finally:
+            sending.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await sending
+            writer.close()
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(5)
+            if process.is_alive():
+                process.kill()
+        self.processes.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _create_app(self) -> FastAPI:
+        @asynccontextmanager
+        async def lifespan(app: FastAPI):
+            self.start()
+            try:
+                await self.wait_ready()
+                yield
+            finally:
+                self.stop()
+
+        app = FastAPI(lifespan=lifespan)
+        static_dir = Path(__file__).parent.parent / "ui" / "dist"
+        app.mount(
+            "/play", StaticFiles(directory=static_dir, html=True, check_dir=False)
+        )
+
+        @app.get("/")
+        async def root():
+            return RedirectResponse("/play")
+
+        @app.get("/favicon.ico")
+        async def favicon():
+            return RedirectResponse("/play/favicon.ico")
+
+        @app.get("/health")
+        async def health():
+            workers = await asyncio.gather(
+                *(self.request(i, "GET", "/health") for i in range(self.workers))
+            )
+            return {
+                "status": "ok",
+                "connections": self.registry.connections,
+                "workers": [response.json() for response in workers],
+            }
+
+        @app.api_route("/workers/{worker}/{path:path}", methods=["GET", "POST"])
+        async def worker_route(worker: int, path: str, request: Request):
+            """Pass a request on to one worker (e.g. for its `/metrics`)."""
+            if not 0 <= worker < self.workers:
+                raise HTTPException(404, f"There is no worker {worker}")
+            response = await self.request(
+                worker,
+                request.method,
+                f"/{path}",
+                params=request.query_params,
+                content=await request.body(),
+            )
+            return Response(
+                response.content,
+                response.status_code,
+                media_type=response.headers.get("content-type"),
+            )
+
+        @app.post("/words")
+        async def check_words(request: Request):
+            """
+            Check words on one of the workers (see `words.py`), streaming the
+            request to it and its results back, so that the router holds no
+            more than a chunk of either, and the worker's limits apply.
+            """
+            query = request.url.query
+            stack = AsyncExitStack()
+            response, content = await stack.enter_async_context(
+                self.stream(
+                    next(self._word_checkers),
+                    "POST",
+                    f"/words?{query}" if query else "/words",
+                    [
+                        (name, request.headers[name])
+                        for name in ("content-type", "content-length")
+                        if name in request.headers
+                    ],
+                    request.stream(),
+                )
+            )
+            media_type = dict(response.headers).get(b"content-type", b"").decode()
+            if response.status_code != 200:
+                async with stack:
+                    body = b"".join([chunk async for chunk in content])
+                return Response(body, response.status_code, media_type=media_type)
+
+            async def results():
+                async with stack:
+                    async for chunk in content:
+                        yield chunk
+
+            return NDJSONResponse(results())
+
+        @app.websocket("/ws")
+        async def websocket_endpoint(
+            websocket: WebSocket,
+            client_id: Annotated[str | None, Cookie()] = None,
+        ):
+            await websocket.accept()
+            cid = uuid4() if client_id is None else UUID(client_id)
+            query = websocket.url.query
+            relay = Relay(self, websocket, cid, f"?{query}" if query else "")
+            try:
+                await relay.connect(self.registry.client_worker(cid))
+                if client_id is None:
+                    message = Message.set_cookie(name="client_id", value=str(cid))
+                    if websocket.query_params.get("encoding") == "binary":
+                        await websocket.send_bytes(binary.encode(message))
+                    else:
+                        await websocket.send_text(message.encode())
+                await relay.run()
+            except ConnectionClosed:
+                # the worker went away
+                await websocket.close(1011)
+            finally:
+                await relay.close()
+
+        return app
@@ -0,0 +1,143 @@
+import asyncio
+from collections import deque
+from collections.abc import Callable
+
+from fastapi import WebSocket
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+Frame = str | bytes
+"""An encoded message, as JSON text or in the binary encoding"""
+
+
+class Connection:
+    """
+    The outbound side of one client's websocket: a bounded queue of encoded
+    messages, and a writer task that sends them in order.
+
+    Only the latest game state matters, so a new game state replaces any
+    older one that hasn't been sent yet. A game state can be queued as a
+    function that renders it when it is about to be sent, so that it is
+    never out of date and can depend on what this client has already seen.
+    Other messages are never dropped or reordered: a client that falls
+    `max_queue` messages behind is considered stalled, and its connection is
+    closed so that it reconnects and starts over from a fresh game state.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_fail: Callable[["Connection"], None],
+        max_queue: int = 64,
+        send_timeout: float = 5.0,
+    ) -> None:
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self._on_fail = on_fail
+        self._queue: deque[tuple[bool, Frame | Callable[[], Frame | None]]] = deque()
+        self._ready = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: asyncio.Task | None = None
+        self._closing: asyncio.Task | None = None
+        self.closed = False
+
+        self.delta = False
+        """Whether the client accepts game patches instead of full game states"""
+        self.binary = False
+        """Whether the client takes binary frames (see `binary.py`) instead of JSON"""
+        self.view: tuple | None = None
+        """The game and connected players in the last game state sent"""
+        self.version: int | None = None
+        """The version of the game in the last game state sent"""
+
+        self.sent = 0
+        """Messages sent so far"""
+        self.coalesced = 0
+        """Game states that were replaced by a newer one before being sent"""
+        self.dropped = 0
+        """Messages discarded because the connection was closed"""
+
+    @property
+    def depth(self):
+        """The number of messages waiting to be sent."""
+        return len(self._queue)
+
+    def start(self):
+        self._task = asyncio.create_task(self._write())
+
+    def put(self, frame: Frame | Callable[[], Frame | None], state: bool = False):
+        """
+        Queue an encoded message, or a function that encodes it (or returns
+        `None` if there is nothing to send). `state` marks game states.
+        """
+        if self.closed:
+            self.dropped += 1
+            return
+        if state:
+            for i, (queued_state, _) in enumerate(self._queue):
+                if queued_state:
+                    del self._queue[i]
+                    self.coalesced += 1
+                    break
+        elif len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            self._fail("outbound queue is full")
+            return
+        self._queue.append((state, frame))
+        self._idle.clear()
+        self._ready.set()
+
+    async def flush(self):
+        """Wait until everything queued has been sent or the connection closes."""
+        await self._idle.wait()
+
+    def close(self):
+        """Stop sending. Anything still queued is discarded."""
+        if self.closed:
+            return
+        self.closed = True
+        self.dropped += len(self._queue)
+        self._queue.clear()
+        self._idle.set()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    def _fail(self, reason: str):
+        logger.warning(f"Closing connection: {reason}")
+        self.close()
+        self._on_fail(self)
+        self._closing = asyncio.create_task(self._close_websocket())
+
+    async def _close_websocket(self):
+        try:
+            await asyncio.wait_for(self.websocket.close(), self.send_timeout)
+        except Exception:
+            pass  # it's already gone
+
+    async def _write(self):
+        while True:
+            if not self._queue:
+                self._idle.set()
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            _, frame = self._queue.popleft()
+            try:
+                if callable(frame):
+                    frame = frame()
+                    if frame is None:
+                        continue
+                if isinstance(frame, bytes):
+                    send = self.websocket.send_bytes(frame)
+                else:
+                    send = self.websocket.send_text(frame)
+                await asyncio.wait_for(send, self.send_timeout)
+            except Exception as e:
+                self.dropped += 1
+                self._fail(f"render or send failed ({e!r})")
+                return
+            self.sent += 1
@@ -1,53 +1,366 @@
+import asyncio
 import random
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from functools import partial
 from uuid import UUID
 
 from click import style
 from fastapi import WebSocket
 
-from anagrams.core.player import Player
-
 from ..core.dictionary import Dictionary
+from ..core.dictionary.view import DictionaryView
 from ..core.game import Game
+from ..core.letters import LetterSource, WeightedLetters
+from ..core.player import Player
+from ..core.search import AnagramStrategy
+from . import binary, workers
+from .actor import GameActor
+from .cluster import owner
+from .connection import Connection
+from .journal import Journal
 from .log import get_logger
 from .messages import Message
+from .metrics import Metrics
+from .workers import WorkerPool
+
+logger = get_logger(__name__)
 
 GameID = str
 
+_NOT_CACHED = object()
+
+SUGGEST_MAX_LENGTH = 20
+"""The longest unknown word to suggest nearby words for"""
+
+SUGGEST_LIMIT = 3
+"""The most words to suggest for an unknown word"""
+
+SUGGEST_SEARCHES = 8
+"""The most suggestions to search for a way to make, per unknown word"""
+
+ACTIONS = ("join", "start", "word", "letter", "kick", "resync")
+"""The actions that clients can send"""
+
 
 def game_logger(game_id: str):
     return get_logger(style(game_id, fg="cyan", bold=True))
 
 
 class GameManager:
-    def __init__(self):
-        self.active_connections: dict[UUID, WebSocket] = {}
-        self.known_clients: list[UUID] = []
+    def __init__(
+        self,
+        dictionary: Dictionary | None = None,
+        send_timeout: float = 5.0,
+        max_queue: int = 64,
+        game_ttl: float = 6 * 60 * 60,
+        abandoned_ttl: float = 15 * 60,
+        client_ttl: float = 30 * 24 * 60 * 60,
+        max_games: int = 100_000,
+        max_clients: int = 1_000_000,
+        search_workers: int = 0,
+        search_timeout: float = 1.0,
+        metrics: Metrics | None = None,
+        shard: tuple[int, int] = (0, 1),
+        journal: Journal | None = None,
+        letters: Callable[[int], LetterSource] = partial(WeightedLetters, 0.5),
+        seed: int | None = None,
+        views: dict[str, DictionaryView] | None = None,
+        makeable_suggestions: bool = True,
+    ):
+        self.active_connections: dict[UUID, Connection] = {}
+        self.known_clients: OrderedDict[UUID, float] = OrderedDict()
+        """Every client ID handed out, with when it was last seen, oldest first"""
         self.games: dict[GameID, Game] = {}
         self.player_games: dict[UUID, GameID] = {}
-        self.dictionary = Dictionary.load_from_file()
-
-    async def connect(self, websocket: WebSocket, client_id: UUID):
-        """Connect a client to the server."""
+        self.game_members: dict[GameID, set[UUID]] = {}
+        """The clients in each game (the inverse of `player_games`)"""
+        self._game_activity: OrderedDict[GameID, float] = OrderedDict()
+        self.game_ttl = game_ttl
+        """How long a game can go without any activity before it is removed"""
+        self.abandoned_ttl = abandoned_ttl
+        """How long a game with no connected players is kept around"""
+        self.client_ttl = client_ttl
+        """How long a disconnected client's ID is remembered"""
+        self.max_games = max_games
+        """How many games to keep, removing the least recently active first"""
+        self.max_clients = max_clients
+        """How many client IDs to remember, forgetting the least recent first"""
+        self.dictionary = dictionary or Dictionary.load_from_file()
+        self.views: dict[str, Dictionary | DictionaryView] = {
+            "": self.dictionary,
+            **(views or {}),
+        }
+        """The dictionaries that games can be played with, by name"""
+        self.makeable_suggestions = makeable_suggestions
+        """Whether unknown words only get suggestions that the board can make"""
+        self.workers = WorkerPool(self.dictionary, search_workers, search_timeout)
+        """Where strategy searches run, `search_workers` processes (or inline)"""
+        self.metrics = metrics
+        """Where to record metrics, if anywhere"""
+        self.shard = shard
+        """Which of how many cluster workers this is, so it only starts games it owns"""
+        self.journal = journal
+        """Where to record every change to every game, if anywhere"""
+        self.letters = letters
+        """Makes each new game's letter source, given a seed"""
+        self._seeds = random.Random(seed)
+        """Where each new game's seed comes from, so a `seed` replays every game"""
+        self.send_timeout = send_timeout
+        """How long to wait on a client's socket before giving up on it"""
+        self.max_queue = max_queue
+        """How many messages a client can fall behind before it is dropped"""
+        self._closed_stats = {"sent": 0, "coalesced": 0, "dropped": 0}
+        # the latest encoded game states and patches of each game, in each encoding
+        self._frames: dict[GameID, tuple[tuple, dict[bool, dict]]] = {}
+        self._patches: dict[
+            GameID, tuple[int, dict[tuple[int, bool], str | bytes]]
+        ] = {}
+        self._searches: dict[tuple, asyncio.Future] = {}
+        self._actors: dict[GameID, GameActor] = {}
+        """The mailbox of each game that has been sent messages"""
+        self._removed_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        client_id: UUID,
+        delta: bool = False,
+        binary: bool = False,
+    ):
+        """
+        Connect a client to the server. If `delta` is set, the client is sent
+        game patches instead of full game states whenever possible, and if
+        `binary` is set, messages are sent in the binary encoding.
+        """
         await websocket.accept()
-        self.active_connections[client_id] = websocket
-        if client_id not in self.known_clients:
-            self.known_clients.append(client_id)
+        if client_id in self.active_connections:
+            self._remove_connection(client_id)
+        connection = Connection(
+            websocket,
+            on_fail=lambda conn: self.disconnect(client_id, conn.websocket),
+            max_queue=self.max_queue,
+            send_timeout=self.send_timeout,
+        )
+        connection.delta = delta
+        connection.binary = binary
+        connection.start()
+        self.active_connections[client_id] = connection
+        self._touch(client_id)
         if client_id in self.player_games:
             await self.broadcast_game_state(self.player_games[client_id])
 
-    def disconnect(self, client_id: UUID):
-        """Disconnect a client from the server."""
-        if client_id in self.active_connections:
-            self.active_connections.pop(client_id)
+    def disconnect(self, client_id: UUID, websocket: WebSocket | None = None):
+        """
+        Disconnect a client from the server. If `websocket` is given, the
+        client is only disconnected if that is still its current socket.
+        """
+        connection = self.active_connections.get(client_id)
+        if connection is None:
+            return
+        if websocket is None or connection.websocket is websocket:
+            self._remove_connection(client_id)
+            self._touch(client_id)
+
+    def _remove_connection(self, client_id: UUID):
+        connection = self.active_connections.pop(client_id)
+        connection.close()
+        for key in self._closed_stats:
+            self._closed_stats[key] += getattr(connection, key)
+
+    def _touch(self, client_id: UUID, now: float | None = None):
+        """Note activity from a client, and in its game."""
+        if now is None:
+            now = time.monotonic()
+        self.known_clients[client_id] = now
+        self.known_clients.move_to_end(client_id)
+        game_id = self.player_games.get(client_id)
+        if game_id in self._game_activity:
+            self._game_activity[game_id] = now
+            self._game_activity.move_to_end(game_id)
+
+    def _add_member(self, client_id: UUID, game_id: GameID):
+        self._remove_member(client_id)
+        self.player_games[client_id] = game_id
+        self.game_members[game_id].add(client_id)
+
+    def _remove_member(self, client_id: UUID):
+        game_id = self.player_games.pop(client_id, None)
+        if game_id is not None:
+            self.game_members[game_id].discard(client_id)
+
+    def _add_game(self, game_id: GameID, game: Game):
+        self.games[game_id] = game
+        self.game_members[game_id] = set()
+        self._game_activity[game_id] = time.monotonic()
+        if self.journal is not None:
+            game.listener = self.journal.listener(game_id)
+
+    def recover(self):
+        """Restore the games in the journal, and let their players back in."""
+        if self.journal is None:
+            return
+        for game_id, game in self.journal.recover().items():
+            self._add_game(game_id, game)
+            for client_id in game.turn_order:
+                self._add_member(client_id, game_id)
+                self._touch(client_id)
+
+    def _remove_game(self, game_id: GameID) -> set[UUID]:
+        """Remove a game, returning the clients that were in it."""
+        if self.journal is not None:
+            self.journal.record(game_id, {"op": "delete"})
+        game = self.games.pop(game_id)
+        for key in self._removed_cache_stats:
+            self._removed_cache_stats[key] += getattr(game.cache, key)
+        self._game_activity.pop(game_id, None)
+        self._frames.pop(game_id, None)
+        self._patches.pop(game_id, None)
+        # messages already in its mailbox are still handled, and find it gone
+        self._actors.pop(game_id, None)
+        members = self.game_members.pop(game_id)
+        for cid in members:
+            self.player_games.pop(cid)
+        return members
+
+    def sweep(self, now: float | None = None) -> tuple[int, int]:
+        """
+        Remove games that have been idle for `game_ttl`, or that have had no
+        connected players for `abandoned_ttl`, and forget disconnected
+        clients that haven't been seen for `client_ttl`. The least recently
+        active games and clients beyond `max_games` and `max_clients` go too.
+        Returns how many games and clients were removed.
+
+        Games and clients are kept in order of activity, so only the ones
+        that are old enough to remove are looked at.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        stale_games = []
+        excess = len(self._game_activity) - self.max_games
+        for game_id, last in self._game_activity.items():
+            idle = now - last
+            if len(stale_games) < excess or idle >= self.game_ttl:
+                stale_games.append(game_id)
+            elif idle < self.abandoned_ttl:
+                break
+            elif not self.connected_clients_in_game(game_id):
+                stale_games.append(game_id)
+        for game_id in stale_games:
+            for cid in self._remove_game(game_id):
+                self.queue(Message.leave_game(), cid)
+            game_logger(game_id).info("Game deleted (inactive)")
+
+        stale_clients = []
+        excess = len(self.known_clients) - self.max_clients
+        for cid, last in self.known_clients.items():
+            if len(stale_clients) >= excess and now - last < self.client_ttl:
+                break
+            if cid not in self.active_connections:
+                stale_clients.append(cid)
+        for cid in stale_clients:
+            del self.known_clients[cid]
+            game = self.games.get(self.player_games.get(cid, ""))
+            if game is not None and cid in game.players:
+                # nobody could take its turns, or make it leave, anymore
+                self._remove_player(self.player_games[cid], cid, " (inactive)")
+            else:
+                self._remove_member(cid)
+
+        return len(stale_games), len(stale_clients)
+
+    async def sweeper(self, interval: float = 60):
+        """Call `sweep` every `interval` seconds, forever."""
+        while True:
+            await asyncio.sleep(interval)
+            games, clients = self.sweep()
+            if games or clients:
+                logger.info(f"Removed {games} inactive games and {clients} clients")
 
     def connected(self, client_id: UUID):
         """Check if a player is connected."""
         return client_id in self.active_connections
 
+    def connection_stats(self):
+        """Outbound queue statistics, for monitoring."""
+        connections = self.active_connections.values()
+        stats = {
+            "games": len(self.games),
+            "known_clients": len(self.known_clients),
+            "connections": len(connections),
+            "queued": sum(c.depth for c in connections),
+            "max_queue_depth": max((c.depth for c in connections), default=0),
+        }
+        for key, closed in self._closed_stats.items():
+            stats[key] = closed + sum(getattr(c, key) for c in connections)
+        return stats
+
+    def cache_stats(self):
+        """Search cache statistics, summed over every game, for monitoring."""
+        stats = dict(self._removed_cache_stats)
+        for game in self.games.values():
+            for key, value in game.cache.stats().items():
+                if key != "size":
+                    stats[key] += value
+        stats["size"] = sum(len(game.cache) for game in self.games.values())
+        return stats
+
+    def mailbox_stats(self):
+        """Mailbox statistics, summed over every game, for monitoring."""
+        actors = self._actors.values()
+        return {
+            "games": len(self._actors),
+            "running": sum(a.running for a in actors),
+            "queued": sum(a.depth for a in actors),
+            "max_queue_depth": max((a.depth for a in actors), default=0),
+        }
+
+    def game_stats(self, limit: int = 20) -> list[dict]:
+        """
+        The mailbox statistics of the `limit` busiest games: the ones with
+        the most messages waiting, then the ones that have been slowest.
+        """
+        busiest = sorted(
+            self._actors.items(),
+            key=lambda item: (item[1].depth, item[1].max_latency),
+            reverse=True,
+        )
+        return [
+            {"game_id": game_id, **actor.stats()} for game_id, actor in busiest[:limit]
+        ]
+
+    async def check_words(self, words: list[str], dictionary: str = "") -> list[bool]:
+        """
+        Whether each of `words` is in one of the `views` of the dictionary,
+        looked up by the search workers (if there are any).
+        """
+        known = await self.workers.run(workers.check_words, words)
+        view = self.views[dictionary]
+        if isinstance(view, DictionaryView):
+            known = view.contains_many(words, known)
+        if self.metrics is not None:
+            hits = sum(known)
+            self.metrics.dictionary_lookups.inc("hit", amount=hits)
+            self.metrics.dictionary_lookups.inc("miss", amount=len(known) - hits)
+        return known
+
+    async def flush(self):
+        """Wait until every connected client has been sent everything queued."""
+        await asyncio.gather(*(c.flush() for c in self.active_connections.values()))
+
     async def send(self, message: Message, client_id: UUID):
         """Send a client a message."""
-        if self.connected(client_id):
-            await self.active_connections[client_id].send_json(message.content)
+        self.queue(message, client_id)
+
+    def queue(self, message: Message, client_id: UUID):
+        """Queue a message to be sent to a client, in the encoding it asked for."""
+        connection = self.active_connections.get(client_id)
+        if connection is not None:
+            connection.put(
+                binary.encode(message) if connection.binary else message.encode()
+            )
 
     async def send_err(self, client_id: UUID, err_type: str, description: str):
         """Send a client an error message."""
@@ -57,34 +370,215 @@ class GameManager:
         """Get a list of clients in a game that are currently connected."""
         return [
             cid
-            for cid, gid in self.player_games.items()
-            if gid == game_id and self.connected(cid)
+            for cid in self.game_members.get(game_id, ())
+            if cid in self.active_connections
         ]
 
     async def broadcast_game_state(self, game_id: GameID):
         """Broadcast the game state to all the clients in a game."""
-        game = self.games[game_id]
-        connected = self.connected_clients_in_game(game_id)
-        for cid in connected:
-            await self.active_connections[cid].send_json(
-                Message.game_state(cid, game, connected, game_id).content,
+        self._broadcast(game_id)
+
+    def _broadcast(self, game_id: GameID):
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else None
+        recipients = self.connected_clients_in_game(game_id)
+        for cid in recipients:
+            self.send_state(cid, start)
+        if metrics is not None:
+            metrics.broadcasts.observe(time.perf_counter() - start)
+            metrics.fanout.observe(len(recipients))
+
+    def send_state(self, client_id: UUID, queued_at: float | None = None):
+        """
+        Queue the state of a client's game to be sent to it. The message is
+        only rendered when it is about to be sent, as a patch from the last
+        state the client was sent if it accepts patches and nothing but the
+        game itself has changed since, and as a full game state otherwise.
+        """
+        connection = self.active_connections.get(client_id)
+        if connection is not None:
+            connection.put(
+                partial(self._render_state, client_id, connection, queued_at), True
             )
 
+    def _render_state(
+        self, client_id: UUID, connection: Connection, queued_at: float | None
+    ) -> str | bytes | None:
+        if queued_at is not None and self.metrics is not None:
+            self.metrics.state_delay.observe(time.perf_counter() - queued_at)
+        game_id = self.player_games.get(client_id)
+        game = self.games.get(game_id) if game_id is not None else None
+        if game_id is None or game is None:
+            return None
+        connected = tuple(
+            pid for pid in game.turn_order if pid in self.active_connections
+        )
+        view = (game_id, connected)
+        if connection.delta and connection.view == view:
+            assert connection.version is not None
+            text = self._encoded_patch(
+                game_id, game, connection.version, connection.binary
+            )
+        else:
+            text = None
+        if text is None:
+            frames = self._encoded_states(game_id, game, connected, connection.binary)
+            text = frames[client_id]
+        elif not text:
+            return None  # already up to date
+        connection.view = view
+        connection.version = game.version
+        return text
+
+    def _encoded_states(
+        self,
+        game_id: GameID,
+        game: Game,
+        connected: tuple[UUID, ...],
+        binary_encoding: bool = False,
+    ) -> dict[UUID, str] | dict[UUID, bytes]:
+        key = (game.version, connected)
+        cached = self._frames.get(game_id)
+        if cached is None or cached[0] != key:
+            cached = self._frames[game_id] = (key, {})
+        encodings = cached[1]
+        frames = encodings.get(binary_encoding)
+        if frames is None:
+            if binary_encoding:
+                frames = binary.game_state_frames(game, list(connected), game_id)
+            else:
+                frames = Message.game_state_frames(game, list(connected), game_id)
+            encodings[binary_encoding] = frames
+        return frames
+
+    def _encoded_patch(
+        self, game_id: GameID, game: Game, base: int, binary_encoding: bool = False
+    ) -> str | bytes | None:
+        """
+        The patch from version `base` to the current one, empty if there are
+        no changes, or `None` if the changes have been forgotten.
+        """
+        version, patches = self._patches.get(game_id, (None, {}))
+        if version != game.version:
+            patches = {}
+            self._patches[game_id] = (game.version, patches)
+        key = (base, binary_encoding)
+        if key not in patches:
+            changes = game.changes_since(base)
+            if changes is None:
+                return None
+            message = Message.game_patch(game_id, base, game.version, changes)
+            if not changes:
+                patches[key] = ""
+            elif binary_encoding:
+                patches[key] = binary.encode(message)
+            else:
+                patches[key] = message.encode()
+        return patches[key]
+
     async def handle_message(self, message: Message, client_id: UUID):
         """Handle an incoming message from a client."""
+        metrics = self.metrics
+        if metrics is None:
+            await self._deliver(message, client_id)
+            return
+
+        action = message.action if message.action in ACTIONS else "other"
+        slow_words = metrics.slow_words if action == "word" else None
+        inputs = None
+        if slow_words is not None and slow_words.sample():
+            inputs = self._word_inputs(client_id, message["word"])
+        start = time.perf_counter()
+        await self._deliver(message, client_id)
+        elapsed = time.perf_counter() - start
+        metrics.messages.observe(elapsed, action)
+        if inputs is not None:
+            slow_words.record(elapsed, inputs)  # type: ignore
+
+    def _word_inputs(self, client_id: UUID, word: str) -> dict:
+        game = self.games.get(self.player_games.get(client_id, ""))
+        if game is None:
+            return {"word": word}
+        return {
+            "word": word,
+            "game_id": self.player_games[client_id],
+            "letter_pool": "".join(game.letter_pool),
+            "words": {p.name: list(p.words) for p in game.players.values()},
+        }
+
+    def collect_metrics(self) -> str:
+        """Render the metrics in the Prometheus text format."""
+        assert self.metrics is not None
+        connections = self.connection_stats()
+        for kind in ("games", "connections", "queued", "known_clients"):
+            self.metrics.gauges.set(connections[kind], kind)
+        self.metrics.gauges.set(self.mailbox_stats()["queued"], "mailbox_queued")
+        self.metrics.gauges.set(len(self.player_games), "players")
+        for kind in ("sent", "coalesced", "dropped"):
+            self.metrics.totals.set(connections[kind], f"messages_{kind}")
+        cache = self.cache_stats()
+        for kind in ("hits", "misses", "evictions"):
+            self.metrics.totals.set(cache[kind], f"search_cache_{kind}")
+        return self.metrics.render()
+
+    async def _deliver(self, message: Message, client_id: UUID):
+        """
+        Handle a message in the mailbox of the game it is about, or right
+        away if it isn't about a game that exists.
+        """
+        match message.action:
+            case "join":
+                game_id = message["game_id"].strip().upper()
+            case "word" | "letter" | "kick":
+                game_id = self.player_games.get(client_id)
+            case _:
+                game_id = None
+        if game_id not in self.games:
+            await self._handle_message(message, client_id)
+            return
+        actor = self._actors.get(game_id)
+        if actor is None:
+            actor = self._actors[game_id] = GameActor(self.metrics)
+        await actor.call(partial(self._handle_message, message, client_id, game_id))
+
+    async def _handle_message(
+        self, message: Message, client_id: UUID, game_id: GameID | None = None
+    ):
+        """
+        Handle a message from a client. `game_id` is the game whose mailbox
+        it came through, which the client may have left since it was sent.
+        """
         match message.action:
             case "join":
                 await self.handle_join(
                     client_id, message["game_id"].strip().upper(), message["name"]
                 )
             case "start":
-                await self.handle_start(client_id, message["name"])
+                await self.handle_start(
+                    client_id, message["name"], message.content.get("dictionary", "")
+                )
             case "word":
-                await self.handle_word(client_id, message["word"])
+                await self.handle_word(client_id, message["word"], game_id)
             case "letter":
-                await self.handle_letter(client_id)
+                await self.handle_letter(client_id, game_id)
             case "kick":
-                await self.handle_kick(client_id, int(message["player_index"]))
+                await self.handle_kick(client_id, int(message["player_index"]), game_id)
+            case "resync":
+                await self.handle_resync(client_id)
+        self._touch(client_id)
+
+    def _client_game(
+        self, client_id: UUID, game_id: GameID | None = None
+    ) -> tuple[GameID, Game] | None:
+        """
+        The client's game and its ID, if it is in one (and it is `game_id`,
+        if that is given).
+        """
+        current = self.player_games.get(client_id)
+        if current is None or (game_id is not None and current != game_id):
+            return None
+        game = self.games.get(current)
+        return None if game is None else (current, game)
 
     async def handle_join(self, client_id: UUID, game_id: GameID, name: str):
         """Handle a client's request to join a game."""
@@ -106,59 +600,112 @@ class GameManager:
             await self.send_err(client_id, "join_fail", "That name is taken!")
             return
 
-        self.player_games[client_id] = game_id
+        self._add_member(client_id, game_id)
         player = Player(client_id, name, [])
         game.add_player(player)
         game_logger(game_id).info(f"Added {player.name} to the game")
         await self.broadcast_game_state(game_id)
 
-    async def handle_start(self, client_id: UUID, name: str):
-        """Handle a client's request to start a new game."""
+    async def handle_start(self, client_id: UUID, name: str, dictionary: str = ""):
+        """
+        Handle a client's request to start a new game, played with one of
+        the `views` of the dictionary.
+        """
 
         name = name.strip()
         if len(name) == 0:
             await self.send_err(client_id, "start_fail", "Please enter your name.")
             return
+        if dictionary not in self.views:
+            await self.send_err(
+                client_id, "start_fail", f"There is no {dictionary!r} dictionary."
+            )
+            return
 
         def random_game_id() -> GameID:
             return "".join(random.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ", k=4))
 
+        index, count = self.shard
         game_id = random_game_id()
-        while game_id in self.games:
+        while game_id in self.games or owner(game_id, count) != index:
             game_id = random_game_id()
 
-        self.games[game_id] = Game()
+        game = Game(self.letters(self._seeds.getrandbits(64)))
+        game.dictionary = dictionary
+        if self.journal is not None:
+            self.journal.record(
+                game_id,
+                {
+                    "op": "create",
+                    "letters": game.letters.spec,
+                    "dictionary": dictionary,
+                },
+            )
+        self._add_game(game_id, game)
         game_logger(game_id).info("Game created")
         await self.handle_join(client_id, game_id, name)
 
-    async def handle_word(self, client_id: UUID, word: str):
-        game_id = self.player_games[client_id]
-        game = self.games[game_id]
+    async def handle_word(
+        self, client_id: UUID, word: str, game_id: GameID | None = None
+    ):
+        found = self._client_game(client_id, game_id)
+        if found is None:
+            return  # left the game (or it was deleted) since sending this
+        game_id, game = found
 
         word = word.lower().strip()
 
-        if word not in self.dictionary:
-            await self.send_err(
-                client_id,
-                "unknown_word",
-                f"{word.title()} is not in the dictionary.",
-            )
+        dictionary = self.views.get(game.dictionary, self.dictionary)
+        known = word in dictionary
+        if self.metrics is not None:
+            self.metrics.dictionary_lookups.inc("hit" if known else "miss")
+        if not known:
+            description = f"{word.title()} is not in the dictionary."
+            if len(word) <= SUGGEST_MAX_LENGTH:
+                suggestions = await self._suggest(game_id, game, word)
+                if suggestions:
+                    words = [w.title() for w in suggestions]
+                    if len(words) > 1:
+                        words[-2:] = [f"{words[-2]} or {words[-1]}"]
+                    description += f" Did you mean {', '.join(words)}?"
+            await self.send_err(client_id, "unknown_word", description)
             return
 
-        strategies = game.get_anagram_strategies(word)
-        if len(strategies) == 0:
+        for _ in range(3):
+            version = game.version
+            try:
+                strategy = await self._find_strategy(game_id, game, word)
+            except TimeoutError:
+                await self.send_err(
+                    client_id,
+                    "timeout",
+                    f"{word.title()} took too long to check. Please try again.",
+                )
+                return
+            if self.player_games.get(client_id) != game_id:
+                return  # left the game while the search ran
+            if strategy is None:
+                await self.send_err(
+                    client_id,
+                    "unconstructable_word",
+                    f"{word} could not be made from the current tiles.",
+                )
+                return
+            # the game may have changed while the search ran
+            if game.version == version or game.validate_anagram_strategy(strategy):
+                break
+        else:
             await self.send_err(
                 client_id,
                 "unconstructable_word",
-                f"{word} could not be made from the current tiles.",
+                f"The tiles changed before {word} could be made. Please try again.",
             )
             return
 
         # TODO let the user select the strategy
-        strategy = strategies[0]
         game.execute_anagram_strategy(strategy)
+        game.add_word(client_id, word)
         player = game.players[client_id]
-        player.words.append(word)
         log_message = f"{player.name} combined "
         log_message += ", ".join([w.upper() for _, w in strategy[:-1]])
         if len(strategy) > 2:  # oxford comma!
@@ -168,29 +715,129 @@ class GameManager:
         game_logger(game_id).info(log_message)
         await self.broadcast_game_state(game_id)
 
-    async def handle_letter(self, client_id: UUID):
-        game_id = self.player_games[client_id]
-        game = self.games[game_id]
+    async def _suggest(self, game_id: GameID, game: Game, word: str) -> list[str]:
+        """
+        Words of the game's dictionary near the unknown `word`. Unless
+        `makeable_suggestions` is off, only words that could be played right
+        now are suggested: the nearest few that pass the cheap letter count
+        check are searched for a way to make them, all at once.
+        """
+        dictionary = self.views.get(game.dictionary, self.dictionary)
+        if not self.makeable_suggestions:
+            return self.dictionary.suggestions(
+                word, limit=SUGGEST_LIMIT, accept=lambda w: w in dictionary
+            )
+
+        candidates = self.dictionary.suggestions(
+            word,
+            limit=SUGGEST_SEARCHES,
+            accept=lambda w: w in dictionary and game.could_make(w),
+        )
+        strategies = await asyncio.gather(
+            *(self._find_strategy(game_id, game, w) for w in candidates),
+            return_exceptions=True,
+        )
+        makeable = [
+            w
+            for w, strategy in zip(candidates, strategies)
+            # a search that failed (or timed out) found no way to make it
+            if strategy is not None and not isinstance(strategy, Exception)
+        ]
+        return makeable[:SUGGEST_LIMIT]
+
+    async def _find_strategy(
+        self, game_id: GameID, game: Game, word: str
+    ) -> AnagramStrategy | None:
+        """
+        Find a way to make `word` in a worker, unless the game has already
+        cached one. Concurrent searches for the same letters on the same
+        board share a single job.
+        """
+        key = game.strategy_key(word)
+        if key is None or not game.could_make(word):
+            return None
+        strategy = game.cache.get(key, _NOT_CACHED)
+        if strategy is not _NOT_CACHED:
+            return strategy
+
+        search = self._searches.get((game_id, key))
+        if search is None:
+            search = asyncio.ensure_future(self._search(word, game))
+            self._searches[(game_id, key)] = search
+
+            def done(search: asyncio.Future):
+                self._searches.pop((game_id, key), None)
+                if not search.cancelled() and search.exception() is None:
+                    game.cache.put(key, search.result())
+
+            search.add_done_callback(done)
+        # one client giving up shouldn't cancel the search for the others
+        return await asyncio.shield(search)
+
+    async def _search(self, word: str, game: Game) -> AnagramStrategy | None:
+        if self.metrics is None:
+            return await self.workers.run(
+                workers.find_strategy, word, *workers.board(game)
+            )
+        start = time.perf_counter()
+        try:
+            return await self.workers.run(
+                workers.find_strategy, word, *workers.board(game)
+            )
+        finally:
+            self.metrics.strategy_search.observe(time.perf_counter() - start)
+
+    async def handle_letter(self, client_id: UUID, game_id: GameID | None = None):
+        found = self._client_game(client_id, game_id)
+        if found is None:
+            return  # left the game (or it was deleted) since sending this
+        game_id, game = found
 
         if game.turn is not None and game.turn.id == client_id:
-            game.new_letter(temperature=0.5)
+            if game.new_letter() is None:
+                await self.send_err(
+                    client_id, "letter_fail", "There are no letters left."
+                )
+                return
             game.next_turn()
             await self.broadcast_game_state(game_id)
 
-    async def handle_kick(self, client_id: UUID, player_index: int):
-        game_id = self.player_games[client_id]
-        game = self.games[game_id]
+    async def handle_kick(
+        self, client_id: UUID, player_index: int, game_id: GameID | None = None
+    ):
+        found = self._client_game(client_id, game_id)
+        if found is None:
+            return  # left the game (or it was deleted) since sending this
+        game_id, game = found
 
         # only the host can kick other players
         if game.turn_order[0] == client_id:
             remove_player_id = game.turn_order[player_index]
-            remove_player = game.players[remove_player_id]
-            game.remove_player(remove_player_id)
-            game_logger(game_id).info(f"Removed {remove_player.name} from the game")
-            self.player_games.pop(remove_player_id)
-            if len(game.players) == 0:
-                self.games.pop(game_id)
-                game_logger(game_id).info("Game deleted (no more players)")
-            else:
-                await self.broadcast_game_state(game_id)
+            self._remove_player(game_id, remove_player_id)
             await self.send(Message.leave_game(), remove_player_id)
+
+    def _remove_player(self, game_id: GameID, client_id: UUID, reason: str = ""):
+        """
+        Take a client's seat in a game away, deleting the game if that was
+        the last one, and tell the rest of the players.
+        """
+        game = self.games[game_id]
+        player = game.players[client_id]
+        game.remove_player(client_id)
+        game_logger(game_id).info(f"Removed {player.name} from the game{reason}")
+        self._remove_member(client_id)
+        if len(game.players) == 0:
+            self._remove_game(game_id)
+            game_logger(game_id).info("Game deleted (no more players)")
+        else:
+            self._broadcast(game_id)
+
+    async def handle_resync(self, client_id: UUID):
+        """
+        Handle a client's request for a full game state, when a patch doesn't
+        apply to its copy of the game.
+        """
+        connection = self.active_connections.get(client_id)
+        if connection is not None:
+            connection.view = None
+            self.send_state(client_id)
@@ -0,0 +1,224 @@
+"""
+An append-only journal of every change to every game, with snapshots, so
+that games survive a restart.
+
+Each record is a line of JSON, `[game_id, version, change]`, where a
+change is one of the game's own changes (see `Game.changes`) and `version`
+is the version it produced, or the change is `create` or `delete` for the
+game as a whole. Records are buffered in memory and written out with one
+`fsync` every `interval` seconds, in a thread, so handling a message never
+waits on the disk (and a crash loses at most the last `interval` seconds
+of changes).
+
+Every so often the journal starts a new file and every game is pickled into
+a snapshot, a chunk of games at a time so that the server keeps running in
+between, and the files that the snapshot covers are deleted. Recovering
+loads the latest snapshot and replays the journal files after it, skipping
+the changes that a game already had when it was saved.
+"""
+
+import asyncio
+import glob
+import json
+import os
+import pickle
+from collections.abc import Callable
+from typing import IO
+
+from ..core.game import Change, Game
+from ..core.letters import letter_source
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+GameID = str
+
+SNAPSHOT_FORMAT = 3
+"""Incremented whenever snapshots can't be read by older versions"""
+
+SNAPSHOT_CHUNK = 256
+"""How many games to pickle at a time"""
+
+
+class Journal:
+    def __init__(
+        self, directory: str, interval: float = 0.1, snapshot_every: int = 100_000
+    ) -> None:
+        """
+        Keep a journal in `directory`, writing it out every `interval`
+        seconds and taking a snapshot every `snapshot_every` records.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.interval = interval
+        self.snapshot_every = snapshot_every
+        self._buffer: list[str] = []
+        self._records = 0
+        """Records since the last snapshot"""
+        self._number = 0
+        """The number of the journal file being written"""
+        self._file: IO[str] | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.directory, "snapshot.pickle")
+
+    def _journal_path(self, number: int):
+        return os.path.join(self.directory, f"journal-{number:08}.jsonl")
+
+    def _journal_files(self) -> list[tuple[int, str]]:
+        paths = glob.glob(os.path.join(self.directory, "journal-*.jsonl"))
+        return sorted((int(os.path.basename(p)[8:-6]), p) for p in paths)
+
+    def recover(self) -> dict[GameID, Game]:
+        """
+        Load the games from the latest snapshot and the journal after it,
+        then start a new journal file.
+        """
+        games: dict[GameID, Game] = {}
+        first = 0
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                version, first = pickle.load(f)
+                if version != SNAPSHOT_FORMAT:
+                    raise ValueError(f"unknown snapshot format {version}")
+                while True:
+                    try:
+                        games.update(pickle.load(f))
+                    except EOFError:
+                        break
+        except FileNotFoundError:
+            pass
+
+        records = 0
+        files = self._journal_files()
+        for number, path in files:
+            if number < first:
+                continue
+            with open(path) as f:
+                for line in f:
+                    try:
+                        game_id, version, change = json.loads(line)
+                    except ValueError:
+                        # the end of a write that was cut short by a crash
+                        logger.warning(f"Skipped a partial record in {path}")
+                        break
+                    self._replay(games, game_id, version, change)
+                    records += 1
+        if games or records:
+            logger.info(f"Recovered {len(games)} games ({records} journal records)")
+
+        self._number = max([first, *(number + 1 for number, _ in files)])
+        self._records = records
+        self._file = open(self._journal_path(self._number), "a")
+        return games
+
+    @staticmethod
+    def _replay(
+        games: dict[GameID, Game], game_id: GameID, version: int, change: Change
+    ):
+        match change["op"]:
+            case "create":
+                spec = change.get("letters")
+                game = games[game_id] = Game(
+                    None if spec is None else letter_source(spec)
+                )
+                game.dictionary = change.get("dictionary", "")
+            case "delete":
+                games.pop(game_id, None)
+            case _:
+                game = games[game_id]
+                if version > game.version:
+                    game.apply_change(change)
+
+    def record(self, game_id: GameID, change: Change, version: int = 0):
+        """Add a change, which brought a game to `version`, to the next write."""
+        record = [game_id, version, change]
+        self._buffer.append(
+            json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+        )
+        self._records += 1
+
+    def listener(self, game_id: GameID) -> Callable[[Game, Change], None]:
+        """A `Game.listener` that records the game's changes."""
+
+        def record(game: Game, change: Change):
+            if change["op"] == "add_player":
+                # the player who was just added
+                change = {**change, "id": str(game.turn_order[-1])}
+            self.record(game_id, change, game.version)
+
+        return record
+
+    @staticmethod
+    def _write(file: IO[str], lines: list[str]):
+        file.write("".join(lines))
+        file.flush()
+        os.fsync(file.fileno())
+
+    async def flush(self):
+        """Write out and sync the buffered records."""
+        async with self._lock:
+            if not self._buffer or self._file is None:
+                return
+            lines, self._buffer = self._buffer, []
+            await asyncio.to_thread(self._write, self._file, lines)
+
+    async def snapshot(self, games: dict[GameID, Game]):
+        """Save every game, and delete the journal files that it covers."""
+        async with self._lock:
+            if self._file is None:
+                return
+            # changes from here on go into a new journal file
+            lines, self._buffer = self._buffer, []
+            file = self._file
+            self._number += 1
+            self._file = open(self._journal_path(self._number), "a")
+            self._records = 0
+            await asyncio.to_thread(self._write, file, lines)
+            file.close()
+
+            chunks = [pickle.dumps((SNAPSHOT_FORMAT, self._number))]
+            game_ids = list(games)
+            for i in range(0, len(game_ids), SNAPSHOT_CHUNK):
+                chunk = {
+                    game_id: games[game_id]
+                    for game_id in game_ids[i : i + SNAPSHOT_CHUNK]
+                    if game_id in games
+                }
+                chunks.append(pickle.dumps(chunk, pickle.HIGHEST_PROTOCOL))
+                await asyncio.sleep(0)  # let the games go on
+            await asyncio.to_thread(self._write_snapshot, chunks, self._number)
+        logger.info(f"Saved a snapshot of {len(game_ids)} games")
+
+    def _write_snapshot(self, chunks: list[bytes], first: int):
+        temp = self.snapshot_path + ".tmp"
+        with open(temp, "wb") as f:
+            f.writelines(chunks)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.snapshot_path)
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        for number, path in self._journal_files():
+            if number < first:
+                os.remove(path)
+
+    async def run(self, games: dict[GameID, Game]):
+        """Write out the journal, and snapshot `games` when it's due, forever."""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+            if self._records >= self.snapshot_every:
+                await self.snapshot(games)
+
+    async def close(self, games: dict[GameID, Game]):
+        """Save a final snapshot, so that the next start has nothing to replay."""
+        await self.snapshot(games)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
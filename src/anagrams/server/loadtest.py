@@ -0,0 +1,338 @@
+"""
+A load generator that plays many games at once over the `/ws` protocol,
+to find out how many players a server can handle.
+
+Each simulated game connects its players, starts and joins a game, plays
+a number of rounds (the player whose turn it is draws a letter, and now and
+then someone makes a word from the pool), and finally the host kicks
+everyone out. Within a game, each action waits for its response and for
+the resulting game state to reach every player before the next one, so
+the latency of an action is the time until its sender hears back, and the
+fan-out latency is the time until the last player in the game does.
+
+The server is either a running one (`--url`) or the real app started
+in-process on a local port.
+"""
+
+import asyncio
+import json
+import random
+import resource
+import socket
+import statistics
+import time
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from websockets.asyncio.client import ClientConnection, connect
+
+from ..core.dictionary import Dictionary
+from . import binary
+
+STATE_ACTIONS = ("game_state", "game_patch")
+
+
+@dataclass
+class Stats:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    """Seconds from sending each action to hearing back, by action"""
+    sent: int = 0
+    received: int = 0
+    received_bytes: int = 0
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    """Error messages received, by type"""
+    failed_games: int = 0
+
+    def record(self, action: str, seconds: float):
+        self.latencies[action].append(seconds)
+
+
+def percentile(values: list[float], p: float) -> float:
+    """The `p`th percentile of `values` (nearest rank)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+class SimPlayer:
+    def __init__(self, ws: ClientConnection, name: str, stats: Stats) -> None:
+        self.ws = ws
+        self.name = name
+        self.stats = stats
+        self.inbox: asyncio.Queue[dict] = asyncio.Queue()
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        async for frame in self.ws:
+            self.stats.received += 1
+            self.stats.received_bytes += len(frame)
+            if isinstance(frame, bytes):
+                message = binary.decode(frame)
+            else:
+                message = json.loads(frame)
+            if message["action"] == "error":
+                self.stats.errors[message["err_type"]] += 1
+            self.inbox.put_nowait(message)
+
+    async def send(self, action: str, **content):
+        self.stats.sent += 1
+        await self.ws.send(json.dumps({"action": action, **content}))
+
+    async def expect(self, *actions: str, timeout: float = 30) -> dict:
+        """Wait for the next message with one of `actions`, skipping others."""
+        async with asyncio.timeout(timeout):
+            while True:
+                message = await self.inbox.get()
+                if message["action"] in actions:
+                    return message
+
+    async def close(self):
+        self._reader.cancel()
+        await self.ws.close()
+
+
+class SimGame:
+    def __init__(
+        self,
+        url: str,
+        players: int,
+        rounds: int,
+        think: float,
+        stats: Stats,
+        dictionary: Dictionary | None,
+        rng: random.Random,
+    ) -> None:
+        self.url = url
+        self.num_players = players
+        self.rounds = rounds
+        self.think = think
+        self.stats = stats
+        self.dictionary = dictionary
+        self.rng = rng
+        self.players: list[SimPlayer] = []
+        self.state: dict = {}
+
+    async def connect(self, name: str) -> SimPlayer:
+        start = time.perf_counter()
+        ws = await connect(self.url, max_queue=None)
+        player = SimPlayer(ws, name, self.stats)
+        await player.expect("set_cookie")
+        self.stats.record("connect", time.perf_counter() - start)
+        return player
+
+    async def act(self, player: SimPlayer, action: str, **content) -> dict:
+        """
+        Send an action and wait for its response, then for the game state
+        to reach the rest of the players.
+        """
+        others = [p for p in self.players if p is not player]
+        start = time.perf_counter()
+        await player.send(action, **content)
+        response = await player.expect("error", "leave_game", *STATE_ACTIONS)
+        self.stats.record(action, time.perf_counter() - start)
+        if response["action"] in STATE_ACTIONS:
+            self._update(response)
+            await asyncio.gather(*(p.expect(*STATE_ACTIONS) for p in others))
+            self.stats.record("fanout", time.perf_counter() - start)
+        return response
+
+    def _update(self, message: dict):
+        if message["action"] == "game_state":
+            self.state = message
+            return
+        # only keep track of what the simulation needs from patches
+        players, pool = self.state["players"], self.state["letter_pool"]
+        for change in message["changes"]:
+            match change["op"]:
+                case "letter":
+                    pool.append(change["letter"])
+                case "pool":
+                    pool[:] = change["letters"]
+                case "take":
+                    for letter in change["letters"]:
+                        pool.remove(letter)
+                case "turn" | "remove_player":
+                    if change["op"] == "remove_player":
+                        players.pop(change["player"])
+                    turn = change.get("turn", change["player"])
+                    for i, p in enumerate(players):
+                        p["turn"] = i == turn
+                case "add_player":
+                    players.append({"name": change["name"], "turn": False})
+
+    def _word(self) -> str | None:
+        pool = "".join(self.state.get("letter_pool", []))
+        if self.dictionary is None or len(pool) < 3:
+            return None
+        index = self.dictionary.anagram_index
+        return next(index.subanagrams(pool, min_length=3, limit=1), None)
+
+    async def play(self):
+        try:
+            host = await self.connect("Host")
+            self.players.append(host)
+            state = await self.act(host, "start", name="Host")
+            game_id = state["game_id"]
+            for i in range(1, self.num_players):
+                player = await self.connect(f"Player {i + 1}")
+                self.players.append(player)
+                await self.act(player, "join", game_id=game_id, name=player.name)
+
+            for _ in range(self.rounds):
+                await asyncio.sleep(self.think * self.rng.random() * 2)
+                turn = next(
+                    (i for i, p in enumerate(self.state["players"]) if p["turn"]), 0
+                )
+                await self.act(self.players[turn], "letter")
+                if self.rng.random() < 0.5 and (word := self._word()):
+                    await self.act(self.rng.choice(self.players), "word", word=word)
+
+            for i in range(len(self.players) - 1, 0, -1):
+                kicked = self.players.pop(i)
+                await self.act(host, "kick", player_index=i)
+                await kicked.expect("leave_game")
+                await kicked.close()
+            await host.send("kick", player_index=0)
+            await host.expect("leave_game")
+        except (TimeoutError, OSError, KeyError) as e:
+            self.stats.failed_games += 1
+            self.stats.errors[type(e).__name__] += 1
+        finally:
+            await asyncio.gather(
+                *(p.close() for p in self.players), return_exceptions=True
+            )
+
+
+async def run_load(
+    url: str,
+    games: int,
+    players: int = 4,
+    rounds: int = 20,
+    think: float = 0.1,
+    ramp: float = 1.0,
+    words: bool = True,
+    delta: bool = False,
+    binary: bool = False,
+    seed: int = 1234,
+) -> tuple[Stats, float]:
+    """
+    Play `games` games of `players` players against the server at `url`,
+    starting them over `ramp` seconds. Players make words from the pool if
+    `words` is set, ask for game patches if `delta` is set, and ask for
+    binary frames if `binary` is set. Returns the stats and how long it took.
+    """
+    query = [
+        option
+        for option, enabled in [("protocol=delta", delta), ("encoding=binary", binary)]
+        if enabled
+    ]
+    if query:
+        url += "?" + "&".join(query)
+    stats = Stats()
+    rng = random.Random(seed)
+    dictionary = Dictionary.load_from_file() if words else None
+    if dictionary is not None:
+        dictionary.anagram_index  # built on first use, so build it up front
+
+    async def start_game(delay: float, game: SimGame):
+        await asyncio.sleep(delay)
+        await game.play()
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            start_game(
+                ramp * i / games,
+                SimGame(
+                    url,
+                    players,
+                    rounds,
+                    think,
+                    stats,
+                    dictionary,
+                    random.Random(rng.random()),
+                ),
+            )
+            for i in range(games)
+        )
+    )
+    return stats, time.perf_counter() - start
+
+
+async def run_in_process(workers: int = 1, **kwargs) -> tuple[Stats, float]:
+    """
+    Run the load against the server app, started on a local port, or
+    against a cluster of `workers` processes.
+    """
+    import uvicorn
+
+    if workers > 1:
+        from .cluster import Cluster
+
+        app = Cluster(workers).app
+    else:
+        from .server import app
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    config = uvicorn.Config(app, log_level="warning", backlog=4096)
+    server = uvicorn.Server(config)
+    serving = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        return await run_load(f"ws://127.0.0.1:{port}/ws", **kwargs)
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def raise_open_file_limit():
+    """Allow as many sockets as the system will, for thousands of players."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def report(stats: Stats, elapsed: float) -> dict:
+    """Summarize a run as messages per second and latency percentiles."""
+    actions = {}
+    for action, values in sorted(stats.latencies.items()):
+        actions[action] = {
+            "count": len(values),
+            "mean_ms": statistics.fmean(values) * 1000,
+            **{f"p{p}_ms": percentile(values, p) * 1000 for p in (50, 95, 99)},
+            "max_ms": max(values) * 1000,
+        }
+    return {
+        "elapsed_s": elapsed,
+        "sent": stats.sent,
+        "received": stats.received,
+        "sent_per_s": stats.sent / elapsed,
+        "received_per_s": stats.received / elapsed,
+        "received_bytes": stats.received_bytes,
+        "failed_games": stats.failed_games,
+        "errors": dict(stats.errors),
+        "actions": actions,
+    }
+
+
+def format_report(summary: dict) -> Iterable[str]:
+    yield (
+        f"{summary['sent']} messages sent ({summary['sent_per_s']:.0f}/s), "
+        f"{summary['received']} received ({summary['received_per_s']:.0f}/s, "
+        f"{summary['received_bytes'] / max(summary['received'], 1):.0f} bytes each) "
+        f"in {summary['elapsed_s']:.1f}s"
+    )
+    if summary["failed_games"]:
+        yield f"{summary['failed_games']} games failed"
+    if summary["errors"]:
+        yield "errors: " + ", ".join(f"{k} x{v}" for k, v in summary["errors"].items())
+    yield f"{'action':<10} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"
+    for action, s in summary["actions"].items():
+        yield (
+            f"{action:<10} {s['count']:>7} {s['p50_ms']:>6.1f} ms {s['p95_ms']:>6.1f} ms"
+            f" {s['p99_ms']:>6.1f} ms {s['max_ms']:>6.1f} ms"
+        )
@@ -1,8 +1,14 @@
+import json
 from uuid import UUID
 
 from ..core.game import Game
 
 
+def encode(content: dict) -> str:
+    """Encode message content as JSON text, the same way `send_json` does."""
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False)
+
+
 class Message:
     def __init__(self, action: str, **kwargs) -> None:
         self.content = dict(action=action, **kwargs)
@@ -17,6 +23,9 @@ class Message:
     def action(self):
         return self.content["action"]
 
+    def encode(self) -> str:
+        return encode(self.content)
+
     @classmethod
     def set_cookie(cls, name: str, value: str):
         return Message(action="set_cookie", name=name, value=value)
@@ -56,4 +65,68 @@ class Message:
             ],
             letter_pool=game.letter_pool,
             game_id=game_id,
+            version=game.version,
         )
+
+    @classmethod
+    def game_patch(cls, game_id: str, base: int, version: int, changes: list[dict]):
+        """
+        The changes that bring the client's copy of a game from version
+        `base` to `version` (see `Game.changes`).
+        """
+        return Message(
+            action="game_patch",
+            game_id=game_id,
+            base=base,
+            version=version,
+            changes=changes,
+        )
+
+    @classmethod
+    def game_state_frames(
+        cls, game: Game, connected: list[UUID], game_id: str
+    ) -> dict[UUID, str]:
+        """
+        Encode `game_state` messages for every client in `connected`.
+
+        The messages only differ in which player is flagged as `you`, so each
+        player is encoded once with and once without the flag, and the
+        frames are spliced together from those pieces.
+        """
+        players: list[tuple[UUID, str, str]] = []
+        for pid in game.turn_order:
+            p = game.players[pid]
+            player = {
+                "name": p.name,
+                "score": p.score,
+                "words": p.words,
+                "turn": p == game.turn,
+                "you": False,
+                "connected": pid in connected,
+            }
+            others = encode(player)
+            player["you"] = True
+            players.append((pid, others, encode(player)))
+
+        # the frame is '{"action":"game_state","players":[' + players + '],' + tail
+        head = encode({"action": "game_state", "players": []})[:-2]
+        tail = encode(
+            {
+                "letter_pool": game.letter_pool,
+                "game_id": game_id,
+                "version": game.version,
+            }
+        )[1:]
+        return {
+            cid: "".join(
+                [
+                    head,
+                    ",".join(
+                        you if pid == cid else others for pid, others, you in players
+                    ),
+                    "],",
+                    tail,
+                ]
+            )
+            for cid in connected
+        }
@@ -0,0 +1,226 @@
+"""
+Minimal Prometheus-style metrics: counters, gauges and histograms, rendered
+in the text exposition format for `/metrics`.
+
+Metrics are only collected when the game manager is given a `Metrics`
+object, and every instrumented call site checks for it first, so a
+server without metrics pays one attribute check per event.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Iterator, Sequence
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """The sample lines of the metric, in the text exposition format."""
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, value: float, *labels: str):
+        """Set the value directly, for totals that are counted elsewhere."""
+        self.values[labels] = value
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # per label values: a count for each bucket (and one past the last), and the sum
+        self.values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def samples(self):
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = _labels(self.label_names, labels, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            plain = _labels(self.label_names, labels)
+            yield f"{self.name}_sum{plain} {_number(total[0])}"
+            yield f"{self.name}_count{plain} {cumulative}"
+
+
+class SlowCalls:
+    """
+    Keeps the slowest of a random sample of calls, with whatever inputs the
+    caller recorded, for finding out what makes a call slow.
+    """
+
+    def __init__(self, size: int = 20, sample_rate: float = 1.0) -> None:
+        self.size = size
+        self.sample_rate = sample_rate
+        self._heap: list[tuple[float, int, dict]] = []
+        self._seq = itertools.count()
+
+    def sample(self) -> bool:
+        """Whether to record the next call."""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, seconds: float, inputs: dict):
+        entry = (seconds, next(self._seq), inputs)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, entry)
+        elif seconds > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def slowest(self) -> list[dict]:
+        return [
+            {"seconds": seconds, **inputs}
+            for seconds, _, inputs in sorted(self._heap, reverse=True)
+        ]
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.messages = Histogram(
+            "anagrams_message_seconds",
+            "Time to handle a client message, by action.",
+            labels=("action",),
+        )
+        self.strategy_search = Histogram(
+            "anagrams_strategy_search_seconds",
+            "Time to search for a way to make a word (cache misses only).",
+        )
+        self.dictionary_lookups = Counter(
+            "anagrams_dictionary_lookups_total",
+            "Words looked up in the dictionary, by whether they were found.",
+            labels=("result",),
+        )
+        self.broadcasts = Histogram(
+            "anagrams_broadcast_seconds",
+            "Time to queue a game state for every player in a game.",
+        )
+        self.fanout = Histogram(
+            "anagrams_broadcast_recipients",
+            "Connected players that each broadcast goes to.",
+            buckets=SIZE_BUCKETS,
+        )
+        self.state_delay = Histogram(
+            "anagrams_state_queue_seconds",
+            "Time from a broadcast until a player's game state is rendered to send.",
+        )
+        self.mailbox_wait = Histogram(
+            "anagrams_mailbox_seconds",
+            "Time a client message waits for its game to handle the ones before it.",
+        )
+        self.loop_lag = Gauge(
+            "anagrams_event_loop_lag_seconds",
+            "How late the event loop last woke up a sleeping task.",
+        )
+        self.gauges = Gauge(
+            "anagrams_current",
+            "Current number of games, players, connections and queued messages.",
+            labels=("kind",),
+        )
+        self.totals = Counter(
+            "anagrams_events_total",
+            "Cumulative outbound message and search cache events.",
+            labels=("kind",),
+        )
+        self.slow_words: SlowCalls | None = None
+        """The slowest `handle_word` calls, when profiling is turned on"""
+
+    def render(self) -> str:
+        lines = []
+        for metric in (
+            self.messages,
+            self.strategy_search,
+            self.dictionary_lookups,
+            self.broadcasts,
+            self.fanout,
+            self.state_delay,
+            self.mailbox_wait,
+            self.loop_lag,
+            self.gauges,
+            self.totals,
+        ):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    async def monitor_loop_lag(self, interval: float = 0.5):
+        """Measure how late the event loop runs a task, forever."""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag.set(max(time.perf_counter() - start - interval, 0.0))
@@ -1,19 +1,91 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
 from typing import Annotated
 from uuid import UUID, uuid4
 
-from fastapi import Cookie, FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import RedirectResponse
+from fastapi import (
+    Cookie,
+    Depends,
+    FastAPI,
+    HTTPException,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 
+from ..core.dictionary.view import load_views
+from ..core.letters import TileBag, WeightedLetters
+from .cluster import parse_shard
 from .game_manager import GameManager
+from .journal import Journal
 from .messages import Message
+from .metrics import Metrics, SlowCalls
+from .words import NDJSONResponse, check_batches, read_batches, read_json
 
-app = FastAPI()
+shard = parse_shard(os.environ.get("ANAGRAMS_SHARD"))
+journal_dir = os.environ.get("ANAGRAMS_JOURNAL_DIR")
+if journal_dir and shard[1] > 1:
+    journal_dir = os.path.join(journal_dir, f"worker-{shard[0]}")
+tile_bags = int(os.environ.get("ANAGRAMS_TILE_BAGS", 0))
+seed = os.environ.get("ANAGRAMS_SEED")
+manager = GameManager(
+    # one search process per core unless ANAGRAMS_SEARCH_WORKERS says otherwise
+    search_workers=int(os.environ.get("ANAGRAMS_SEARCH_WORKERS", os.cpu_count() or 1)),
+    search_timeout=float(os.environ.get("ANAGRAMS_SEARCH_TIMEOUT", 1.0)),
+    # metrics are on unless ANAGRAMS_METRICS=0
+    metrics=Metrics() if os.environ.get("ANAGRAMS_METRICS", "1") != "0" else None,
+    # set for the workers of a cluster (see `cluster.py`)
+    shard=shard,
+    # games are only kept across restarts with ANAGRAMS_JOURNAL_DIR set
+    journal=Journal(journal_dir) if journal_dir else None,
+    # with ANAGRAMS_TILE_BAGS=n, games draw from n sets of tiles until they run out
+    letters=partial(TileBag, tile_bags) if tile_bags else partial(WeightedLetters, 0.5),
+    # with ANAGRAMS_SEED set, games are dealt the same letters on every run
+    seed=int(seed) if seed else None,
+    # unknown words get suggestions the board can't make with ANAGRAMS_MAKEABLE_SUGGESTIONS=0
+    makeable_suggestions=os.environ.get("ANAGRAMS_MAKEABLE_SUGGESTIONS", "1") != "0",
+)
+# dictionary variants that games can be started with, from a JSON file of
+# {name: spec} (see `DictionaryView.from_spec`)
+views_file = os.environ.get("ANAGRAMS_VIEWS")
+if views_file:
+    manager.views.update(load_views(manager.dictionary, views_file))
+clustered = "ANAGRAMS_SHARD" in os.environ
+# the /debug endpoints show what's in players' games and change how the
+# server runs, so they are only served with ANAGRAMS_DEBUG=1
+debug_endpoints = os.environ.get("ANAGRAMS_DEBUG") == "1"
 
-manager = GameManager()
+
+def require_debug_endpoints():
+    if not debug_endpoints:
+        raise HTTPException(404, "Not Found")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    manager.recover()
+    tasks = [asyncio.create_task(manager.sweeper())]
+    if manager.metrics is not None:
+        tasks.append(asyncio.create_task(manager.metrics.monitor_loop_lag()))
+    if manager.journal is not None:
+        tasks.append(asyncio.create_task(manager.journal.run(manager.games)))
+    yield
+    for task in tasks:
+        task.cancel()
+    if manager.journal is not None:
+        await manager.journal.close(manager.games)
+    manager.workers.close()
+
+
+app = FastAPI(lifespan=lifespan)
 static_dir = Path(__file__).parent.parent / "ui" / "dist"
-app.mount("/play", StaticFiles(directory=static_dir, html=True))
+# the UI is only there once it has been built, which the load test doesn't need
+app.mount("/play", StaticFiles(directory=static_dir, html=True, check_dir=False))
 
 
 @app.get("/")
@@ -28,28 +100,106 @@ async def favicon():
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "outbound": manager.connection_stats(),
+        "search_cache": manager.cache_stats(),
+        "mailboxes": manager.mailbox_stats(),
+    }
+
+
+@app.post("/words")
+async def check_words(
+    request: Request,
+    dictionary: str = "",
+    signature: bool = False,
+    anagrams: bool = False,
+):
+    """
+    Check a list or stream of words against one of the dictionaries that
+    games can be played with, streaming back the results (see `words.py`).
+    """
+    view = manager.views.get(dictionary)
+    if view is None:
+        raise HTTPException(404, f"There is no {dictionary!r} dictionary")
+    words = None
+    if request.headers.get("content-type", "").startswith("application/json"):
+        words = await read_json(request)
+    index = None
+    if anagrams:
+        # built on first use, which takes a while
+        index = await asyncio.to_thread(lambda: manager.dictionary.anagram_index)
+    return NDJSONResponse(
+        check_batches(
+            read_batches(request, words),
+            lambda words: manager.check_words(words, dictionary),
+            signature=signature,
+            anagrams=index,
+            contains=None if view is manager.dictionary else view.__contains__,
+        )
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    if manager.metrics is None:
+        raise HTTPException(404, "Metrics are disabled")
+    return PlainTextResponse(
+        manager.collect_metrics(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/debug/slow-words", dependencies=[Depends(require_debug_endpoints)])
+async def slow_words():
+    """The slowest `word` messages handled while profiling was on."""
+    if manager.metrics is None or manager.metrics.slow_words is None:
+        return {"profiling": False, "calls": []}
+    return {"profiling": True, "calls": manager.metrics.slow_words.slowest()}
+
+
+@app.post("/debug/slow-words", dependencies=[Depends(require_debug_endpoints)])
+async def profile_slow_words(enabled: bool, size: int = 20, sample_rate: float = 1.0):
+    """Turn profiling of `word` messages on (starting over) or off."""
+    if manager.metrics is None:
+        raise HTTPException(404, "Metrics are disabled")
+    manager.metrics.slow_words = SlowCalls(size, sample_rate) if enabled else None
+    return {"profiling": enabled}
+
+
+@app.get("/debug/games", dependencies=[Depends(require_debug_endpoints)])
+async def game_stats(limit: int = 20):
+    """The mailboxes of the busiest games, by how far behind and how slow they are."""
+    return {"games": manager.game_stats(limit)}
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(
     websocket: WebSocket,
     client_id: Annotated[str | None, Cookie()] = None,
+    protocol: str | None = None,
+    encoding: str | None = None,
 ):
-    if client_id is None or UUID(client_id) not in manager.known_clients:
+    # clients that can apply game patches connect with ?protocol=delta, and
+    # clients that take binary frames with ?encoding=binary
+    delta = protocol == "delta"
+    binary = encoding == "binary"
+    # the workers of a cluster take the client IDs that the router hands out
+    if client_id is None or (
+        UUID(client_id) not in manager.known_clients and not clustered
+    ):
         cid = uuid4()
-        await manager.connect(websocket, cid)
+        await manager.connect(websocket, cid, delta, binary)
         await manager.send(
             Message.set_cookie(name="client_id", value=str(cid)),
             cid,
         )
     else:
         cid = UUID(client_id)
-        await manager.connect(websocket, cid)
+        await manager.connect(websocket, cid, delta, binary)
 
     try:
         while True:
             data = await websocket.receive_json()
             await manager.handle_message(Message(**data), cid)
     except WebSocketDisconnect:
-        manager.disconnect(cid)
+        manager.disconnect(cid, websocket)
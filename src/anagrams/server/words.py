@@ -0,0 +1,147 @@
+"""
+Checking many words against the dictionary over HTTP, for moderation tools
+and bots, without going through a game.
+
+`POST /words` takes a JSON list of words (or `{"words": [...]}`), or a
+stream of words, one per line, either bare or as NDJSON strings or
+`{"word": ...}` objects. It streams back a line of NDJSON for each word, in
+order, like `{"word": "rags", "valid": true}`, with the word's letters in
+sorted order (`"signature": "agrs"`) and the words in its anagram class
+(`"anagrams": ["gars", "rags"]`) if they are asked for.
+
+Streamed words are read and answered a batch at a time, so the server only
+ever holds one batch, however long the stream is. That also means that a
+client sending a long stream has to read the results as it goes (as
+`curl -N -X POST -T` does), or the server stops reading once the results
+back up. A JSON list has to be read whole, so it can be at most
+`MAX_JSON_BODY` bytes; anything bigger has to be streamed.
+"""
+
+import json
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from ..core.dictionary.index import AnagramIndex, anagram_key
+
+BATCH_SIZE = 512
+"""The most words to look up at once"""
+
+MAX_LINE = 1024
+"""The longest line accepted in a stream of words, in bytes"""
+
+MAX_JSON_BODY = 1 << 20
+"""The largest JSON list of words accepted, in bytes"""
+
+
+class NDJSONResponse(StreamingResponse):
+    """
+    A streaming response that can be sent while the request body is still
+    being read. Starlette's own listens for the client disconnecting, which
+    (for ASGI servers before spec 2.4) takes body chunks meant for the
+    endpoint; instead, a client that goes away ends the request stream.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+
+
+def _parse_line(line: bytes) -> str | None:
+    line = line.strip()
+    if not line:
+        return None
+    text = line.decode(errors="replace")
+    if text[0] in '"{':
+        value = json.loads(text)
+        text = value["word"] if isinstance(value, dict) else value
+    return str(text)
+
+
+async def read_json(request: Request) -> list[str]:
+    """
+    The words in a JSON request body, raising an `HTTPException` if it is
+    over `MAX_JSON_BODY` bytes or isn't a list of words.
+    """
+    too_large = HTTPException(
+        413, f"JSON bodies can be at most {MAX_JSON_BODY} bytes; stream the words"
+    )
+    if int(request.headers.get("content-length", 0)) > MAX_JSON_BODY:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_JSON_BODY:
+            raise too_large
+    try:
+        words = json.loads(body)
+        if isinstance(words, dict):
+            words = words["words"]
+        if not isinstance(words, list):
+            raise TypeError("expected a list of words")
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(400, f"Invalid JSON body: {e}") from None
+    return [str(word) for word in words]
+
+
+async def read_batches(
+    request: Request, words: list[str] | None = None
+) -> AsyncIterator[list[str]]:
+    """
+    The words in a request, a batch at a time: `words`, if they have
+    already been read with `read_json`, or the words streamed in the body.
+    Each batch of a stream comes from the body received so far, so a slow
+    stream gets answered as it goes.
+    """
+    if words is not None:
+        for i in range(0, len(words), BATCH_SIZE):
+            yield words[i : i + BATCH_SIZE]
+        return
+
+    rest = b""
+    async for chunk in request.stream():
+        *lines, rest = (rest + chunk).split(b"\n")
+        words = [word for line in lines if (word := _parse_line(line)) is not None]
+        for i in range(0, len(words), BATCH_SIZE):
+            yield words[i : i + BATCH_SIZE]
+        if len(rest) > MAX_LINE:
+            raise ValueError(f"a line is longer than {MAX_LINE} bytes")
+    if (word := _parse_line(rest)) is not None:
+        yield [word]
+
+
+async def check_batches(
+    batches: AsyncIterator[list[str]],
+    lookup: Callable[[list[str]], Awaitable[list[bool]]],
+    signature: bool = False,
+    anagrams: AnagramIndex | None = None,
+    contains: Callable[[str], bool] | None = None,
+) -> AsyncIterator[str]:
+    """
+    NDJSON lines with the result for each word in `batches`, checked with
+    `lookup` a batch at a time. If `anagrams` is given, each word's anagram
+    class is listed too, keeping only the words that pass `contains`.
+    """
+    try:
+        async for batch in batches:
+            words = [word.lower().strip() for word in batch]
+            valid = await lookup(words)
+            lines = []
+            for word, ok in zip(words, valid):
+                result: dict = {"word": word, "valid": ok}
+                if signature:
+                    result["signature"] = anagram_key(word)
+                if anagrams is not None:
+                    result["anagrams"] = [
+                        w
+                        for w in anagrams.anagrams(word)
+                        if contains is None or contains(w)
+                    ]
+                lines.append(json.dumps(result, ensure_ascii=False) + "\n")
+            yield "".join(lines)
+    except (ValueError, KeyError, TypeError, TimeoutError) as e:
+        # the response has already started, so errors go in the stream
+        yield json.dumps({"error": str(e)}) + "\n"
@@ -0,0 +1,138 @@
+"""
+A pool of worker processes for CPU-heavy game work, so that one expensive
+search doesn't hold up every game on the server.
+
+Every worker loads the dictionary once when it starts (compiled
+dictionaries are memory-mapped, so the workers share one copy). Jobs are
+module-level functions that take the dictionary, their arguments, and a
+time budget, and each job carries a deadline: a job still queued at its
+deadline never runs, and a running job is expected to give up at it.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import TypeVar
+from uuid import UUID
+
+from ..core.dictionary import Dictionary
+from ..core.game import Game
+from ..core.search import AnagramStrategy, iter_anagram_strategies
+from ..core.solver import Move
+from ..core.solver import find_moves as _find_moves
+from ..core.utils import Signature
+
+T = TypeVar("T")
+
+_dictionary: Dictionary | None = None
+"""The dictionary of the worker process"""
+
+
+def _init_worker(dictionary: Dictionary):
+    global _dictionary
+    _dictionary = dictionary
+
+
+def _run_job(job: Callable[..., T], args: tuple, deadline: float) -> T:
+    # deadlines are wall-clock times, since they cross processes
+    time_budget = deadline - time.time()
+    if time_budget <= 0:
+        raise TimeoutError("job expired before it started")
+    assert _dictionary is not None
+    return job(_dictionary, *args, time_budget)
+
+
+class WorkerPool:
+    def __init__(
+        self, dictionary: Dictionary, workers: int = 0, timeout: float = 1.0
+    ) -> None:
+        """
+        Run jobs against `dictionary` in `workers` processes, or in a thread
+        if `workers` is 0 (so jobs must not be given anything that changes
+        while they run). Jobs that take longer than `timeout` seconds raise
+        a `TimeoutError`. The processes are started when the first job is
+        run, and again after the pool is closed.
+        """
+        self.dictionary = dictionary
+        self.workers = workers
+        self.timeout = timeout
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def run(
+        self, job: Callable[..., T], *args, timeout: float | None = None
+    ) -> T:
+        """
+        Run `job(dictionary, *args, time_budget)`, raising a `TimeoutError`
+        if it doesn't finish within `timeout` seconds (by default, the
+        pool's timeout).
+        """
+        if timeout is None:
+            timeout = self.timeout
+        if self.workers == 0:
+            # a thread keeps the event loop free, and the job gives up at
+            # its time budget on its own
+            return await asyncio.to_thread(job, self.dictionary, *args, timeout)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.workers,
+                # spawned workers don't inherit the server's threads and sockets
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.dictionary,),
+            )
+
+        future = self._executor.submit(_run_job, job, args, time.time() + timeout)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except TimeoutError:
+            future.cancel()  # in case it hasn't started
+            raise
+
+    def close(self):
+        if self._executor is not None:
+            # waiting takes no longer than a job's time budget, and a server
+            # that exits right after (as on SIGTERM) would orphan the workers
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+def find_strategy(
+    dictionary: Dictionary,
+    word: str,
+    pool: Signature,
+    player_words: list[tuple[UUID, list[tuple[str, Signature]]]],
+    time_budget: float,
+) -> AnagramStrategy | None:
+    """Find a way to make `word` (see `Game.find_anagram_strategy`)."""
+    deadline = time.monotonic() + time_budget
+    return next(iter_anagram_strategies(word, pool, player_words, deadline), None)
+
+
+def board(
+    game: Game,
+) -> tuple[Signature, list[tuple[UUID, list[tuple[str, Signature]]]]]:
+    """The parts of a game that `find_strategy` needs, to send to a worker."""
+    return game.pool_signature, [
+        (pid, list(zip(player.words, player.signatures)))
+        for pid, player in game.players.items()
+    ]
+
+
+def find_moves(
+    dictionary: Dictionary,
+    game: Game,
+    player_id: UUID | None,
+    limit: int | None,
+    time_budget: float,
+) -> list[Move]:
+    """List the moves available in `game` (see `solver.find_moves`)."""
+    return _find_moves(game, dictionary, player_id, time_budget, limit)
+
+
+def check_words(
+    dictionary: Dictionary, words: list[str], time_budget: float
+) -> list[bool]:
+    """Check which of `words` are in the dictionary."""
+    return dictionary.contains_many(words)
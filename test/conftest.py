@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path_factory, monkeypatch):
+    """Keep compiled dictionaries out of the real cache, sharing them between tests."""
+    monkeypatch.setenv(
+        "ANAGRAMS_CACHE_DIR", str(tmp_path_factory.getbasetemp() / "cache")
+    )
@@ -0,0 +1,14 @@
+from anagrams.core.cache import LRUCache
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # a is now the most recently used
+    cache.put("c", 3)
+    assert "b" not in cache and len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get_or_compute("d", lambda: 4) == 4
+    assert cache.get_or_compute("d", lambda: 5) == 4
+    assert cache.stats() == {"size": 2, "hits": 2, "misses": 2, "evictions": 2}
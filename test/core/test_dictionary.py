@@ -1,6 +1,217 @@
-from anagrams.core.dictionary import Dictionary
+import json
+import subprocess
+import sys
+
+import pytest
+
+from anagrams.core.dictionary import Dictionary, compile_dictionary, matrix
+from anagrams.core.dictionary.view import DictionaryView, load_views
+from anagrams.core.utils import edit_distance
 
 
 def test_load_default():
     d = Dictionary.load_from_file()  # scrabble dictionary
     assert len(d) == 178691
+
+
+def test_membership():
+    d = Dictionary(["rag", "grams", "gram", "anagrams", "rag"])
+    assert len(d) == 4
+    assert list(d) == ["anagrams", "gram", "grams", "rag"]
+    assert "gram" in d and "grams" in d
+    assert "gra" not in d and "ragg" not in d and "" not in d
+    assert 42 not in d  # type: ignore
+
+    d.add_word("nags")
+    assert "nags" in d and len(d) == 5
+
+
+def test_non_ascii_words():
+    words = ["cafe", "café", "naïve", "zoo"]
+    d = Dictionary(words)
+    assert list(d) == words
+    assert "café" in d and "naïve" in d and "caf" not in d
+    assert d.automaton[1] == "café"
+    assert d.automaton.within_distance("naive", 2) == [("naïve", 2)]
+
+
+def test_within_distance():
+    words = ["a", "as", "gram", "grams", "rag", "rags", "anagram", "anagrams"]
+    d = Dictionary(words)
+    for query in ["", "rgas", "anagrms", "gramss", "xyz", "grams"]:
+        for k in range(4):
+            expected = [
+                (w, edit_distance(query, w))
+                for w in words
+                if edit_distance(query, w) <= k
+            ]
+            assert d.automaton.within_distance(query, k) == sorted(expected)
+    assert d.automaton.within_distance("émigré", 2) == []
+
+
+def test_suggestions():
+    d = Dictionary.load_from_file()
+    assert d.suggestions("anagrms", limit=1) == ["anagrams"]
+    assert d.suggestions("anagrams", max_distance=1) == ["anagram"]  # not itself
+    assert d.suggestions("quixotc", limit=None) == [
+        "quixote",
+        "quixotic",
+        "quixotes",
+        "quixotry",
+    ]
+    assert d.suggestions("quixotc", accept=lambda w: w.endswith("s")) == ["quixotes"]
+    d.add_word("quixotica")
+    assert "quixotica" in d.suggestions("quixotc", limit=None)
+
+
+def test_views(tmp_path):
+    d = Dictionary(["as", "rag", "rags", "gram", "grams", "anagrams"])
+    long = DictionaryView(d, min_length=4, deny=["gram"], allow=["nags"])
+    assert "rags" in long and "grams" in long and "nags" in long
+    assert "rag" not in long and "gram" not in long and "xyzzy" not in long
+    assert list(long) == ["anagrams", "grams", "rags", "nags"]
+
+    # views of views, and themed lists that only keep some of the base
+    themed = DictionaryView(long, only=["rags", "rag", "nags", "xyzzy"])
+    assert list(themed) == ["nags", "rags"]
+    grams = DictionaryView(d, predicate=lambda w: "gram" in w)
+    assert list(grams) == ["anagrams", "gram", "grams"]
+
+    (tmp_path / "deny.txt").write_text("as\ngram\n")
+    specs = {"short": {"max_length": 4, "pattern": "[a-z]*s?", "deny": "deny.txt"}}
+    (tmp_path / "views.json").write_text(json.dumps(specs))
+    views = load_views(d, str(tmp_path / "views.json"))
+    assert list(views["short"]) == ["rag", "rags"]
+
+
+def test_load_with_pattern():
+    d = Dictionary.load_from_file(pattern="[a-z]{15}")
+    assert len(d) > 0
+    assert all(len(w) == 15 for w in d)
+    assert "aa" not in d
+
+
+def test_compiled_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANAGRAMS_CACHE_DIR", str(tmp_path / "cache"))
+    source = tmp_path / "words.txt"
+    source.write_text("gram\ngrams\nrag\n")
+
+    d = Dictionary.load_from_file(str(source))
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+    d = Dictionary.load_from_file(str(source))  # memory-mapped this time
+    assert list(d) == ["gram", "grams", "rag"]
+    assert "grams" in d and "gra" not in d
+
+    # changing the pattern or the source rebuilds the compiled dictionary,
+    # replacing the old one
+    (tmp_path / "cache" / "other-0123456789abcdef.dawg").write_bytes(b"")
+    d = Dictionary.load_from_file(str(source), pattern="g.*")
+    assert list(d) == ["gram", "grams"]
+    source.write_text("anagrams\nrag\n")
+    d = Dictionary.load_from_file(str(source))
+    assert list(d) == ["anagrams", "rag"]
+    cached = sorted(p.name for p in (tmp_path / "cache").iterdir())
+    assert len(cached) == 2 and cached[0] == "other-0123456789abcdef.dawg"
+
+
+def test_compile_to_file(tmp_path):
+    source = tmp_path / "words.txt"
+    source.write_text("rag\ngrams\ngram\n")  # not sorted
+    path = compile_dictionary(str(source), output=str(tmp_path / "words.dawg"))
+    d = Dictionary.load_compiled(path)
+    assert list(d) == ["gram", "grams", "rag"]
+
+
+def test_anagram_index():
+    d = Dictionary(["gram", "grams", "rag", "mar", "arm", "ram", "anagrams", "a"])
+    index = d.anagram_index
+    assert index.anagrams("mra") == ["arm", "mar", "ram"]
+    assert index.anagrams("gras") == []
+
+    assert sorted(index.subanagrams("gramz")) == [
+        "a",
+        "arm",
+        "gram",
+        "mar",
+        "rag",
+        "ram",
+    ]
+    assert sorted(index.subanagrams("grams", min_length=4)) == ["gram", "grams"]
+    assert sorted(index.subanagrams("grams", max_length=3)) == [
+        "a",
+        "arm",
+        "mar",
+        "rag",
+        "ram",
+    ]
+    assert sorted(index.subanagrams("grams", required="g")) == ["gram", "grams", "rag"]
+    assert len(list(index.subanagrams("anagrams", limit=2))) == 2
+
+    d.add_word("mas")
+    assert "mas" in d.anagram_index.subanagrams("grams")
+
+
+def test_anagram_index_skips_words_outside_a_to_z():
+    d = Dictionary(["Cafe", "café", "don't", "grams", "rag", "{rag}"])
+    index = d.anagram_index
+    assert sorted(index.subanagrams("cafedontgrams")) == ["grams", "rag"]
+    assert index.anagrams("t'dno") == ["don't"]
+    assert index.anagrams("éfac") == ["café"]
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_letter_matrix(tmp_path, monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(matrix, "np", None)
+    elif matrix.np is None:
+        pytest.skip("numpy is not installed")
+
+    words = ["a", "anagrams", "gram", "grams", "mar", "rag"]
+    source = tmp_path / "words.txt"
+    source.write_text("\n".join(words))
+    path = compile_dictionary(str(source), output=str(tmp_path / "words.dawg"))
+    for d in [Dictionary(words), Dictionary.load_compiled(path)]:
+        m = d.letter_matrix
+        assert len(m) == len(words)
+        rows = m.fits_batch(["gramz", "ram", "q"])
+        assert [m.words_at(r) for r in rows] == [
+            ["a", "gram", "mar", "rag"],
+            ["a", "mar"],
+            [],
+        ]
+        assert m.words_at(m.fits("grams", min_length=4)) == ["gram", "grams"]
+
+
+def test_without_numpy():
+    # numpy is an optional extra, so everything has to import and work
+    # where it can't be imported at all
+    script = """
+import sys
+sys.modules["numpy"] = None
+from anagrams.core.dictionary import Dictionary, matrix
+assert matrix.np is None
+m = Dictionary(["a", "gram", "grams", "mar", "rag"]).letter_matrix
+print(m.words_at(m.fits("gramz", min_length=2)))
+"""
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "['gram', 'mar', 'rag']"
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_words_that_cant_be_made_from_tiles(tmp_path, monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(matrix, "np", None)
+    elif matrix.np is None:
+        pytest.skip("numpy is not installed")
+    monkeypatch.setenv("ANAGRAMS_CACHE_DIR", str(tmp_path / "cache"))
+    source = tmp_path / "words.txt"
+    source.write_text("Cafe\ncafé\ndon't\ngrams\nrag\n")
+
+    for cache in [False, True, True]:  # built, then compiled, then memory-mapped
+        d = Dictionary.load_from_file(str(source), cache=cache)
+        assert list(d) == ["Cafe", "café", "don't", "grams", "rag"]
+        assert "don't" in d and "Cafe" in d
+        m = d.letter_matrix
+        assert m.words_at(m.fits("cafedontgrams", min_length=0)) == ["grams", "rag"]
@@ -1,6 +1,10 @@
 from uuid import uuid4
 
+import pytest
+
 from anagrams.core import Game, Player
+from anagrams.core.letters import TileBag, letter_source
+from anagrams.core.utils import letters_signature
 
 
 def test_assembly_strategies():
@@ -13,3 +17,135 @@ def test_assembly_strategies():
     assert len(game.get_anagram_strategies("as")) == 1  # a s
     assert len(game.get_anagram_strategies("grams")) == 1  # gram s
     assert len(game.get_anagram_strategies("anagrams")) == 2  # a nags mar, a s man rag
+
+
+def test_identical_pool_letters_are_not_duplicated():
+    game = Game()
+    game.letter_pool = ["a", "s", "a", "s"]
+    game.add_player(Player(id=uuid4(), name="Player 1", words=["ass"]))
+
+    assert game.get_anagram_strategies("as") == [((None, "a"), (None, "s"))]
+    assert len(game.get_anagram_strategies("asas")) == 2  # a s a s, a ass
+
+
+def test_find_strategy():
+    game = Game()
+    game.letter_pool = ["a", "s"]
+    p1 = Player(id=uuid4(), name="Player 1", words=["man", "gram"])
+    game.add_player(p1)
+
+    assert game.find_anagram_strategy("grass") is None
+    assert game.find_anagram_strategy("grams") == ((None, "s"), (p1.id, "gram"))
+
+
+def test_changes_since():
+    game = Game()
+    p1 = Player(id=uuid4(), name="Player 1", words=[])
+    game.add_player(p1)
+    version = game.version
+    game.letter_pool = ["a", "s"]
+    game.new_letter()
+    game.execute_anagram_strategy(((None, "a"), (None, "s")))
+    game.add_word(p1.id, "as")
+
+    assert game.version == version + 4
+    assert [c["op"] for c in game.changes_since(version)] == [
+        "pool",
+        "letter",
+        "take",
+        "add_word",
+    ]
+    assert game.changes_since(game.version) == []
+    assert game.changes_since(game.version + 1) is None
+    assert game.changes_since(-1) is None  # before the first remembered change
+
+
+def test_validate_strategy_counts_letters_and_words():
+    game = Game()
+    game.letter_pool = ["a", "s"]
+    p1 = Player(id=uuid4(), name="Player 1", words=["rag"])
+    game.add_player(p1)
+
+    assert game.validate_anagram_strategy(((None, "s"), (p1.id, "rag")))
+    assert not game.validate_anagram_strategy(((None, "s"), (None, "s")))
+    assert not game.validate_anagram_strategy(((p1.id, "rag"), (p1.id, "rag")))
+    assert not game.validate_anagram_strategy(((None, "a"), (uuid4(), "rag")))
+
+
+def test_strategy_search_time_budget():
+    letters = "abcdefghijklmnop"
+    game = Game()
+    game.letter_pool = list(letters)
+    words = [a + b for i, a in enumerate(letters) for b in letters[i + 1 :]]
+    game.add_player(Player(id=uuid4(), name="Player 1", words=words))
+
+    with pytest.raises(TimeoutError):
+        game.get_anagram_strategies(letters, time_budget=0)
+    assert game.find_anagram_strategy(letters, time_budget=10) is not None
+
+
+def test_strategy_cache_follows_the_board():
+    game = Game()
+    game.letter_pool = ["a"]
+    p1 = Player(id=uuid4(), name="Player 1", words=["rags"])
+    game.add_player(p1)
+
+    assert game.find_anagram_strategy("rag") is None
+    game.next_turn()
+    assert game.find_anagram_strategy("gar") is None  # an anagram, same board
+    assert (game.cache.hits, game.cache.misses) == (1, 1)
+
+    game.new_letter()
+    game.letter_pool = ["r", "a", "g"]
+    assert game.find_anagram_strategy("rag") is not None
+    assert len(game.get_anagram_strategies("rag")) == 1
+    assert game.get_anagram_strategies("rag") == game.get_anagram_strategies("gar")
+    assert (game.cache.hits, game.cache.misses) == (3, 3)
+
+
+def test_board_aggregates():
+    game = Game()
+    game.letter_pool = ["r", "a", "g", "s"]
+    p1 = Player(id=uuid4(), name="Player 1", words=["as"])
+    p2 = Player(id=uuid4(), name="Player 2", words=[])
+    game.add_player(p1)
+    game.add_player(p2)
+
+    game.execute_anagram_strategy(((None, "r"), (None, "g"), (p1.id, "as")))
+    game.add_word(p2.id, "rags")
+    game.new_letter()
+    assert (p1.score, p2.score) == (0, 4)
+    assert game.board_signature == letters_signature(
+        "".join(game.letter_pool + p1.words + p2.words)
+    )
+    assert game.could_make("gas") and not game.could_make("quiz")
+
+    game.remove_player(p2.id)
+    assert game.board_signature == game.pool_signature
+    assert not game.could_make("rags")
+
+
+def test_apply_change():
+    game = Game(TileBag(seed=1))
+    p1, p2 = uuid4(), uuid4()
+    game.add_player(Player(id=p1, name="Player 1", words=["rag"]))
+    game.add_player(Player(id=p2, name="Player 2", words=[]))
+    game.letter_pool = ["a", "s", "e"]
+    game.next_turn()
+    game.new_letter()
+    game.execute_anagram_strategy(((None, "s"), (p1, "rag")))
+    game.add_word(p2, "rags")
+    game.remove_player(p1)
+
+    copy = Game(letter_source(game.letters.spec))
+    ids = iter([p1, p2])
+    for _, change in game.changes:
+        if change["op"] == "add_player":
+            change = {**change, "id": str(next(ids))}
+        copy.apply_change(change)
+    assert copy.letter_pool == game.letter_pool
+    assert copy.players == game.players
+    assert copy.turn == game.turn and copy.turns == game.turns
+    assert copy.version == game.version
+    assert copy.board_signature == game.board_signature
+    assert copy.new_letter() == game.new_letter()
@@ -0,0 +1,56 @@
+import pickle
+import random
+from collections import Counter
+
+from anagrams.core.letters import TILE_COUNTS, TileBag, WeightedLetters, letter_source
+from anagrams.core.utils import LETTER_WEIGHTS, AliasTable
+
+
+def test_alias_table_matches_weights():
+    table = AliasTable({"a": 1, "b": 2, "c": 0, "d": 5})
+    # every column's share of [0, 1) adds up to its outcome's weight
+    shares = Counter()
+    for i, (p, outcome) in enumerate(zip(table.prob, table.alias)):
+        shares[table.outcomes[i]] += p / table.n
+        shares[outcome] += (1 - p) / table.n
+    assert {k: round(v * 8, 9) for k, v in shares.items() if v > 1e-12} == {
+        "a": 1,
+        "b": 2,
+        "d": 5,
+    }
+
+    rng = random.Random(0)
+    counts = Counter(table.sample(rng.random()) for _ in range(8000))
+    assert counts["c"] == 0
+    assert abs(counts["d"] - 5000) < 200
+
+
+def test_weighted_letters():
+    letters = WeightedLetters(seed=42)
+    drawn = [letters.draw() for _ in range(50)] + letters.draw_many(50)
+    assert set(drawn) <= set(LETTER_WEIGHTS)
+    assert letters.drawn == 100 and letters.remaining is None
+    # the same seed draws the same letters, one at a time or all at once
+    assert WeightedLetters(seed=42).draw_many(100) == drawn
+    assert WeightedLetters(seed=43).draw_many(100) != drawn
+
+
+def test_tile_bag():
+    bag = TileBag(copies=2, seed=7)
+    total = 2 * sum(TILE_COUNTS.values())
+    assert bag.remaining == total
+    drawn = bag.draw_many(10) + bag.draw_many(total)
+    assert Counter(drawn) == {letter: 2 * n for letter, n in TILE_COUNTS.items()}
+    assert bag.remaining == 0
+    assert bag.draw() is None and bag.draw_many(5) == []
+    assert bag.drawn == total
+
+
+def test_sources_pickle_as_spec_and_draws():
+    for source in (WeightedLetters(0.5, seed=1), TileBag(seed=1)):
+        first = source.draw_many(20)
+        assert letter_source(source.spec).draw_many(20) == first
+        copy = pickle.loads(pickle.dumps(source))
+        assert type(copy) is type(source) and copy.spec == source.spec
+        assert copy.drawn == 20 and copy.remaining == source.remaining
+        assert copy.draw_many(30) == source.draw_many(30)
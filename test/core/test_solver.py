@@ -0,0 +1,37 @@
+from uuid import uuid4
+
+from anagrams.core import Game, Player
+from anagrams.core.dictionary import Dictionary
+from anagrams.core.solver import find_moves
+
+WORDS = ["as", "man", "gram", "grams", "rag", "rags", "nags", "mar", "anagrams"]
+
+
+def test_find_moves():
+    dictionary = Dictionary(WORDS)
+    game = Game()
+    game.letter_pool = ["a", "s"]
+    p1 = Player(id=uuid4(), name="Player 1", words=["man", "gram"])
+    p2 = Player(id=uuid4(), name="Player 2", words=["rag", "nags", "mar"])
+    game.add_player(p1)
+    game.add_player(p2)
+
+    moves = find_moves(game, dictionary, p1.id, time_budget=None)
+    assert [(m.word, m.gain) for m in moves] == [
+        ("anagrams", 8),  # a nags mar
+        ("anagrams", 5),  # a s man rag
+        ("rags", 4),  # rag s
+        ("as", 2),
+        ("grams", 1),  # gram s
+    ]
+    assert {m.word for m in moves} == {
+        w for w in WORDS if game.find_anagram_strategy(w) is not None
+    }
+    for move in moves:
+        assert game.validate_anagram_strategy(move.strategy)
+        assert sorted(move.word) == sorted("".join(w for _, w in move.strategy))
+
+    assert len(find_moves(game, dictionary, limit=2)) == 2
+    best = find_moves(game, dictionary, p1.id, time_budget=None, limit=1)
+    assert [(m.word, m.gain) for m in best] == [("anagrams", 8)]
+    assert find_moves(game, dictionary, p1.id, time_budget=None, limit=3) == moves[:3]
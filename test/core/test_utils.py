@@ -0,0 +1,28 @@
+import pytest
+
+from anagrams.core.utils import (
+    contains_anagrammed_substring,
+    is_anagram,
+    sig_contains,
+    signature,
+    signature_counts,
+    signature_letters,
+)
+
+
+def test_signature():
+    sig = signature("banana")
+    assert signature_counts(sig)[:3] == [3, 1, 0]
+    assert signature_letters(sig) == list("aaabnn")
+    assert signature("") == 0
+    with pytest.raises(ValueError):
+        signature("Banana")
+
+
+def test_containment():
+    assert sig_contains(signature("anagrams"), signature("gram"))
+    assert not sig_contains(signature("anagrams"), signature("mass"))
+    assert contains_anagrammed_substring("grass", "rag")
+    assert not contains_anagrammed_substring("rag", "grass")
+    assert is_anagram("anagrams", ["a", "nags", "mar"])
+    assert not is_anagram("anagrams", ["nags", "mar"])
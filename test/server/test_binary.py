@@ -0,0 +1,62 @@
+import json
+from uuid import uuid4
+
+from anagrams.core import Game, Player
+from anagrams.server import binary
+from anagrams.server.messages import Message
+
+
+def make_game():
+    game = Game()
+    ids = [uuid4() for _ in range(3)]
+    for i, pid in enumerate(ids):
+        game.add_player(Player(pid, f"Zoë {i + 1}", ["rag", "grams"][: i + 1]))
+    game.letter_pool = ["s", "a", "e"]
+    game.next_turn()
+    return game, ids
+
+
+def test_messages_round_trip():
+    for message in [
+        Message.set_cookie(name="client_id", value=str(uuid4())),
+        Message.error("join_fail", "Game ABCD not found."),
+        Message.leave_game(),
+    ]:
+        assert binary.decode(binary.encode(message)) == message.content
+
+
+def test_game_state_frames():
+    game, ids = make_game()
+    connected = ids[:2]
+    frames = binary.game_state_frames(game, connected, "ABCD")
+    assert list(frames) == connected
+    for cid, frame in frames.items():
+        expected = Message.game_state(cid, game, connected, "ABCD").content
+        assert binary.decode(frame) == json.loads(json.dumps(expected))
+        assert len(frame) < len(Message.game_state_frames(game, connected, "ABCD")[cid])
+
+
+def test_game_patch_refers_to_words_by_index():
+    game, ids = make_game()
+    version = game.version
+    game.add_word(ids[1], "rag")
+    game.new_letter()
+    game.execute_anagram_strategy(((None, "s"), (ids[1], "rag")))
+    game.add_word(ids[1], "rags")
+    game.remove_player(ids[0])
+    game.add_player(Player(uuid4(), "Player 4", ["as"]))
+    message = Message.game_patch(
+        "ABCD", version, game.version, game.changes_since(version)
+    )
+
+    decoded = binary.decode(binary.encode(message))
+    expected = json.loads(json.dumps(message.content))
+    take = expected["changes"][2]
+    assert take == {
+        "op": "take",
+        "letters": ["s"],
+        "words": [[1, "rag"]],
+        "indices": [0],  # the first of player 2's two "rag"s
+    }
+    expected["changes"][2] = {"op": "take", "letters": ["s"], "words": [[1, 0]]}
+    assert decoded == expected
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from anagrams.core.dictionary import Dictionary
+from anagrams.server.cluster import Cluster, Registry, owner
+from anagrams.server.game_manager import GameManager
+from anagrams.server.words import MAX_JSON_BODY
+
+
+def test_registry():
+    registry = Registry(3, max_clients=2)
+    assert {owner(f"G{i:03}", 3) for i in range(100)} == {0, 1, 2}
+    assert registry.game_worker("ABCD") == owner("ABCD", 3)
+
+    a, b, c = uuid4(), uuid4(), uuid4()
+    registry.connections = [2, 0, 1]
+    assert registry.client_worker(a) == 1  # the least busy
+    registry.assign(a, 2)
+    registry.assign(b, 0)
+    registry.assign(c, 0)
+    assert list(registry.clients) == [b, c]  # forgot the oldest
+    assert registry.client_worker(b) == 0
+
+
+def test_workers_only_start_their_own_games():
+    async def main():
+        manager = GameManager(Dictionary(["rag"]), shard=(1, 3))
+        for _ in range(20):
+            await manager.handle_start(uuid4(), "Host")
+        assert len(manager.games) == 20
+        assert all(owner(game_id, 3) == 1 for game_id in manager.games)
+
+    asyncio.run(main())
+
+
+def test_clients_follow_their_game():
+    cluster = Cluster(2)
+    with TestClient(cluster.app) as client:
+        with client.websocket_connect("/ws") as host:
+            assert host.receive_json()["action"] == "set_cookie"
+            host.send_json({"action": "start", "name": "Host"})
+            game_id = host.receive_json()["game_id"]
+            # the host is on the game's worker, so the next client goes to the other one
+            with client.websocket_connect("/ws") as guest:
+                cookie = guest.receive_json()
+                assert cluster.registry.connections == [1, 1]
+                guest.send_json({"action": "join", "game_id": game_id, "name": "Guest"})
+                state = guest.receive_json()
+                assert [p["name"] for p in state["players"]] == ["Host", "Guest"]
+                assert cluster.registry.connections[owner(game_id, 2)] == 2
+                assert host.receive_json()["game_id"] == game_id
+
+            # reconnecting goes straight back to the game
+            client.cookies["client_id"] = cookie["value"]
+            with client.websocket_connect("/ws") as guest:
+                state = guest.receive_json()
+                assert [p["you"] for p in state["players"]] == [False, True]
+
+        health = client.get("/health").json()
+        assert len(health["workers"]) == 2
+        assert "anagrams_message_seconds" in client.get("/workers/1/metrics").text
+
+
+def test_words_are_streamed_through_a_worker():
+    def chunks(words: list[str]):
+        for i in range(0, len(words), 1000):
+            yield "".join(f"{w}\n" for w in words[i : i + 1000]).encode()
+
+    cluster = Cluster(2)
+    with TestClient(cluster.app) as client:
+        # more results than fit in the sockets' buffers, so the worker has
+        # to be answering while the router is still sending it words
+        words = ["rags", "xyzzy"] * 25_000
+        response = client.post("/words", content=chunks(words))
+        assert response.headers["content-type"] == "application/x-ndjson"
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["valid"] for r in results] == [True, False] * 25_000
+
+        response = client.post("/words?signature=true", content=chunks(["rags"]))
+        assert response.json() == {"word": "rags", "valid": True, "signature": "agrs"}
+
+        # the worker's limits apply to bodies without a length, too
+        body = json.dumps(["rags"] * (MAX_JSON_BODY // 4)).encode()
+        response = client.post(
+            "/words",
+            content=(body[i : i + 4096] for i in range(0, len(body), 4096)),
+            headers={"content-type": "application/json"},
+        )
+        assert response.status_code == 413
+        assert client.post("/words?dictionary=nope", json=[]).status_code == 404
@@ -0,0 +1,609 @@
+import asyncio
+import json
+import time
+from functools import partial
+from uuid import uuid4
+
+from anagrams.core.dictionary import Dictionary
+from anagrams.core.dictionary.view import DictionaryView
+from anagrams.core.game import CHANGELOG_SIZE
+from anagrams.core.letters import TileBag
+from anagrams.server import binary
+from anagrams.server.game_manager import GameManager
+from anagrams.server.messages import Message
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.sent: list[dict] = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.fail:
+            raise RuntimeError("socket is gone")
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, data: bytes):
+        await asyncio.sleep(self.delay)
+        self.sent.append(binary.decode(data))
+
+    async def close(self):
+        self.closed = True
+
+
+def make_manager(**kwargs):
+    return GameManager(Dictionary(["as", "rag", "rags"]), **kwargs)
+
+
+async def start_game(manager: GameManager, *sockets: FakeWebSocket):
+    clients = []
+    for i, ws in enumerate(sockets):
+        cid = uuid4()
+        await manager.connect(ws, cid)  # type: ignore
+        if i == 0:
+            await manager.handle_start(cid, "Host")
+            game_id = manager.player_games[cid]
+        else:
+            await manager.handle_join(cid, game_id, f"Player {i + 1}")
+        clients.append(cid)
+    return game_id, clients
+
+
+def test_broadcast_game_state():
+    async def main():
+        manager = make_manager()
+        sockets = [FakeWebSocket(), FakeWebSocket()]
+        game_id, clients = await start_game(manager, *sockets)
+        await manager.broadcast_game_state(game_id)
+        await manager.flush()
+
+        for ws, cid in zip(sockets, clients):
+            state = ws.sent[-1]
+            assert state["action"] == "game_state"
+            assert [p["you"] for p in state["players"]] == [c == cid for c in clients]
+
+    asyncio.run(main())
+
+
+def test_broadcast_drops_slow_and_failed_clients():
+    async def main():
+        manager = make_manager(send_timeout=0.05)
+        fast, slow, broken = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        game_id, (_, slow_id, broken_id) = await start_game(manager, fast, slow, broken)
+        slow.delay = 10
+        broken.fail = True
+
+        start = time.perf_counter()
+        await manager.broadcast_game_state(game_id)
+        await manager.flush()
+        assert time.perf_counter() - start < 1
+        await asyncio.sleep(0)  # let the sockets close
+        assert not manager.connected(slow_id) and slow.closed
+        assert not manager.connected(broken_id) and broken.closed
+
+        await manager.broadcast_game_state(game_id)
+        await manager.flush()
+        assert [p["connected"] for p in fast.sent[-1]["players"]] == [
+            True,
+            False,
+            False,
+        ]
+
+    asyncio.run(main())
+
+
+def test_game_states_are_coalesced():
+    async def main():
+        manager = make_manager()
+        ws = FakeWebSocket(delay=0.01)
+        game_id, (cid,) = await start_game(manager, ws)
+        await manager.flush()
+        ws.sent.clear()
+
+        game = manager.games[game_id]
+        for _ in range(10):
+            game.new_letter()
+            await manager.broadcast_game_state(game_id)
+        await manager.send_err(cid, "unknown_word", "Xyz is not in the dictionary.")
+        game.new_letter()
+        await manager.broadcast_game_state(game_id)
+        await manager.flush()
+
+        # every state is replaced by the last one, which goes after the error
+        assert [m["action"] for m in ws.sent] == ["error", "game_state"]
+        assert len(ws.sent[-1]["letter_pool"]) == 11
+        stats = manager.connection_stats()
+        assert stats["coalesced"] == 10 and stats["queued"] == 0
+
+    asyncio.run(main())
+
+
+def test_stalled_connection_is_closed():
+    async def main():
+        manager = make_manager(max_queue=4)
+        ws = FakeWebSocket(delay=10)
+        _, (cid,) = await start_game(manager, ws)
+        for i in range(10):
+            await manager.send_err(cid, "test", str(i))
+        await asyncio.sleep(0)
+        assert not manager.connected(cid) and ws.closed
+        assert manager.connection_stats()["dropped"] > 0
+
+    asyncio.run(main())
+
+
+def test_connection_fails_when_a_state_cant_be_rendered():
+    async def main():
+        manager = make_manager()
+        ws = FakeWebSocket()
+        _, (cid,) = await start_game(manager, ws)
+        await manager.flush()
+
+        def render():
+            raise ValueError("broken state")
+
+        manager.active_connections[cid].put(render, True)
+        await asyncio.sleep(0.01)
+        assert not manager.connected(cid) and ws.closed
+        assert manager.connection_stats()["dropped"] == 1
+
+    asyncio.run(main())
+
+
+def apply_patch(state: dict, patch: dict):
+    """Apply a game patch to a game state the way a client would."""
+    assert patch["base"] == state["version"]
+    players, pool = state["players"], state["letter_pool"]
+    for change in patch["changes"]:
+        match change["op"]:
+            case "letter":
+                pool.append(change["letter"])
+            case "pool":
+                pool[:] = change["letters"]
+            case "take":
+                for letter in change["letters"]:
+                    pool.remove(letter)
+                for i, word in change["words"]:
+                    words = players[i]["words"]
+                    # binary patches give the index of the word
+                    words.pop(word) if isinstance(word, int) else words.remove(word)
+            case "add_word":
+                players[change["player"]]["words"].append(change["word"])
+            case "turn":
+                for i, p in enumerate(players):
+                    p["turn"] = i == change["player"]
+            case "remove_player":
+                players.pop(change["player"])
+                for i, p in enumerate(players):
+                    p["turn"] = i == change["turn"]
+    for p in players:
+        p["score"] = sum(len(w) for w in p["words"])
+    state["version"] = patch["version"]
+
+
+def test_delta_clients_are_sent_patches():
+    async def main():
+        manager = make_manager()
+        host, delta = FakeWebSocket(), FakeWebSocket(delay=0.01)
+        game_id, (host_id,) = await start_game(manager, host)
+        delta_id = uuid4()
+        await manager.connect(delta, delta_id, delta=True)  # type: ignore
+        await manager.handle_join(delta_id, game_id, "Delta")
+        await manager.flush()
+        state = delta.sent[-1]
+        assert state["action"] == "game_state"
+
+        game = manager.games[game_id]
+        game.letter_pool = ["r", "a", "g"]
+        await manager.broadcast_game_state(game_id)
+        await manager.flush()
+        await manager.handle_word(delta_id, "rag")
+        await manager.handle_letter(host_id)
+        await manager.handle_letter(delta_id)
+        await manager.flush()
+
+        patches = delta.sent[1:]
+        assert {m["action"] for m in patches} == {"game_patch"}
+        for patch in patches:
+            apply_patch(state, patch)
+        assert state == host.sent[-1] | {"players": state["players"]}
+        assert [p["words"] for p in state["players"]] == [[], ["rag"]]
+        assert state["players"] == [
+            p | {"you": not p["you"]} for p in host.sent[-1]["players"]
+        ]
+
+        # a client that asks to resync gets a full game state
+        await manager.handle_resync(delta_id)
+        await manager.flush()
+        assert delta.sent[-1]["action"] == "game_state"
+        assert delta.sent[-1]["version"] == game.version
+
+    asyncio.run(main())
+
+
+def test_delta_clients_get_a_game_state_when_patches_are_forgotten():
+    async def main():
+        manager = make_manager()
+        ws = FakeWebSocket()
+        game_id, _ = await start_game(manager, ws)
+        cid = uuid4()
+        delta = FakeWebSocket()
+        await manager.connect(delta, cid, delta=True)  # type: ignore
+        await manager.handle_join(cid, game_id, "Delta")
+        await manager.flush()
+
+        game = manager.games[game_id]
+        game.new_letter()
+        await manager.broadcast_game_state(game_id)
+        await manager.flush()
+        assert delta.sent[-1]["action"] == "game_patch"
+
+        for _ in range(CHANGELOG_SIZE + 1):
+            game.new_letter()
+        await manager.broadcast_game_state(game_id)
+        await manager.flush()
+        assert delta.sent[-1]["action"] == "game_state"
+        assert delta.sent[-1]["letter_pool"] == game.letter_pool
+
+    asyncio.run(main())
+
+
+def test_registries_stay_in_sync():
+    async def main():
+        manager = make_manager()
+        sockets = [FakeWebSocket() for _ in range(3)]
+        game_id, (host_id, *others) = await start_game(manager, *sockets)
+        assert manager.game_members[game_id] == {host_id, *others}
+        assert set(manager.connected_clients_in_game(game_id)) == {host_id, *others}
+
+        manager.disconnect(others[0])
+        assert set(manager.connected_clients_in_game(game_id)) == {host_id, others[1]}
+
+        await manager.handle_kick(host_id, 1)
+        assert others[0] not in manager.player_games
+        assert manager.game_members[game_id] == {host_id, others[1]}
+        await manager.handle_kick(host_id, 1)
+        await manager.handle_kick(host_id, 0)
+        assert game_id not in manager.games and game_id not in manager.game_members
+        assert not manager.player_games
+
+    asyncio.run(main())
+
+
+def test_sweep_removes_inactive_games_and_clients():
+    async def main():
+        manager = make_manager(
+            game_ttl=100, abandoned_ttl=10, client_ttl=1000, max_games=2
+        )
+        active, abandoned, idle = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        abandoned_game, (abandoned_id,) = await start_game(manager, abandoned)
+        manager.disconnect(abandoned_id)
+        idle_game, (idle_id,) = await start_game(manager, idle)
+        active_game, (active_id,) = await start_game(manager, active)
+        now = time.monotonic()
+
+        # nothing is old enough yet, but there is one game too many
+        assert manager.sweep(now) == (1, 0)
+        assert set(manager.games) == {idle_game, active_game}
+        await manager.handle_join(abandoned_id, idle_game, "Abandoned")
+
+        # the idle game still has someone connected, so it isn't abandoned
+        assert manager.sweep(now + 50) == (0, 0)
+        manager._touch(active_id, now + 60)
+        assert manager.sweep(now + 150) == (1, 0)
+        assert set(manager.games) == {active_game}
+        assert idle_id not in manager.player_games
+        await manager.flush()
+        assert idle.sent[-1]["action"] == "leave_game"
+
+        # only disconnected clients are forgotten
+        assert manager.sweep(now + 2000) == (1, 1)  # the active game is idle now
+        assert set(manager.known_clients) == {active_id, idle_id}
+
+    asyncio.run(main())
+
+
+def test_evicted_clients_give_up_their_seats():
+    async def main():
+        manager = make_manager(max_clients=1)
+        host_ws, guest_ws = FakeWebSocket(), FakeWebSocket()
+        game_id, (host, guest) = await start_game(manager, host_ws, guest_ws)
+        await manager.handle_letter(host)  # the guest's turn
+        manager.disconnect(guest)
+
+        assert manager.sweep() == (0, 1)
+        game = manager.games[game_id]
+        assert game.turn_order == [host] and game.turn is game.players[host]
+        assert guest not in manager.player_games
+        await manager.flush()
+        assert [p["name"] for p in host_ws.sent[-1]["players"]] == ["Host"]
+
+    asyncio.run(main())
+
+
+def test_strategy_is_revalidated_after_the_search():
+    async def main():
+        manager = make_manager(search_workers=1, search_timeout=5)
+        ws = FakeWebSocket()
+        cid = uuid4()
+        await manager.connect(ws, cid)  # type: ignore
+        await manager.handle_start(cid, "Host")
+        game = manager.games[manager.player_games[cid]]
+        game.letter_pool = ["r", "a", "g", "s"]
+        try:
+            # the first search uses the s, which is gone by the time it finishes
+            task = asyncio.create_task(manager.handle_word(cid, "rags"))
+            await asyncio.sleep(0)
+            game.letter_pool = ["r", "a", "g"]
+            game.add_word(cid, "s")
+            await task
+            assert game.players[cid].words == ["rags"]
+            assert game.letter_pool == []
+
+            game.letter_pool = ["r", "a", "g"]
+            task = asyncio.create_task(manager.handle_word(cid, "rag"))
+            await asyncio.sleep(0)
+            game.letter_pool = ["r"]
+            await task
+            await manager.flush()
+            assert ws.sent[-1]["err_type"] == "unconstructable_word"
+            assert game.players[cid].words == ["rags"]
+        finally:
+            manager.workers.close()
+
+    asyncio.run(main())
+
+
+def test_concurrent_searches_share_a_job():
+    async def main():
+        manager = make_manager(search_workers=1, search_timeout=5)
+        ws = FakeWebSocket()
+        game_id, (cid,) = await start_game(manager, ws)
+        game = manager.games[game_id]
+        game.add_word(cid, "rags")  # has the letters of rag, but can't be split
+        jobs = []
+        run = manager.workers.run
+
+        def count_jobs(*args, **kwargs):
+            jobs.append(args)
+            return run(*args, **kwargs)
+
+        manager.workers.run = count_jobs  # type: ignore
+        try:
+            await asyncio.gather(
+                *(manager.handle_word(cid, "rag") for _ in range(3)),
+            )
+            await manager.handle_word(cid, "rag")
+            await manager.flush()
+            assert [m.get("err_type") for m in ws.sent[-4:]] == [
+                "unconstructable_word"
+            ] * 4
+            assert len(jobs) == 1
+            stats = manager.cache_stats()
+            assert (stats["hits"], stats["misses"]) == (1, 3)
+        finally:
+            manager.workers.close()
+
+    asyncio.run(main())
+
+
+def test_binary_clients_get_the_same_messages():
+    async def main():
+        manager = make_manager()
+        sockets = [FakeWebSocket(), FakeWebSocket(), FakeWebSocket()]
+        game_id, clients = await start_game(manager, sockets[0])
+        for i, (ws, delta) in enumerate([(sockets[1], False), (sockets[2], True)]):
+            cid = uuid4()
+            await manager.connect(ws, cid, delta=delta, binary=True)  # type: ignore
+            await manager.handle_join(cid, game_id, f"Binary {i}")
+            clients.append(cid)
+        await manager.flush()
+        state = sockets[2].sent[-1]
+
+        game = manager.games[game_id]
+        game.letter_pool = ["r", "a", "g", "s"]
+        await manager.broadcast_game_state(game_id)
+        await manager.handle_word(clients[1], "rag")
+        await manager.handle_word(clients[2], "rags")
+        await manager.handle_word(clients[1], "as")  # there are no letters left
+        await manager.flush()
+        error = sockets[1].sent.pop()
+        assert error == {
+            "action": "error",
+            "err_type": "unconstructable_word",
+            "description": error["description"],
+        }
+
+        patches = sockets[2].sent[1:]
+        assert {m["action"] for m in patches} == {"game_patch"}
+        for patch in patches:
+            apply_patch(state, patch)
+
+        def you(message: dict) -> list[bool]:
+            return [p.pop("you") for p in message["players"]]
+
+        assert you(sockets[0].sent[-1]) == [True, False, False]
+        assert you(sockets[1].sent[-1]) == [False, True, False]
+        assert you(state) == [False, False, True]
+        assert sockets[0].sent[-1] == sockets[1].sent[-1] == state
+
+    asyncio.run(main())
+
+
+def test_seeded_games_are_dealt_the_same_letters():
+    async def main():
+        dealt = []
+        for seed in (1, 1, 2):
+            manager = make_manager(letters=partial(TileBag, 1), seed=seed)
+            game_id, (host,) = await start_game(manager, FakeWebSocket())
+            game = manager.games[game_id]
+            for _ in range(TileBag().remaining):
+                await manager.handle_letter(host)
+            dealt.append("".join(game.letter_pool))
+
+            await manager.handle_letter(host)
+            await manager.flush()
+            error = manager.active_connections[host].websocket.sent[-1]
+            assert error["err_type"] == "letter_fail"
+        assert dealt[0] == dealt[1] != dealt[2]
+
+    asyncio.run(main())
+
+
+def test_games_are_played_with_their_dictionary_view():
+    async def main():
+        dictionary = Dictionary(["as", "rag", "rags"])
+        long = DictionaryView(dictionary, min_length=4)
+        manager = GameManager(dictionary, views={"long": long})
+        ws = FakeWebSocket()
+        host = uuid4()
+        await manager.connect(ws, host)  # type: ignore
+        await manager.handle_start(host, "Host", "short")
+        await manager.flush()
+        assert ws.sent[-1]["err_type"] == "start_fail"
+
+        await manager.handle_start(host, "Host", "long")
+        game = manager.games[manager.player_games[host]]
+        assert game.dictionary == "long"
+        game.letter_pool = list("rags")
+        await manager.handle_word(host, "rag")
+        await manager.flush()
+        assert ws.sent[-1]["err_type"] == "unknown_word"
+        # only words of the game's view that the board could make are suggested
+        assert ws.sent[-1]["description"].endswith("Did you mean Rags?")
+        await manager.handle_word(host, "rags")
+        assert game.players[host].words == ["rags"]
+
+    asyncio.run(main())
+
+
+def test_suggestions_can_be_made_from_the_tiles():
+    async def main():
+        dictionary = Dictionary(["as", "rag", "rags"])
+        for makeable, hint in [
+            (True, ""),
+            (False, " Did you mean Rags or Rag?"),
+        ]:
+            manager = GameManager(dictionary, makeable_suggestions=makeable)
+            ws = FakeWebSocket()
+            host = uuid4()
+            await manager.connect(ws, host)  # type: ignore
+            await manager.handle_start(host, "Host")
+            game = manager.games[manager.player_games[host]]
+            # the board has the letters of rag, but rags can't be split
+            game.add_word(host, "rags")
+            assert game.could_make("rag")
+            await manager.handle_word(host, "ragx")
+            await manager.flush()
+            assert ws.sent[-1]["description"] == "Ragx is not in the dictionary." + hint
+
+    asyncio.run(main())
+
+
+def test_games_handle_their_messages_in_order_without_waiting_on_each_other():
+    async def main():
+        manager = make_manager()
+        ws_a, ws_b = FakeWebSocket(), FakeWebSocket()
+        game_a, (a,) = await start_game(manager, ws_a)
+        game_b, (b,) = await start_game(manager, ws_b)
+        manager.games[game_a].letter_pool = ["r", "a", "g", "s"]
+        manager.games[game_b].letter_pool = ["r", "a", "g"]
+        gate = asyncio.Event()
+        run = manager.workers.run
+
+        async def gated_run(job, word, *args, **kwargs):
+            if word == "rags":
+                await gate.wait()
+            return await run(job, word, *args, **kwargs)
+
+        manager.workers.run = gated_run  # type: ignore
+        word = asyncio.create_task(
+            manager.handle_message(Message(action="word", word="rags"), a)
+        )
+        letter = asyncio.create_task(
+            manager.handle_message(Message(action="letter"), a)
+        )
+        await asyncio.sleep(0.01)
+        # the letter waits for the word, but the other game doesn't
+        assert manager.game_stats()[0]["game_id"] == game_a
+        assert manager.mailbox_stats()["queued"] == 1
+        assert len(manager.games[game_a].letter_pool) == 4
+        await manager.handle_message(Message(action="word", word="rag"), b)
+        assert manager.games[game_b].players[b].words == ["rag"]
+
+        gate.set()
+        await asyncio.gather(word, letter)
+        game = manager.games[game_a]
+        assert game.players[a].words == ["rags"]
+        assert len(game.letter_pool) == 1
+        stats = {s["game_id"]: s for s in manager.game_stats()}
+        assert stats[game_a]["handled"] == 2
+        assert stats[game_a]["max_queue_depth"] == 2
+        assert stats[game_b]["handled"] == 1
+        assert manager.mailbox_stats() == {
+            "games": 2,
+            "running": 0,
+            "queued": 0,
+            "max_queue_depth": 0,
+        }
+
+        await manager.handle_message(Message(action="kick", player_index=0), a)
+        assert game_a not in manager.games
+        assert len(manager.game_stats()) == 1
+
+    asyncio.run(main())
+
+
+def test_messages_queued_behind_a_kick_find_the_player_gone():
+    async def main():
+        manager = make_manager()
+        host_ws, guest_ws = FakeWebSocket(), FakeWebSocket()
+        game_id, (host, guest) = await start_game(manager, host_ws, guest_ws)
+        manager.games[game_id].letter_pool = ["r", "a", "g"]
+        kick = asyncio.create_task(
+            manager.handle_message(Message(action="kick", player_index=1), host)
+        )
+        word = asyncio.create_task(
+            manager.handle_message(Message(action="word", word="rag"), guest)
+        )
+        await asyncio.gather(kick, word)
+        await manager.flush()
+        assert guest_ws.sent[-1]["action"] == "leave_game"
+        assert guest not in manager.games[game_id].players
+        assert manager.games[game_id].letter_pool == ["r", "a", "g"]
+
+    asyncio.run(main())
+
+
+def test_messages_queued_behind_a_deleted_game_find_it_gone():
+    async def main():
+        manager = make_manager()
+        game_id, (host,) = await start_game(manager, FakeWebSocket())
+        manager.games[game_id].letter_pool = ["r", "a", "g", "s"]
+        gate = asyncio.Event()
+        run = manager.workers.run
+
+        async def gated_run(*args, **kwargs):
+            await gate.wait()
+            return await run(*args, **kwargs)
+
+        manager.workers.run = gated_run  # type: ignore
+        word = asyncio.create_task(
+            manager.handle_message(Message(action="word", word="rags"), host)
+        )
+        letter = asyncio.create_task(
+            manager.handle_message(Message(action="letter"), host)
+        )
+        await asyncio.sleep(0.01)
+        manager._remove_game(game_id)
+        gate.set()
+        await asyncio.gather(word, letter)
+        assert game_id not in manager.games
+
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+import asyncio
+from uuid import uuid4
+
+from anagrams.core.dictionary import Dictionary
+from anagrams.core.game import Game
+from anagrams.server import journal
+from anagrams.server.game_manager import GameManager
+from anagrams.server.journal import Journal
+
+
+def make_manager(directory) -> GameManager:
+    manager = GameManager(Dictionary(["as", "rag", "rags"]), journal=Journal(directory))
+    manager.recover()
+    return manager
+
+
+def board(game: Game):
+    return (
+        game.letter_pool,
+        [(p.id, p.name, p.words, p.score) for p in game.players.values()],
+        game.turn,
+        game.version,
+        game.board_signature,
+    )
+
+
+async def play(manager: GameManager):
+    host, guest, other = uuid4(), uuid4(), uuid4()
+    await manager.handle_start(host, "Host")
+    game_id = manager.player_games[host]
+    await manager.handle_join(guest, game_id, "Guest")
+    await manager.handle_join(other, game_id, "Other")
+    game = manager.games[game_id]
+    game.letter_pool = ["r", "a", "g", "s", "e"]
+    await manager.handle_letter(host)
+    await manager.handle_word(guest, "rag")
+    await manager.handle_word(host, "rags")
+    await manager.handle_kick(host, 2)
+    return game_id, host, guest
+
+
+def test_recovery_replays_the_journal(tmp_path):
+    async def main():
+        manager = make_manager(tmp_path)
+        game_id, host, guest = await play(manager)
+        gone = uuid4()
+        await manager.handle_start(gone, "Gone")
+        await manager.handle_kick(gone, 0)  # deletes the game
+        await manager.journal.flush()
+
+        recovered = make_manager(tmp_path)
+        assert list(recovered.games) == [game_id]
+        game = recovered.games[game_id]
+        assert board(game) == board(manager.games[game_id])
+        assert game.players[host].words == ["rags"]
+        assert recovered.player_games == {host: game_id, guest: game_id}
+        assert guest in recovered.known_clients
+        # the game's letters carry on where they left off
+        original = manager.games[game_id].letters
+        assert game.letters.draw_many(5) == original.draw_many(5)
+
+    asyncio.run(main())
+
+
+def test_recovery_from_a_snapshot_and_the_tail(tmp_path):
+    async def main():
+        manager = make_manager(tmp_path)
+        game_id, host, _ = await play(manager)
+        await manager.journal.snapshot(manager.games)
+        assert len(list(tmp_path.glob("journal-*.jsonl"))) == 1
+        await manager.handle_letter(host)
+        await manager.journal.flush()
+        # a write cut short by a crash
+        with open(manager.journal._journal_path(manager.journal._number), "a") as f:
+            f.write('["ABCD",9,{"op":"le')
+
+        recovered = make_manager(tmp_path)
+        assert board(recovered.games[game_id]) == board(manager.games[game_id])
+
+        # new changes are journaled after the recovered ones
+        await recovered.handle_letter(recovered.games[game_id].turn_order[1])
+        await recovered.journal.close(recovered.games)
+        again = make_manager(tmp_path)
+        assert board(again.games[game_id]) == board(recovered.games[game_id])
+
+    asyncio.run(main())
+
+
+def test_changes_during_a_snapshot_are_replayed_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "SNAPSHOT_CHUNK", 1)
+
+    async def main():
+        manager = make_manager(tmp_path)
+        hosts = [uuid4() for _ in range(3)]
+        for host in hosts:
+            await manager.handle_start(host, "Host")
+        snapshot = asyncio.create_task(manager.journal.snapshot(manager.games))
+        while not snapshot.done():
+            # some of these are saved in the snapshot, and all are journaled
+            for host in hosts:
+                await manager.handle_letter(host)
+            await asyncio.sleep(0)
+        await manager.journal.flush()
+
+        recovered = make_manager(tmp_path)
+        for game_id, game in manager.games.items():
+            assert board(recovered.games[game_id]) == board(game)
+
+    asyncio.run(main())
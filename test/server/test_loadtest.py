@@ -0,0 +1,24 @@
+import asyncio
+
+from anagrams.server import loadtest
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert loadtest.percentile(values, 50) == 50
+    assert loadtest.percentile(values, 99) == 99
+    assert loadtest.percentile([3.0], 95) == 3
+
+
+def test_in_process_load():
+    stats, elapsed = asyncio.run(
+        loadtest.run_in_process(games=3, players=3, rounds=4, think=0, ramp=0)
+    )
+    summary = loadtest.report(stats, elapsed)
+    assert summary["failed_games"] == 0
+    actions = summary["actions"]
+    assert actions["start"]["count"] == 3
+    assert actions["join"]["count"] == 6
+    assert actions["letter"]["count"] == 12
+    assert actions["kick"]["count"] == 6
+    assert actions["fanout"]["p99_ms"] >= actions["fanout"]["p50_ms"]
@@ -0,0 +1,63 @@
+from fastapi.testclient import TestClient
+
+from anagrams.server.metrics import Counter, Histogram, Metrics, SlowCalls
+
+
+def test_histogram():
+    h = Histogram("latency_seconds", "Latency.", labels=("action",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 5):
+        h.observe(value, "word")
+    assert list(h.render()) == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{action="word",le="0.1"} 2',
+        'latency_seconds_bucket{action="word",le="1"} 3',
+        'latency_seconds_bucket{action="word",le="+Inf"} 4',
+        'latency_seconds_sum{action="word"} 5.65',
+        'latency_seconds_count{action="word"} 4',
+    ]
+
+
+def test_counter():
+    c = Counter("lookups_total", "Lookups.", labels=("result",))
+    c.inc("hit")
+    c.inc("hit", amount=2)
+    assert list(c.samples()) == ['lookups_total{result="hit"} 3']
+
+
+def test_slow_calls():
+    slow = SlowCalls(size=2)
+    for i, seconds in enumerate([0.1, 0.3, 0.2]):
+        slow.record(seconds, {"call": i})
+    assert slow.slowest() == [
+        {"seconds": 0.3, "call": 1},
+        {"seconds": 0.2, "call": 2},
+    ]
+
+
+def test_metrics_endpoint(monkeypatch):
+    from anagrams.server import server
+    from anagrams.server.server import app, manager
+
+    monkeypatch.setattr(manager, "metrics", Metrics())  # not counting other tests
+    with TestClient(app) as client:
+        assert client.get("/debug/slow-words").status_code == 404
+        assert client.post("/debug/slow-words?enabled=true").status_code == 404
+        assert client.get("/debug/games").status_code == 404
+        monkeypatch.setattr(server, "debug_endpoints", True)
+        assert client.post("/debug/slow-words?enabled=true").json()["profiling"]
+        with client.websocket_connect("/ws") as ws:
+            assert ws.receive_json()["action"] == "set_cookie"
+            ws.send_json({"action": "start", "name": "Host"})
+            assert ws.receive_json()["action"] == "game_state"
+            ws.send_json({"action": "word", "word": "qzxv"})
+            assert ws.receive_json()["err_type"] == "unknown_word"
+
+        text = client.get("/metrics").text
+        assert 'anagrams_message_seconds_count{action="start"} 1' in text
+        assert 'anagrams_dictionary_lookups_total{result="miss"} 1' in text
+        assert 'anagrams_broadcast_recipients_bucket{le="1"} 1' in text
+        assert "anagrams_event_loop_lag_seconds" in text
+        calls = client.get("/debug/slow-words").json()["calls"]
+        assert [call["word"] for call in calls] == ["qzxv"]
+        client.post("/debug/slow-words?enabled=false")
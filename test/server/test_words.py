@@ -0,0 +1,82 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from anagrams.core.dictionary.view import DictionaryView
+from anagrams.server import words
+from anagrams.server.metrics import Metrics
+
+
+def results(response) -> list[dict]:
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_check_a_batch(monkeypatch):
+    from anagrams.server.server import app, manager
+
+    long = DictionaryView(manager.dictionary, min_length=5)
+    monkeypatch.setitem(manager.views, "long", long)
+    monkeypatch.setattr(manager, "metrics", Metrics())
+    with TestClient(app) as client:
+        response = client.post("/words", json=["rags", "Grass", "qzxv"])
+        assert results(response) == [
+            {"word": "rags", "valid": True},
+            {"word": "grass", "valid": True},
+            {"word": "qzxv", "valid": False},
+        ]
+
+        response = client.post(
+            "/words?dictionary=long&signature=true&anagrams=true",
+            json={"words": ["rags", "grass"]},
+        )
+        assert results(response) == [
+            {"word": "rags", "valid": False, "signature": "agrs", "anagrams": []},
+            {
+                "word": "grass",
+                "valid": True,
+                "signature": "agrss",
+                "anagrams": ["grass"],
+            },
+        ]
+        assert client.post("/words?dictionary=nope", json=[]).status_code == 404
+        assert client.post("/words", json={"word": "rags"}).status_code == 400
+        monkeypatch.setattr(words, "MAX_JSON_BODY", 100)
+        assert client.post("/words", json=["rags"] * 20).status_code == 413
+        chunked = client.post(
+            "/words",
+            content=iter([b'["rags",'] * 20 + [b'"rags"]']),
+            headers={"content-type": "application/json"},
+        )
+        assert chunked.status_code == 413
+        text = client.get("/metrics").text
+        assert 'anagrams_dictionary_lookups_total{result="hit"} 3' in text
+
+
+def test_check_a_stream(monkeypatch):
+    from anagrams.server.server import app
+
+    monkeypatch.setattr(words, "BATCH_SIZE", 7)
+    n = 5000
+
+    def body():
+        # lines split across chunks, in every format
+        yield b'rags\n"gra'
+        yield b'ss"\n{"word": "qzxv"}\n\n'
+        for i in range(n):
+            yield b"anagrams\n" if i % 2 else b"anagrms\n"
+        yield b"as"
+
+    with TestClient(app) as client:
+        found = results(client.post("/words?anagrams=true", content=body()))
+        assert [r["word"] for r in found[:3]] == ["rags", "grass", "qzxv"]
+        assert [r["valid"] for r in found[:5]] == [True, True, False, False, True]
+        assert found[4]["anagrams"] == ["anagrams"]
+        assert len(found) == n + 4 and found[-1] == {
+            "word": "as",
+            "valid": True,
+            "anagrams": ["as"],
+        }
+
+        found = results(client.post("/words", content=b"rags\n" + b"x" * 2000))
+        assert found[0]["valid"] and "longer than" in found[1]["error"]
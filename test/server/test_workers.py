@@ -0,0 +1,88 @@
+import asyncio
+import time
+from uuid import uuid4
+
+import pytest
+
+from anagrams.core import Game, Player
+from anagrams.core.dictionary import Dictionary
+from anagrams.server import workers
+from anagrams.server.workers import WorkerPool
+
+WORDS = ["as", "rag", "rags", "gras", "sag"]
+
+
+def make_game():
+    game = Game()
+    game.letter_pool = ["s", "a"]
+    player = Player(uuid4(), "Player 1", ["rag"])
+    game.add_player(player)
+    return game, player
+
+
+@pytest.mark.parametrize("processes", [0, 1])
+def test_find_strategy(processes: int):
+    async def main():
+        pool = WorkerPool(Dictionary(WORDS), processes)
+        game, player = make_game()
+        try:
+            strategy = await pool.run(
+                workers.find_strategy, "rags", *workers.board(game)
+            )
+            assert strategy == ((None, "s"), (player.id, "rag"))
+            assert await pool.run(workers.check_words, ["rags", "xyz"]) == [True, False]
+            pool.close()  # e.g. when the server stops, and then starts again
+            assert await pool.run(workers.check_words, ["rags"]) == [True]
+        finally:
+            pool.close()
+
+    asyncio.run(main())
+
+
+def sleep_job(dictionary: Dictionary, seconds: float, time_budget: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def test_inline_jobs_leave_the_event_loop_free():
+    async def main():
+        pool = WorkerPool(Dictionary(WORDS), 0)
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(tick())
+        assert await pool.run(sleep_job, 0.2) == 0.2
+        ticking.cancel()
+        assert ticks >= 5
+
+    asyncio.run(main())
+
+
+def test_jobs_time_out():
+    async def main():
+        letters = "abcdefghijklmnop"
+        game = Game()
+        game.letter_pool = list(letters)
+        words = [a + b for i, a in enumerate(letters) for b in letters[i + 1 :]]
+        game.add_player(Player(uuid4(), "Player 1", words))
+
+        pool = WorkerPool(Dictionary(WORDS), 1, timeout=0.05)
+        try:
+            with pytest.raises(TimeoutError):
+                await pool.run(workers.find_moves, game, None, None, timeout=0)
+            with pytest.raises(TimeoutError):
+                # the worker stops searching at the deadline on its own
+                await pool.run(
+                    workers.find_strategy, letters + "q", *workers.board(game)
+                )
+            # and is free for the next job
+            assert await pool.run(workers.check_words, ["as"], timeout=5) == [True]
+        finally:
+            pool.close()
+
+    asyncio.run(main())